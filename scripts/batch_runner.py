@@ -0,0 +1,224 @@
+# scripts/batch_runner.py
+"""Non-interactive batch mode: runs many STEP files through the pipeline.
+
+Usage (inside the container, via the pipeline entry point):
+    python /app/scripts/pipeline.py --batch [--glob PATTERN | --manifest FILE]
+                                            [--template FILE] [--workers N]
+                                            [--warm-freecad] [--freecad-max-jobs N]
+
+The manifest is a JSON file, either a list of jobs or
+{"defaults": {...}, "jobs": [...]}. A job is a STEP path or a dict of config
+overrides that must contain INPUT_FILE (and may contain "name"). Every job gets
+its own directory under the output root holding its config.json, the stage
+outputs and pipeline.log.
+
+With --warm-freecad (or FREECAD_WORKER: "true" in the base config) every pool
+process keeps its own long-lived FreeCAD worker (see freecad_worker.py) instead
+of starting freecadcmd for each part.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import util
+
+from pipeline_config import (BATCH_WORKERS_ENV, DEFAULT_CONFIG, DEFAULT_CONFIG_PATH, INPUT_DIR, config_flag,
+                             output_path)
+from projection_cache import open_projection_cache
+
+# Warm FreeCAD worker and Python stage runner owned by the current pool process
+_freecad_worker = None
+_stage_runner = None
+
+
+def init_pool_process(warm_freecad, max_jobs, output_root, fork_server=False):
+    """Pool initializer: starts one warm FreeCAD worker per pool process.
+
+    With `fork_server` the pool process also preloads the Python stage modules
+    once and forks every dxf_add_dim/dxf_render_svg stage from there.
+    """
+    global _freecad_worker, _stage_runner
+    if fork_server:
+        from stage_forkserver import StageRunner
+        _stage_runner = StageRunner(fork_server=True)
+    if not warm_freecad:
+        return
+    from freecad_worker import FreeCADWorkerClient
+
+    socket_path = f"/tmp/freecad_worker_{os.getpid()}.sock"
+    _freecad_worker = FreeCADWorkerClient(
+        socket_path, max_jobs=max_jobs,
+        log_path=os.path.join(output_root, f"freecad_worker_{os.getpid()}.log"))
+    # Pool processes leave through multiprocessing, which skips atexit handlers
+    util.Finalize(None, _freecad_worker.stop, exitpriority=10)
+
+
+def load_base_config(path, template=None):
+    """Builds the config shared by every job of the batch."""
+    config = dict(DEFAULT_CONFIG)
+    if path and os.path.exists(path):
+        with open(path, 'r') as f:
+            config.update(json.load(f))
+    if template:
+        config["TEMPLATE_FILE"] = template
+    return config
+
+
+def collect_jobs(base_config, manifest=None, pattern=None):
+    """Expands the manifest or glob into a list of (name, config) jobs."""
+    entries = []
+    if manifest:
+        with open(manifest, 'r') as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            base_config = {**base_config, **data.get("defaults", {})}
+            data = data.get("jobs", [])
+        entries = data
+    else:
+        entries = sorted(glob.glob(pattern or os.path.join(INPUT_DIR, "*.step")))
+
+    jobs = []
+    used_names = set()
+    for entry in entries:
+        overrides = {"INPUT_FILE": entry} if isinstance(entry, str) else dict(entry)
+        if "INPUT_FILE" not in overrides:
+            raise ValueError(f"Manifest entry without INPUT_FILE: {entry}")
+
+        name = overrides.pop("name", None) or os.path.splitext(os.path.basename(overrides["INPUT_FILE"]))[0]
+        unique_name, suffix = name, 1
+        while unique_name in used_names:
+            suffix += 1
+            unique_name = f"{name}_{suffix}"
+        used_names.add(unique_name)
+
+        jobs.append((unique_name, {**base_config, **overrides}))
+    return jobs
+
+
+def run_job(name, config, output_root):
+    """Runs the full pipeline for one job inside a pool worker."""
+    from pipeline import run_stages
+
+    job_dir = os.path.join(output_root, name)
+    os.makedirs(job_dir, exist_ok=True)
+    config_file = os.path.join(job_dir, "config.json")
+    with open(config_file, 'w') as f:
+        json.dump(config, f, indent=2)
+
+    start = time.perf_counter()
+    result = {'name': name, 'input': config["INPUT_FILE"], 'output_dir': job_dir}
+    with open(os.path.join(job_dir, "pipeline.log"), 'w') as log:
+        try:
+            stages = run_stages(config, config_file, job_dir, log=log, freecad_worker=_freecad_worker,
+                                stage_runner=_stage_runner)
+            if stages:
+                result['stages'] = stages
+            result['ok'] = True
+        except Exception as e:
+            traceback.print_exc(file=log)
+            result['ok'] = False
+            result['error'] = str(e)
+    result['seconds'] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def print_summary(results, wall_time, workers):
+    """Prints throughput and failures, returns the summary dict."""
+    failed = [r for r in results if not r['ok']]
+    summary = {
+        'jobs': len(results),
+        'succeeded': len(results) - len(failed),
+        'failed': len(failed),
+        'workers': workers,
+        'wall_seconds': round(wall_time, 3),
+        'parts_per_minute': round(60.0 * len(results) / wall_time, 2) if wall_time > 0 else 0.0,
+        'mean_job_seconds': round(sum(r['seconds'] for r in results) / len(results), 3) if results else 0.0,
+        'results': sorted(results, key=lambda r: r['name']),
+    }
+
+    print("================ BATCH SUMMARY ================")
+    print(f"  Jobs               : {summary['jobs']}")
+    print(f"  Succeeded          : {summary['succeeded']}")
+    print(f"  Failed             : {summary['failed']}")
+    print(f"  Workers            : {workers}")
+    print(f"  Wall time          : {summary['wall_seconds']:.1f} s")
+    print(f"  Throughput         : {summary['parts_per_minute']:.2f} parts/min")
+    print(f"  Mean job time      : {summary['mean_job_seconds']:.1f} s")
+    for r in failed:
+        print(f"  ❌ {r['name']}: {r.get('error', 'unknown error')} (see {r['output_dir']}/pipeline.log)")
+    print("===============================================")
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch-convert STEP files into drawings.")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--manifest", help="JSON manifest of jobs")
+    source.add_argument("--glob", dest="pattern", help="Glob over STEP files (default: /app/input/*.step)")
+    parser.add_argument("--config", default=DEFAULT_CONFIG_PATH, help="Base config shared by all jobs")
+    parser.add_argument("--template", help="Template file, overrides TEMPLATE_FILE of the base config")
+    parser.add_argument("--output-root", default=output_path("batch"), help="Directory for per-job outputs")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Concurrent jobs (default: CPU count)")
+    parser.add_argument("--warm-freecad", action="store_true", help="Keep a warm FreeCAD worker per pool process")
+    parser.add_argument("--freecad-max-jobs", type=int, default=50, help="Restart a warm FreeCAD worker after N jobs")
+    parser.add_argument("--fork-server", action="store_true",
+                        help="Preload the Python stages once per pool process and fork them")
+    args = parser.parse_args(argv)
+
+    base_config = load_base_config(args.config, args.template)
+    jobs = collect_jobs(base_config, args.manifest, args.pattern)
+    if not jobs:
+        print("❌ Error: No jobs found for the batch.")
+        return 1
+    missing_template = [name for name, config in jobs if not config.get("TEMPLATE_FILE")]
+    if missing_template:
+        print(f"❌ Error: No TEMPLATE_FILE for jobs: {', '.join(missing_template)}. Use --template.")
+        return 1
+
+    workers = max(1, min(args.workers, len(jobs)))
+    warm_freecad = args.warm_freecad or config_flag(base_config, 'FREECAD_WORKER')
+    fork_server = args.fork_server or config_flag(base_config, 'FORK_SERVER')
+    # Pool processes (and their stages) inherit it, see parallel_view_workers()
+    os.environ[BATCH_WORKERS_ENV] = str(workers)
+    os.makedirs(args.output_root, exist_ok=True)
+    print(f"🚀 Starting batch of {len(jobs)} jobs on {workers} workers -> {args.output_root}")
+    if warm_freecad:
+        print(f"ℹ️ Using warm FreeCAD workers (restart after {args.freecad_max_jobs} jobs)")
+    if fork_server:
+        print("ℹ️ Using the preloading fork-server for the Python stages")
+
+    results = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_pool_process,
+                             initargs=(warm_freecad, args.freecad_max_jobs, args.output_root, fork_server)) as pool:
+        futures = {pool.submit(run_job, name, config, args.output_root): name for name, config in jobs}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {'name': name, 'ok': False, 'seconds': 0.0, 'error': str(e),
+                          'output_dir': os.path.join(args.output_root, name)}
+            status = "✅" if result['ok'] else "❌"
+            print(f"{status} [{len(results) + 1}/{len(jobs)}] {name} ({result['seconds']:.1f} s)", flush=True)
+            results.append(result)
+
+    summary = print_summary(results, time.perf_counter() - start, workers)
+    cache = open_projection_cache(base_config)
+    if cache:
+        summary['projection_cache'] = cache.stats()
+        print(f"ℹ️ Projection cache: {json.dumps(summary['projection_cache'])}")
+    summary_path = os.path.join(args.output_root, "batch_summary.json")
+    with open(summary_path, 'w') as f:
+        json.dump(summary, f, indent=2)
+    print(f"✅ Summary written to: {summary_path}")
+
+    return 0 if not summary['failed'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
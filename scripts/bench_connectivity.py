@@ -0,0 +1,146 @@
+# scripts/bench_connectivity.py
+"""Benchmark: EdgeConnectivityAnalyzer.group_connected_edges, old vs. new.
+
+Builds synthetic LINE entities (fragmented collinear outlines whose joints are
+jittered around the rounding grid, plus dense "star" vertices where many lines
+meet) and times the previous rounding/pairwise implementation against the
+spatial-hash + union-find one.
+
+Usage:
+    python /app/scripts/bench_connectivity.py [--sizes 1000 10000 100000] [--star-degree 256]
+"""
+import argparse
+import math
+import random
+import time
+from collections import defaultdict
+
+import ezdxf
+from ezdxf.math import Vec2
+
+from dxf_add_dim import EdgeConnectivityAnalyzer
+
+
+class LegacyEdgeConnectivityAnalyzer:
+    """The previous implementation, kept verbatim for comparison."""
+
+    def __init__(self, tolerance=1e-3):
+        self.tolerance = tolerance
+
+    def group_connected_edges(self, lines):
+        if not lines:
+            return []
+        connections = defaultdict(list)
+        endpoints = defaultdict(list)
+        for i, line in enumerate(lines):
+            start = self._round_point(Vec2(line.dxf.start))
+            end = self._round_point(Vec2(line.dxf.end))
+            endpoints[start].append(i)
+            endpoints[end].append(i)
+        for point, line_indices in endpoints.items():
+            for i in line_indices:
+                for j in line_indices:
+                    if i != j:
+                        connections[i].append(j)
+        visited = set()
+        chains = []
+        for i, line in enumerate(lines):
+            if i not in visited:
+                chain = self._build_chain(i, lines, connections, visited)
+                if len(chain) > 1:
+                    chains.append(chain)
+        return chains
+
+    def _round_point(self, point):
+        return (round(point.x / self.tolerance) * self.tolerance,
+                round(point.y / self.tolerance) * self.tolerance)
+
+    def _build_chain(self, start_idx, lines, connections, visited):
+        chain = []
+        stack = [start_idx]
+        while stack:
+            current = stack.pop()
+            if current in visited:
+                continue
+            visited.add(current)
+            chain.append(current)
+            for neighbor in connections[current]:
+                if neighbor not in visited:
+                    if self._lines_are_continuous(lines[current], lines[neighbor]):
+                        stack.append(neighbor)
+        return chain
+
+    def _lines_are_continuous(self, line1, line2):
+        d1 = Vec2(line1.dxf.end) - Vec2(line1.dxf.start)
+        d2 = Vec2(line2.dxf.end) - Vec2(line2.dxf.start)
+        if d1.magnitude < self.tolerance or d2.magnitude < self.tolerance:
+            return False
+        return abs(d1.normalize().dot(d2.normalize())) > 0.9
+
+
+def make_lines(count, star_degree, tolerance, seed=42):
+    """Creates `count` LINE entities: fragmented outlines plus star vertices."""
+    rng = random.Random(seed)
+    doc = ezdxf.new()
+    msp = doc.modelspace()
+    lines = []
+    jitter = tolerance * 0.3  # joints straddle the rounding grid
+
+    star_lines = count // 5
+    outline_lines = count - star_lines
+
+    # Fragmented collinear outlines: rectangles split into 10 pieces per side
+    origin_x = 0.0
+    while len(lines) < outline_lines:
+        w, h = rng.uniform(20, 200), rng.uniform(20, 200)
+        corners = [(origin_x, 0), (origin_x + w, 0), (origin_x + w, h), (origin_x, h)]
+        for k in range(4):
+            (x1, y1), (x2, y2) = corners[k], corners[(k + 1) % 4]
+            prev = (x1, y1)
+            for step in range(1, 11):
+                t = step / 10
+                point = (x1 + (x2 - x1) * t + rng.uniform(-jitter, jitter),
+                         y1 + (y2 - y1) * t + rng.uniform(-jitter, jitter))
+                lines.append(msp.add_line(prev, point))
+                # Next piece starts at a slightly different position
+                prev = (point[0] + rng.uniform(-jitter, jitter), point[1] + rng.uniform(-jitter, jitter))
+        origin_x += w + 10
+
+    # Dense vertices: many lines meeting in one point
+    while len(lines) < count:
+        cx, cy = rng.uniform(0, origin_x), rng.uniform(-500, -100)
+        for k in range(min(star_degree, count - len(lines))):
+            angle = 2 * math.pi * k / star_degree
+            lines.append(msp.add_line((cx, cy), (cx + 20 * math.cos(angle), cy + 20 * math.sin(angle))))
+    return lines[:count]
+
+
+def time_call(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--star-degree", type=int, default=256)
+    parser.add_argument("--tolerance", type=float, default=1e-3)
+    parser.add_argument("--max-legacy", type=int, default=100000,
+                        help="Skip the old implementation above this size")
+    args = parser.parse_args()
+
+    print(f"{'lines':>9} {'old [s]':>9} {'new [s]':>9} {'speedup':>8} {'old chains':>11} {'new chains':>11}")
+    for size in args.sizes:
+        lines = make_lines(size, args.star_degree, args.tolerance)
+        new_time, new_chains = time_call(EdgeConnectivityAnalyzer(args.tolerance).group_connected_edges, lines)
+        if size <= args.max_legacy:
+            old_time, old_chains = time_call(LegacyEdgeConnectivityAnalyzer(args.tolerance).group_connected_edges, lines)
+            print(f"{size:>9} {old_time:>9.3f} {new_time:>9.3f} {old_time / new_time:>7.1f}x "
+                  f"{len(old_chains):>11} {len(new_chains):>11}")
+        else:
+            print(f"{size:>9} {'-':>9} {new_time:>9.3f} {'-':>8} {'-':>11} {len(new_chains):>11}")
+
+
+if __name__ == "__main__":
+    main()
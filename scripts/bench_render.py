@@ -0,0 +1,82 @@
+# scripts/bench_render.py
+"""Benchmark: SVG rendering with the native ezdxf backend vs. Matplotlib.
+
+Renders DXF drawings (by default the step2_with_dims.dxf files of a batch run of
+the bundled input/*.step parts) onto a template with both backends of
+dxf_render_svg.py. Every render runs in a fresh interpreter, so the import cost
+of the backend (matplotlib in particular) is part of the measurement.
+
+Usage:
+    python /app/scripts/bench_render.py template_A3.svg [drawing.dxf ...] [--repeat 3]
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from pipeline_config import TEMPLATE_DIR, output_dir
+
+BACKENDS = ("native", "matplotlib")
+
+
+def worker(backend, dxf_path, template_path, svg_path):
+    """Runs in the child interpreter: import, load, render, report timings as JSON."""
+    start = time.perf_counter()
+    import ezdxf
+    from dxf_render_svg import render_svg
+    if backend == "matplotlib":
+        import matplotlib.pyplot  # the fallback imports it lazily, count it as import time
+    import_time = time.perf_counter() - start
+
+    doc = ezdxf.readfile(dxf_path)
+    start = time.perf_counter()
+    render_svg(doc, template_path, svg_path, backend)
+    render_time = time.perf_counter() - start
+    print(json.dumps({'import': import_time, 'render': render_time}))
+
+
+def run_worker(backend, dxf_path, template_path, svg_path):
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", backend,
+                             dxf_path, template_path, svg_path],
+                            check=True, capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings['total'] = time.perf_counter() - start
+    return timings
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--worker":
+        worker(*sys.argv[2:6])
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("template", help="Template file (name inside /app/templates or a path)")
+    parser.add_argument("drawings", nargs="*", help="DXF files (default: output/batch/*/step2_with_dims.dxf)")
+    parser.add_argument("--repeat", type=int, default=3, help="Best of N runs")
+    args = parser.parse_args()
+
+    template_path = args.template if os.path.exists(args.template) else os.path.join(TEMPLATE_DIR, args.template)
+    drawings = args.drawings or sorted(glob.glob(os.path.join(output_dir(), "batch", "*", "step2_with_dims.dxf")))
+    if not drawings:
+        sys.exit("ERROR: No drawings found, run a batch over input/*.step first or pass DXF files.")
+
+    print(f"{'drawing':<28} {'backend':<11} {'import [s]':>10} {'render [s]':>10} {'total [s]':>9} {'SVG [kB]':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for dxf_path in drawings:
+            name = os.path.basename(os.path.dirname(dxf_path)) or os.path.basename(dxf_path)
+            for backend in BACKENDS:
+                svg_path = os.path.join(tmp, f"{backend}.svg")
+                runs = [run_worker(backend, dxf_path, template_path, svg_path) for _ in range(args.repeat)]
+                best = min(runs, key=lambda t: t['total'])
+                size = os.path.getsize(svg_path) / 1024
+                print(f"{name[:28]:<28} {backend:<11} {best['import']:>10.3f} {best['render']:>10.3f} "
+                      f"{best['total']:>9.3f} {size:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
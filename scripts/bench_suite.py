@@ -0,0 +1,380 @@
+# scripts/bench_suite.py
+"""Benchmark suite: every pipeline stage timed on its own, with peak memory.
+
+Stages (see STAGES): read (ezdxf.readfile), assembler, normalize, classify
+(GeometryClassifier), connectivity (EdgeConnectivityAnalyzer), dimension
+(SmartDimensioner plan + render), render (ezdxf SVG backend), merge (template
+write) and preview. Every stage runs on every fixture in a fresh interpreter:
+the fixture is loaded and prepared first, then the stage is timed (best of
+--repeat runs) and its memory taken from the peak RSS before and after it.
+
+Fixtures:
+- step_<name>.dxf: the projections of input/*.step, made once with FreeCAD
+  (PARALLEL_VIEWS, so they carry the VIEW_* blocks of dxf_assembler.py); skipped
+  where freecadcmd is not available.
+- synthetic_<n>_s<seed>_v<version>.dxf: multi-view drawings with n
+  LINE/CIRCLE/ARC entities from synthetic_drawing.py for the scaling curves
+  (--sizes, default 1k to 1M; --seed).
+Both are kept in /app/cache/bench/fixtures and reused.
+
+The results are written as JSON (--output, default output/bench_results.json)
+and compared against the stored baseline (--baseline, default
+/app/cache/bench/baseline.json). Stages slower or bigger than the baseline by
+more than --threshold are reported and the exit code is 1. --save-baseline
+stores the current results as the new baseline.
+
+Usage:
+    python /app/scripts/bench_suite.py [--stages classify dimension] [--sizes 1000 100000]
+                                       [--no-step] [--repeat 3] [--timeout 900]
+                                       [--baseline FILE] [--save-baseline] [--threshold 0.25]
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from pipeline_config import DEFAULT_CONFIG, INPUT_DIR, TEMPLATE_DIR, output_path, stage_env
+
+BENCH_DIR = "/app/cache/bench"
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+DEFAULT_TEMPLATE = "template_A3.svg"
+
+# Fixtures at least this large are timed once instead of --repeat times
+SINGLE_RUN_ENTITIES = 100000
+# Differences below these are noise, whatever the ratio
+MIN_SECONDS_DELTA = 0.05
+MIN_RSS_DELTA_MB = 20.0
+
+FALLBACK_TEMPLATE = ('<svg xmlns="http://www.w3.org/2000/svg" width="420mm" height="297mm" viewBox="0 0 420 297">'
+                     '<rect x="10" y="10" width="400" height="277" fill="none" stroke="black"/></svg>\n')
+
+
+# --- Stages (run inside the worker) ---
+# Each setup function prepares one run and returns the callable that is timed.
+
+def _geometry(path):
+    import ezdxf
+    from dxf_add_dim import modelspace_geometry
+    doc = ezdxf.readfile(path)
+    return doc, modelspace_geometry(doc.modelspace())
+
+
+def setup_read(path, work_dir, template):
+    import ezdxf
+    return lambda: ezdxf.readfile(path)
+
+
+def setup_assembler(path, work_dir, template):
+    import dxf_assembler
+    # The view files are split from the fixture once and kept next to it
+    staging = f"{os.path.splitext(path)[0]}_views"
+    if not os.path.isdir(staging):
+        _write_view_files(path, staging)
+    out_dir = os.path.join(work_dir, "assembler")
+    os.makedirs(out_dir, exist_ok=True)
+    for name in os.listdir(staging):
+        shutil.copy(os.path.join(staging, name), out_dir)
+    config_file = os.path.join(work_dir, "config.json")
+    with open(config_file, 'w') as f:
+        json.dump(dict(DEFAULT_CONFIG, TEMPLATE_FILE=DEFAULT_TEMPLATE), f)
+    os.environ.update(stage_env(config_file, out_dir))
+    sys.argv = ["dxf_assembler.py", "--projected"]
+    return dxf_assembler.main
+
+
+def _write_view_files(path, staging):
+    """Splits a fixture into the temp_<VIEW>.dxf files the assembler reads."""
+    import ezdxf
+    _, entities = _geometry(path)
+    docs = {}
+    for entity in entities:
+        layer = entity.dxf.layer
+        if not layer.startswith("VIEW_"):
+            continue
+        doc = docs.setdefault(layer[5:], ezdxf.new())
+        doc.modelspace().add_foreign_entity(entity.copy())
+    if not {"FRONT", "TOP", "RIGHT"} <= set(docs):
+        raise LookupError("fixture has no FRONT/TOP/RIGHT view layers")
+    os.makedirs(f"{staging}.tmp", exist_ok=True)
+    for name, doc in docs.items():
+        doc.saveas(os.path.join(f"{staging}.tmp", f"temp_{name}.dxf"))
+    os.replace(f"{staging}.tmp", staging)
+
+
+def setup_normalize(path, work_dir, template):
+    from dxf_normalizer import normalize_file
+    return lambda: normalize_file(path, os.path.join(work_dir, "normalized.dxf"))
+
+
+def setup_classify(path, work_dir, template):
+    from dxf_add_dim import GeometryClassifier
+    _, entities = _geometry(path)
+    return lambda: GeometryClassifier().classify_by_projection(entities)
+
+
+def setup_connectivity(path, work_dir, template):
+    from dxf_add_dim import EdgeConnectivityAnalyzer
+    _, entities = _geometry(path)
+    lines = [entity for entity in entities if entity.dxftype() == 'LINE']
+    return lambda: EdgeConnectivityAnalyzer().group_connected_edges(lines)
+
+
+def setup_dimension(path, work_dir, template):
+    from dxf_add_dim import GeometryClassifier, SmartDimensioner, build_dimension_config
+    doc, entities = _geometry(path)
+    projections = GeometryClassifier().classify_by_projection(entities)
+    dimension_config = build_dimension_config(DEFAULT_CONFIG)
+
+    def run():
+        dimensioner = SmartDimensioner(doc.modelspace(), dimension_config, dimension_config['standard'])
+        dimensioner.dimension_projections(projections)
+        return dimensioner.render_planned(dimension_config['render_dimensions'])
+    return run
+
+
+def setup_render(path, work_dir, template):
+    import ezdxf
+    from dxf_render_svg import render_native_group
+    from template_cache import load_template
+    doc = ezdxf.readfile(path)
+    compiled = load_template(template)
+    return lambda: render_native_group(doc, compiled.width, compiled.height)
+
+
+def setup_merge(path, work_dir, template):
+    import ezdxf
+    from dxf_render_svg import render_native_group
+    from template_cache import load_template
+    compiled = load_template(template)
+    group = render_native_group(ezdxf.readfile(path), compiled.width, compiled.height)
+    return lambda: load_template(template).write(os.path.join(work_dir, "merged.svg"), group)
+
+
+def setup_preview(path, work_dir, template):
+    import ezdxf
+    from dxf_preview import preview_options, write_preview
+    doc = ezdxf.readfile(path)
+    return lambda: write_preview(doc, os.path.join(work_dir, "preview.png"), preview_options({}))
+
+
+STAGES = {
+    'read': setup_read,
+    'assembler': setup_assembler,
+    'normalize': setup_normalize,
+    'classify': setup_classify,
+    'connectivity': setup_connectivity,
+    'dimension': setup_dimension,
+    'render': setup_render,
+    'merge': setup_merge,
+    'preview': setup_preview,
+}
+
+
+def _peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def worker(stage, path, repeat, template):
+    """Runs in the child interpreter: set up and time one stage, report JSON."""
+    import contextlib
+    import io
+    times = []
+    rss_before = rss_after = None
+    with tempfile.TemporaryDirectory() as work_dir, contextlib.redirect_stdout(io.StringIO()):
+        try:
+            for _ in range(repeat):
+                run = STAGES[stage](path, work_dir, template)
+                if rss_before is None:
+                    rss_before = _peak_rss_mb()
+                start = time.perf_counter()
+                run()
+                times.append(time.perf_counter() - start)
+                if rss_after is None:
+                    rss_after = _peak_rss_mb()
+        except LookupError as e:
+            result = {'status': 'skipped', 'reason': str(e)}
+        else:
+            result = {'status': 'ok', 'seconds': min(times), 'runs': times, 'peak_rss_mb': rss_after,
+                      'stage_rss_mb': rss_after - rss_before}
+    print(json.dumps(result))
+
+
+def run_worker(stage, path, repeat, template, timeout):
+    command = [sys.executable, os.path.abspath(__file__), "--worker", stage, path, str(repeat), template]
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, timeout=timeout,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+    except subprocess.TimeoutExpired:
+        return {'status': 'timeout'}
+    if result.returncode != 0:
+        return {'status': 'failed', 'reason': (result.stderr.strip().splitlines() or ["?"])[-1]}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+# --- Fixtures ---
+
+def synthetic_fixture(fixture_dir, count, seed=0):
+    """Multi-view drawing with `count` LINE/CIRCLE/ARC entities (see synthetic_drawing.py).
+
+    Cached by size, seed and generator version.
+    """
+    from synthetic_drawing import GENERATOR_VERSION, write_drawing
+    path = os.path.join(fixture_dir, f"synthetic_{count}_s{seed}_v{GENERATOR_VERSION}.dxf")
+    if not os.path.exists(path):
+        os.makedirs(fixture_dir, exist_ok=True)
+        write_drawing(f"{path}.tmp", count, seed=seed)
+        os.replace(f"{path}.tmp", path)
+    return path
+
+
+def step_fixtures(fixture_dir):
+    """Projections of input/*.step, made with FreeCAD on first use."""
+    paths = []
+    for step_path in sorted(glob.glob(os.path.join(INPUT_DIR, "*.step"))):
+        name = os.path.splitext(os.path.basename(step_path))[0]
+        path = os.path.join(fixture_dir, f"step_{name}.dxf")
+        if not os.path.exists(path):
+            if shutil.which("freecadcmd") is None:
+                print(f"[WARNING] freecadcmd not found, no fixture for {os.path.basename(step_path)}.")
+                continue
+            if not _project_step(step_path, path):
+                continue
+        paths.append(path)
+    return paths
+
+
+def _project_step(step_path, fixture_path):
+    from pipeline import run_projection_stage
+    with tempfile.TemporaryDirectory() as out_dir:
+        config = dict(DEFAULT_CONFIG, INPUT_FILE=os.path.basename(step_path), TEMPLATE_FILE=DEFAULT_TEMPLATE,
+                      PARALLEL_VIEWS="true")
+        config_file = os.path.join(out_dir, "config.json")
+        with open(config_file, 'w') as f:
+            json.dump(config, f)
+        try:
+            with open(os.path.join(out_dir, "projection.log"), 'w') as log:
+                run_projection_stage(config, config_file, out_dir, stage_env(config_file, out_dir), log)
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"[WARNING] Projection of {os.path.basename(step_path)} failed: {e}")
+            return False
+        os.makedirs(os.path.dirname(fixture_path), exist_ok=True)
+        shutil.copy(os.path.join(out_dir, "step1_from_freecad.dxf"), fixture_path)
+    return True
+
+
+# --- Baseline ---
+
+def compare(results, baseline, threshold):
+    """Returns the regressions of `results` against `baseline` as printable lines."""
+    reference = {(r['stage'], r['fixture']): r for r in baseline.get('results', []) if r.get('status') == 'ok'}
+    regressions = []
+    for result in results:
+        old = reference.get((result['stage'], result['fixture']))
+        if old is None or result.get('status') != 'ok':
+            continue
+        seconds, old_seconds = result['seconds'], old['seconds']
+        if seconds - old_seconds > MIN_SECONDS_DELTA and seconds > old_seconds * (1 + threshold):
+            regressions.append(f"{result['stage']} on {result['fixture']}: {old_seconds:.3f} s -> {seconds:.3f} s")
+        rss, old_rss = result['stage_rss_mb'], old['stage_rss_mb']
+        if rss - old_rss > MIN_RSS_DELTA_MB and rss > old_rss * (1 + threshold):
+            regressions.append(f"{result['stage']} on {result['fixture']}: {old_rss:.0f} MB -> {rss:.0f} MB")
+    return regressions
+
+
+def environment_info():
+    import ezdxf
+    import numpy
+    return {'python': platform.python_version(), 'ezdxf': ezdxf.__version__, 'numpy': numpy.__version__,
+            'machine': platform.machine(), 'cpus': os.cpu_count(),
+            'time': time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--worker":
+        worker(sys.argv[2], sys.argv[3], int(sys.argv[4]), sys.argv[5])
+        return 0
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--sizes", type=int, nargs="*", default=list(DEFAULT_SIZES),
+                        help="Entity counts of the synthetic drawings")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic drawings")
+    parser.add_argument("--no-step", action="store_true", help="Skip the fixtures made from input/*.step")
+    parser.add_argument("--fixture-dir", default=os.path.join(BENCH_DIR, "fixtures"))
+    parser.add_argument("--template", help="Template for render/merge (name inside /app/templates or a path)")
+    parser.add_argument("--repeat", type=int, default=3, help="Best of N runs")
+    parser.add_argument("--timeout", type=float, default=900, help="Seconds per stage and fixture")
+    parser.add_argument("--output", default=output_path("bench_results.json"))
+    parser.add_argument("--baseline", default=os.path.join(BENCH_DIR, "baseline.json"))
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown/growth (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        template = args.template or os.path.join(TEMPLATE_DIR, DEFAULT_TEMPLATE)
+        if not os.path.exists(template):
+            template = os.path.join(TEMPLATE_DIR, template)
+        if not os.path.exists(template):
+            template = os.path.join(tmp, DEFAULT_TEMPLATE)
+            with open(template, 'w') as f:
+                f.write(FALLBACK_TEMPLATE)
+
+        fixtures = [] if args.no_step else step_fixtures(args.fixture_dir)
+        sizes = {}
+        for size in args.sizes:
+            print(f"[INFO] Preparing synthetic fixture with {size} entities...", flush=True)
+            path = synthetic_fixture(args.fixture_dir, size, args.seed)
+            sizes[path] = size
+            fixtures.append(path)
+
+        results = []
+        print(f"{'stage':<13} {'fixture':<26} {'time [s]':>9} {'peak RSS [MB]':>14} {'stage RSS [MB]':>15}")
+        for path in fixtures:
+            fixture = os.path.splitext(os.path.basename(path))[0]
+            repeat = 1 if sizes.get(path, 0) >= SINGLE_RUN_ENTITIES else args.repeat
+            for stage in args.stages:
+                result = {'stage': stage, 'fixture': fixture,
+                          **run_worker(stage, path, repeat, template, args.timeout)}
+                results.append(result)
+                if result['status'] == 'ok':
+                    print(f"{stage:<13} {fixture[:26]:<26} {result['seconds']:>9.3f} "
+                          f"{result['peak_rss_mb']:>14.0f} {result['stage_rss_mb']:>15.0f}", flush=True)
+                else:
+                    print(f"{stage:<13} {fixture[:26]:<26} {result['status']:>9} {result.get('reason', '')}", flush=True)
+
+    report = {'environment': environment_info(), 'results': results}
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ [SUCCESS] Results written to: {args.output}")
+
+    exit_code = 0
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) against {args.baseline}:")
+            for line in regressions:
+                print(f"  {line}")
+            exit_code = 1
+        else:
+            print(f"[INFO] No regressions against {args.baseline}.")
+    else:
+        print(f"[INFO] No baseline at {args.baseline}; use --save-baseline to store one.")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        shutil.copy(args.output, args.baseline)
+        print(f"[INFO] Baseline saved to: {args.baseline}")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,295 @@
+# scripts/dimension_placement.py
+"""Collision-free placement of dimensions for the dimensioning stage.
+
+Every linear dimension used to sit at the same offset, diameters at 45° and
+radii at the arc mid-angle, so on real parts dimensions stacked on top of each
+other and on the geometry. DimensionPlacer keeps the view geometry and the
+footprint (text box, dimension line, extension lines) of every placed dimension
+in a uniform grid index, and gives each new dimension the first candidate
+position whose footprint is clear. A query only visits the grid cells under the
+candidate, so placing n dimensions stays close to linear in n.
+"""
+import math
+from collections import defaultdict
+
+import numpy as np
+
+# Footprint kinds stored in the index
+GEOMETRY, TEXT, DIMLINE, EXTENSION = 'geometry', 'text', 'dimline', 'extension'
+
+# A text box must not touch anything; a dimension line may cross extension lines
+TEXT_BLOCKERS = (GEOMETRY, TEXT, DIMLINE, EXTENSION)
+DIMLINE_BLOCKERS = (GEOMETRY, TEXT, DIMLINE)
+
+CIRCLE_SEGMENTS = 24  # polygon approximation of circles and arcs in the index
+
+
+def _bbox(coords, segment):
+    if segment:
+        x1, y1, x2, y2 = coords
+        return min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)
+    return coords
+
+
+def _boxes_overlap(a, b):
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def _segment_hits_box(seg, box):
+    """Liang-Barsky clipping: True if the segment passes through the box."""
+    x1, y1, x2, y2 = seg
+    dx, dy = x2 - x1, y2 - y1
+    t0, t1 = 0.0, 1.0
+    for p, q in ((-dx, x1 - box[0]), (dx, box[2] - x1), (-dy, y1 - box[1]), (dy, box[3] - y1)):
+        if p == 0:
+            if q < 0:
+                return False
+        else:
+            t = q / p
+            if p < 0:
+                t0 = max(t0, t)
+            else:
+                t1 = min(t1, t)
+            if t0 > t1:
+                return False
+    return True
+
+
+def _segments_cross(a, b):
+    def orient(px, py, qx, qy, rx, ry):
+        return (qx - px) * (ry - py) - (qy - py) * (rx - px)
+    d1 = orient(b[0], b[1], b[2], b[3], a[0], a[1])
+    d2 = orient(b[0], b[1], b[2], b[3], a[2], a[3])
+    d3 = orient(a[0], a[1], a[2], a[3], b[0], b[1])
+    d4 = orient(a[0], a[1], a[2], a[3], b[2], b[3])
+    return d1 * d2 <= 0 and d3 * d4 <= 0
+
+
+def _shapes_overlap(a, a_segment, b, b_segment):
+    if not _boxes_overlap(_bbox(a, a_segment), _bbox(b, b_segment)):
+        return False
+    if a_segment and b_segment:
+        return _segments_cross(a, b)
+    if a_segment:
+        return _segment_hits_box(a, b)
+    if b_segment:
+        return _segment_hits_box(b, a)
+    return True
+
+
+class ShapeIndex:
+    """Uniform grid of boxes and segments answering "does this shape hit anything?"."""
+
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = defaultdict(list)
+        self.shapes = []  # (kind, is_segment, coords)
+
+    def _cells(self, bbox):
+        c = self.cell_size
+        x0, y0 = math.floor(bbox[0] / c), math.floor(bbox[1] / c)
+        x1, y1 = math.floor(bbox[2] / c), math.floor(bbox[3] / c)
+        for i in range(x0, x1 + 1):
+            for j in range(y0, y1 + 1):
+                yield i, j
+
+    def insert(self, kind, coords, segment=False):
+        index = len(self.shapes)
+        self.shapes.append((kind, segment, coords))
+        for cell in self._cells(_bbox(coords, segment)):
+            self.cells[cell].append(index)
+
+    def hits(self, coords, segment=False, kinds=TEXT_BLOCKERS):
+        """True if the shape overlaps a stored shape of one of `kinds`."""
+        seen = set()
+        cells = self.cells
+        for cell in self._cells(_bbox(coords, segment)):
+            for index in cells.get(cell, ()):
+                if index in seen:
+                    continue
+                seen.add(index)
+                kind, other_segment, other = self.shapes[index]
+                if kind in kinds and _shapes_overlap(coords, segment, other, other_segment):
+                    return True
+        return False
+
+
+class DimensionPlacer:
+    """Chooses dimension positions that keep texts and dimension lines clear.
+
+    Candidates are tried in order of drafting preference (outside the view,
+    closest first); the first clear one is taken and its footprint is added to
+    the index. If no candidate is clear, the preferred one is used and counted
+    in `conflicts`.
+    """
+
+    def __init__(self, text_height=2.5, text_gap=0.625, offset=15.0, tiers=4):
+        self.text_height = text_height
+        self.text_gap = text_gap
+        self.offset = offset
+        self.tiers = tiers
+        self.index = ShapeIndex(max(offset, 4 * text_height))
+        self.bbox = None
+        self.placed = 0
+        self.conflicts = 0
+
+    def text_size(self, text):
+        """Approximate width and height of a dimension text including its gap."""
+        return len(text) * 0.8 * self.text_height + 2 * self.text_gap, self.text_height + 2 * self.text_gap
+
+    def add_geometry(self, geometry):
+        """Indexes the lines, circles and arcs of a GeometryArrays view."""
+        for x1, y1, x2, y2 in geometry.lines.tolist():
+            self.index.insert(GEOMETRY, (x1, y1, x2, y2), segment=True)
+        for cx, cy, r in geometry.circles.tolist():
+            self._insert_arc(cx, cy, r, 0.0, 360.0)
+        for cx, cy, r, start, end in geometry.arcs.tolist():
+            self._insert_arc(cx, cy, r, start, end if end > start else end + 360.0)
+
+        boxes = [np.column_stack([np.minimum(geometry.lines[:, 0], geometry.lines[:, 2]),
+                                  np.minimum(geometry.lines[:, 1], geometry.lines[:, 3]),
+                                  np.maximum(geometry.lines[:, 0], geometry.lines[:, 2]),
+                                  np.maximum(geometry.lines[:, 1], geometry.lines[:, 3])])]
+        for arcs in (geometry.circles, geometry.arcs):
+            boxes.append(np.column_stack([arcs[:, 0] - arcs[:, 2], arcs[:, 1] - arcs[:, 2],
+                                          arcs[:, 0] + arcs[:, 2], arcs[:, 1] + arcs[:, 2]]))
+        boxes = np.concatenate(boxes)
+        if len(boxes):
+            self.bbox = (float(boxes[:, 0].min()), float(boxes[:, 1].min()),
+                         float(boxes[:, 2].max()), float(boxes[:, 3].max()))
+
+    def _insert_arc(self, cx, cy, r, start, end):
+        steps = max(2, int(math.ceil(CIRCLE_SEGMENTS * (end - start) / 360.0)))
+        angles = np.radians(np.linspace(start, end, steps + 1))
+        xs, ys = cx + r * np.cos(angles), cy + r * np.sin(angles)
+        for k in range(steps):
+            self.index.insert(GEOMETRY, (xs[k], ys[k], xs[k + 1], ys[k + 1]), segment=True)
+
+    def _text_box(self, x, y, text, direction=(1.0, 0.0)):
+        """Axis-aligned box of a text centred at (x, y) and running along `direction`."""
+        width, height = self.text_size(text)
+        ux, uy = direction
+        half_w = (abs(ux) * width + abs(uy) * height) / 2
+        half_h = (abs(uy) * width + abs(ux) * height) / 2
+        return x - half_w, y - half_h, x + half_w, y + half_h
+
+    def _is_clear(self, text_box, segments):
+        if self.index.hits(text_box, kinds=TEXT_BLOCKERS):
+            return False
+        return not any(self.index.hits(seg, segment=True, kinds=DIMLINE_BLOCKERS) for seg in segments)
+
+    def _commit(self, text_box, dimlines, extensions, clear):
+        self.index.insert(TEXT, text_box)
+        for seg in dimlines:
+            self.index.insert(DIMLINE, seg, segment=True)
+        for seg in extensions:
+            self.index.insert(EXTENSION, seg, segment=True)
+        self.placed += 1
+        if not clear:
+            self.conflicts += 1
+
+    def place_linear(self, p1, p2, text):
+        """Signed distance (left of p1->p2 is positive) for an aligned dimension."""
+        (x1, y1), (x2, y2) = p1, p2
+        length = math.hypot(x2 - x1, y2 - y1)
+        ux, uy = (x2 - x1) / length, (y2 - y1) / length
+        nx, ny = -uy, ux  # left normal
+        mx, my = (x1 + x2) / 2, (y1 + y2) / 2
+
+        # Prefer the side facing away from the view centre
+        sides = (1.0, -1.0)
+        if self.bbox is not None:
+            cx, cy = (self.bbox[0] + self.bbox[2]) / 2, (self.bbox[1] + self.bbox[3]) / 2
+            if nx * (mx - cx) + ny * (my - cy) < 0:
+                sides = (-1.0, 1.0)
+
+        candidates = []
+        for side in sides:
+            distances = [k * self.offset for k in range(1, self.tiers + 1)]
+            if self.bbox is not None:
+                # Rows just outside the view on this side
+                corners = [(self.bbox[0], self.bbox[1]), (self.bbox[2], self.bbox[1]),
+                           (self.bbox[0], self.bbox[3]), (self.bbox[2], self.bbox[3])]
+                to_edge = max(0.0, max(side * (nx * (px - mx) + ny * (py - my)) for px, py in corners))
+                distances += [to_edge + k * self.offset for k in range(1, self.tiers + 1)]
+            candidates += [side * d for d in sorted(set(round(d, 6) for d in distances))]
+
+        footprint = None
+        for distance in candidates:
+            ox, oy = nx * distance, ny * distance
+            dimline = (x1 + ox, y1 + oy, x2 + ox, y2 + oy)
+            text_box = self._text_box(mx + ox, my + oy, text, (ux, uy))
+            extensions = [(x1, y1, x1 + ox, y1 + oy), (x2, y2, x2 + ox, y2 + oy)]
+            if footprint is None:
+                footprint = (distance, text_box, dimline, extensions)
+            if self._is_clear(text_box, [dimline]):
+                self._commit(text_box, [dimline], extensions, True)
+                return distance
+
+        distance, text_box, dimline, extensions = footprint
+        self._commit(text_box, [dimline], extensions, False)
+        return distance
+
+    def place_radial(self, center, radius, text, start_angle=0.0, end_angle=360.0, preferred=45.0):
+        """Text location for a radius/diameter dimension, outside the circle.
+
+        Directions are limited to the arc span from start_angle to end_angle,
+        so the leader always points at the arc.
+        """
+        cx, cy = center
+        span = (end_angle - start_angle) % 360.0 or 360.0
+        steps = 16
+        angles = [preferred] + [start_angle + span * (k + 0.5) / steps for k in range(steps)]
+        angles = [a for a in angles if (a - start_angle) % 360.0 <= span]
+
+        width, _ = self.text_size(text)
+        footprint = None
+        for tier in range(1, self.tiers + 1):
+            distance = radius + tier * self.offset / 2 + width / 2
+            for angle in angles:
+                ux, uy = math.cos(math.radians(angle)), math.sin(math.radians(angle))
+                location = (cx + ux * distance, cy + uy * distance)
+                text_box = self._text_box(location[0], location[1], text)
+                leader = (cx + ux * radius, cy + uy * radius,
+                          cx + ux * (distance - width / 2), cy + uy * (distance - width / 2))
+                if footprint is None:
+                    footprint = (location, text_box, leader)
+                if self._is_clear(text_box, [leader]):
+                    self._commit(text_box, [leader], [], True)
+                    return location
+
+        location, text_box, leader = footprint
+        self._commit(text_box, [leader], [], False)
+        return location
+
+    def place_angular(self, vertex, point1, point2, text):
+        """Location of the dimension arc on the bisector of the two legs."""
+        vx, vy = vertex
+        legs = []
+        for px, py in (point1, point2):
+            length = math.hypot(px - vx, py - vy)
+            legs.append(((px - vx) / length, (py - vy) / length, length))
+        bx, by = legs[0][0] + legs[1][0], legs[0][1] + legs[1][1]
+        norm = math.hypot(bx, by)
+        bx, by = bx / norm, by / norm
+        max_radius = min(legs[0][2], legs[1][2])
+
+        radii = [k * self.offset / 2 for k in range(1, 2 * self.tiers + 1)]
+        radii = [r for r in radii if r <= max_radius] or [max_radius]
+        footprint = None
+        for radius in radii:
+            base = (vx + bx * radius, vy + by * radius)
+            text_box = self._text_box(base[0], base[1], text)
+            # Chord between the legs approximates the dimension arc
+            chord = (vx + legs[0][0] * radius, vy + legs[0][1] * radius,
+                     vx + legs[1][0] * radius, vy + legs[1][1] * radius)
+            if footprint is None:
+                footprint = (base, text_box, chord)
+            # The arc meets both legs by design, only its text must be clear
+            if not self.index.hits(text_box, kinds=TEXT_BLOCKERS):
+                self._commit(text_box, [chord], [], True)
+                return base
+
+        base, text_box, chord = footprint
+        self._commit(text_box, [chord], [], False)
+        return base
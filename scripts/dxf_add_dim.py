@@ -3,11 +3,20 @@ import ezdxf
 import json
 import math
 import sys
+import numpy as np
 from pathlib import Path
+from ezdxf.addons import iterdxf
 from ezdxf.math import Vec2, Vec3
 from ezdxf.tools.standards import setup_dimstyle
 from collections import defaultdict
 from typing import List, Tuple, Dict, Set, Optional
+from pipeline_config import config_flag, dimension_input_name, load_config, output_path
+from tracing import file_size, span
+from dimension_placement import DimensionPlacer
+from dxf_streaming import DxfSplicer, read_geometry
+from hole_patterns import RadiusIndex, find_hole_patterns, group_by_radius
+from geometry_kernel import (GeometryArrays, HORIZONTAL, VERTICAL, OTHER, box_components,
+                             classify_orientations, intersecting_pairs, pairwise_angles)
 
 class StandardDimStyles:
     """Creates standard dimension styles based on ISO and ANSI."""
@@ -62,156 +71,318 @@ class StandardDimStyles:
         
         return dimstyle
 
+class ViewGroup:
+    """Entities of one projection view with their precomputed bounding box."""
+    
+    def __init__(self, name, entities=None, bbox=None, source='cluster', geometry=None):
+        self.name = name
+        self.entities = entities if entities is not None else []
+        self.bbox = bbox  # (min_x, min_y, max_x, max_y) or None if empty
+        self.source = source  # 'layer' or 'cluster'
+        self.geometry = geometry  # GeometryArrays of the view (the only data when streamed)
+    
+    def __len__(self):
+        return len(self.geometry) if self.geometry is not None else len(self.entities)
+    
+    def __iter__(self):
+        return iter(self.entities)
+
 class GeometryClassifier:
-    """Classifies and groups geometric entities by projection view."""
+    """Classifies and groups geometric entities by projection view.
     
-    def __init__(self, tolerance=5.0):
-        self.tolerance = tolerance
+    Uses the VIEW_<NAME> layers written by dxf_assembler.py when present.
+    Otherwise connected geometry is clustered (shared endpoints, then
+    overlapping or nearby bounding boxes) and whole clusters are assigned
+    to views, so a view crossing the page midlines is never split.
+    """
+    
+    VIEW_LAYERS = {'VIEW_FRONT': 'front', 'VIEW_TOP': 'top', 'VIEW_RIGHT': 'right', 'VIEW_ISO': 'iso'}
+    VIEW_NAMES = ('front', 'top', 'right', 'iso')
+    
+    def __init__(self, tolerance=5.0, connect_tolerance=1e-3):
+        self.tolerance = tolerance  # gap below which clusters belong to the same view
+        self.connect_tolerance = connect_tolerance
         
     def classify_by_projection(self, entities):
-        """Classifies entities into projection views based on their spatial location."""
-        projections = {
-            'front': [],
-            'top': [],
-            'right': [],
-            'iso': []
-        }
-        
-        # Calculate bounding box of all entities
-        all_points = []
-        for entity in entities:
-            if entity.dxftype() == 'LINE':
-                all_points.extend([Vec2(entity.dxf.start), Vec2(entity.dxf.end)])
-            elif entity.dxftype() in ['CIRCLE', 'ARC']:
-                center = Vec2(entity.dxf.center)
-                radius = entity.dxf.radius
-                all_points.extend([
-                    Vec2(center.x - radius, center.y - radius),
-                    Vec2(center.x + radius, center.y + radius)
-                ])
-        
-        if not all_points:
-            return projections
-            
-        min_x = min(p.x for p in all_points)
-        max_x = max(p.x for p in all_points)
-        min_y = min(p.y for p in all_points)
-        max_y = max(p.y for p in all_points)
-        
-        # Divide space into regions
-        center_x = (min_x + max_x) / 2
-        center_y = (min_y + max_y) / 2
-        
-        for entity in entities:
-            entity_center = self._get_entity_center(entity)
-            
-            # Classify based on relative position
-            if entity_center.x < center_x and entity_center.y < center_y:
-                projections['front'].append(entity)
-            elif entity_center.x < center_x and entity_center.y > center_y:
-                projections['top'].append(entity)
-            elif entity_center.x > center_x and entity_center.y < center_y:
-                projections['right'].append(entity)
+        """Classifies entities into projection views, returns {name: ViewGroup}."""
+        geometry = GeometryArrays.from_entities(entities)
+        layer_views = np.array([self.VIEW_NAMES.index(self.VIEW_LAYERS[entity.dxf.layer])
+                                if entity.dxf.layer in self.VIEW_LAYERS else -1
+                                for entity in geometry.entities], dtype=np.int8)
+        return self.classify_geometry(geometry, layer_views)
+
+    def classify_geometry(self, geometry, layer_views):
+        """Classifies GeometryArrays rows (line, circle, arc order) into views.
+
+        layer_views holds the VIEW_NAMES index of each row's layer, or -1.
+        Returns {name: ViewGroup}; each ViewGroup carries its GeometryArrays.
+        """
+        if not len(geometry):
+            return {name: ViewGroup(name) for name in self.VIEW_NAMES}
+        
+        bboxes = geometry.entity_bboxes()
+        if (layer_views >= 0).any():
+            labels = self._labels_from_layers(layer_views, bboxes)
+            source = 'layer'
+        else:
+            with span("connectivity") as connectivity:
+                points, owners = geometry.connection_points()
+                labels = self._labels_from_clusters(bboxes, points, owners)
+                connectivity.set(points=len(points))
+            source = 'cluster'
+        
+        n, m = len(geometry.lines), len(geometry.circles)
+        projections = {}
+        for view_index, name in enumerate(self.VIEW_NAMES):
+            members = np.flatnonzero(labels == view_index)
+            if len(members):
+                view_boxes = bboxes[members]
+                bbox = (float(view_boxes[:, 0].min()), float(view_boxes[:, 1].min()),
+                        float(view_boxes[:, 2].max()), float(view_boxes[:, 3].max()))
             else:
-                projections['iso'].append(entity)
-                
+                bbox = None
+            view = geometry.subset(members[members < n], members[(members >= n) & (members < n + m)] - n,
+                                   members[members >= n + m] - n - m)
+            projections[name] = ViewGroup(name, view.entities, bbox, source, view)
         return projections
     
-    def _get_entity_center(self, entity):
-        """Gets the center point of an entity."""
-        if entity.dxftype() == 'LINE':
-            start = Vec2(entity.dxf.start)
-            end = Vec2(entity.dxf.end)
-            return (start + end) / 2
-        elif entity.dxftype() in ['CIRCLE', 'ARC']:
-            return Vec2(entity.dxf.center)
-        return Vec2(0, 0)
+    def _labels_from_layers(self, layer_views, bboxes):
+        """View index per entity from its VIEW_* layer; others join the nearest view."""
+        labels = layer_views.astype(np.int64)
+        unassigned = np.flatnonzero(labels < 0)
+        if len(unassigned):
+            centers = (bboxes[:, 0:2] + bboxes[:, 2:4]) / 2
+            view_centers = {}
+            for view_index in range(len(self.VIEW_NAMES)):
+                members = labels == view_index
+                if members.any():
+                    view_centers[view_index] = centers[members].mean(axis=0)
+            keys = list(view_centers)
+            targets = np.array([view_centers[k] for k in keys])
+            dist = np.linalg.norm(centers[unassigned][:, None, :] - targets[None, :, :], axis=2)
+            labels[unassigned] = np.array(keys)[dist.argmin(axis=1)]
+        return labels
+    
+    def _labels_from_clusters(self, bboxes, points, owners):
+        """View index per entity from spatial clustering of connected geometry."""
+        n = len(bboxes)
+        clusters = UnionFind(n)
+        
+        # 1. Geometry sharing endpoints is connected
+        if len(points):
+            vertex_of, _ = EdgeConnectivityAnalyzer(self.connect_tolerance).snap_points(points.tolist())
+            first_owner = {}
+            for owner, vertex in zip(owners.tolist(), vertex_of):
+                if vertex in first_owner:
+                    clusters.union(owner, first_owner[vertex])
+                else:
+                    first_owner[vertex] = owner
+        
+        # 2. Clusters with overlapping or nearby bounding boxes belong together
+        # (holes inside an outline, text-free gaps in a view); repeat until stable
+        _, group_of = np.unique([clusters.find(i) for i in range(n)], return_inverse=True)
+        while True:
+            group_boxes = self._group_boxes(bboxes, group_of)
+            merged = self._merge_overlapping(group_boxes)
+            if merged.max() + 1 == len(group_boxes):
+                break
+            group_of = merged[group_of]
+        
+        order = np.argsort(group_of, kind='stable')
+        groups = np.split(order, np.flatnonzero(np.diff(group_of[order])) + 1)
+        return self._assign_views(groups, group_boxes, bboxes)
+    
+    @staticmethod
+    def _group_boxes(bboxes, group_of):
+        """Bounding box of every group of entity boxes."""
+        count = int(group_of.max()) + 1
+        boxes = np.empty((count, 4))
+        boxes[:, 0:2] = np.inf
+        boxes[:, 2:4] = -np.inf
+        np.minimum.at(boxes[:, 0], group_of, bboxes[:, 0])
+        np.minimum.at(boxes[:, 1], group_of, bboxes[:, 1])
+        np.maximum.at(boxes[:, 2], group_of, bboxes[:, 2])
+        np.maximum.at(boxes[:, 3], group_of, bboxes[:, 3])
+        return boxes
+
+    def _merge_overlapping(self, boxes):
+        """Merged group index per box, joining boxes whose gap is below the tolerance."""
+        _, merged_of = np.unique(box_components(boxes, margin=self.tolerance / 2), return_inverse=True)
+        return merged_of
+    
+    def _assign_views(self, groups, group_boxes, bboxes):
+        """Names the clusters: the four largest are views, the rest join the nearest."""
+        labels = np.zeros(len(bboxes), dtype=np.int64)
+        areas = (group_boxes[:, 2] - group_boxes[:, 0]) * (group_boxes[:, 3] - group_boxes[:, 1])
+        centers = (group_boxes[:, 0:2] + group_boxes[:, 2:4]) / 2
+        views = np.argsort(-areas, kind='stable')[:len(self.VIEW_NAMES)]
+        
+        # Quadrant of each view cluster around the centre of all geometry:
+        # front lower-left, top upper-left, right lower-right, iso upper-right
+        page_center = (bboxes[:, 0:2].min(axis=0) + bboxes[:, 2:4].max(axis=0)) / 2
+        view_of_group = {}
+        for g in views.tolist():
+            # A lone view (or a lone row/column of views) sits on the centre: front first
+            left = centers[g, 0] <= page_center[0] + self.tolerance
+            low = centers[g, 1] <= page_center[1] + self.tolerance
+            view_of_group[g] = 0 if left and low else 1 if left else 2 if low else 3
+        
+        view_centers = centers[views]
+        for g, members in enumerate(groups):
+            if g not in view_of_group:
+                nearest = views[np.linalg.norm(view_centers - centers[g], axis=1).argmin()]
+                view_of_group[g] = view_of_group[int(nearest)]
+            labels[members] = view_of_group[g]
+        return labels
+
+class UnionFind:
+    """Disjoint-set forest with path halving and union by size."""
+    
+    def __init__(self, size):
+        self.parent = list(range(size))
+        self.size = [1] * size
+    
+    def find(self, i):
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+    
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return root_a
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+        return root_a
+    
+    def groups(self):
+        """Returns the members of every set, ordered by their smallest member."""
+        groups = {}
+        for i in range(len(self.parent)):
+            groups.setdefault(self.find(i), []).append(i)
+        return list(groups.values())
+
+class SpatialHash:
+    """Uniform grid of point buckets with neighbour-cell lookup.
+    
+    The cell size equals the search radius, so a query only has to look at the
+    3x3 block of cells around the query point and still finds points that sit
+    on the other side of a cell boundary.
+    """
+    
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = defaultdict(list)
+    
+    def _cell(self, x, y):
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+    
+    def insert(self, item, x, y):
+        self.cells[self._cell(x, y)].append(item)
+    
+    def nearby(self, x, y):
+        """Yields the items of the cells around (x, y)."""
+        cx, cy = self._cell(x, y)
+        cells = self.cells
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                bucket = cells.get((cx + dx, cy + dy))
+                if bucket:
+                    yield from bucket
 
 class EdgeConnectivityAnalyzer:
     """Analyzes connectivity between edges to handle discrete segments."""
     
+    # Lines continue each other if |cos(angle)| > 0.9 (angle below ~25.8 deg)
+    CONTINUITY_ANGLE = math.acos(0.9)
+    
     def __init__(self, tolerance=1e-3):
         self.tolerance = tolerance
     
+    def snap_points(self, points):
+        """Merges points closer than the tolerance into shared vertices.
+        
+        Returns (vertex index per point, vertex coordinates). Every vertex is
+        stored once in a spatial hash, so dense vertices cost O(1) per point
+        instead of comparing all coincident endpoints with each other.
+        """
+        tol_sq = self.tolerance * self.tolerance
+        grid = SpatialHash(self.tolerance)
+        vertices = []
+        vertex_of = []
+        
+        for x, y in points:
+            found = None
+            for v in grid.nearby(x, y):
+                vx, vy = vertices[v]
+                if (vx - x) ** 2 + (vy - y) ** 2 <= tol_sq:
+                    found = v
+                    break
+            if found is None:
+                found = len(vertices)
+                vertices.append((x, y))
+                grid.insert(found, x, y)
+            vertex_of.append(found)
+        
+        return vertex_of, vertices
+    
     def group_connected_edges(self, lines):
-        """Groups connected lines into chains."""
+        """Groups connected lines into chains.
+        
+        Two lines are linked when they share an endpoint (within the tolerance)
+        and run in the same or opposite direction. Chains are the connected
+        components of those links, built with a union-find in O(n log n).
+        """
         if not lines:
             return []
         
-        # Create connection graph
-        connections = defaultdict(list)
-        endpoints = defaultdict(list)
-        
-        # Map endpoints with indices
-        for i, line in enumerate(lines):
-            start = self._round_point(Vec2(line.dxf.start))
-            end = self._round_point(Vec2(line.dxf.end))
-            
-            endpoints[start].append(i)
-            endpoints[end].append(i)
-        
-        # Create connections
-        for point, line_indices in endpoints.items():
-            for i in line_indices:
-                for j in line_indices:
-                    if i != j:
-                        connections[i].append(j)
-        
-        # Find chains
-        visited = set()
-        chains = []
-        
-        for i, line in enumerate(lines):
-            if i not in visited:
-                chain = self._build_chain(i, lines, connections, visited)
-                if len(chain) > 1:  # Only save chains with > 1 element
-                    chains.append(chain)
-        
-        return chains
-    
-    def _round_point(self, point):
-        """Rounds a point for comparison."""
-        return (round(point.x / self.tolerance) * self.tolerance,
-                round(point.y / self.tolerance) * self.tolerance)
-    
-    def _build_chain(self, start_idx, lines, connections, visited):
-        """Builds a chain from a starting point."""
-        chain = []
-        stack = [start_idx]
-        
-        while stack:
-            current = stack.pop()
-            if current in visited:
-                continue
-                
-            visited.add(current)
-            chain.append(current)
-            
-            # Add unvisited connected lines
-            for neighbor in connections[current]:
-                if neighbor not in visited:
-                    # Check if they form a continuous line
-                    if self._lines_are_continuous(lines[current], lines[neighbor]):
-                        stack.append(neighbor)
-        
-        return chain
-    
-    def _lines_are_continuous(self, line1, line2):
-        """Checks if two lines are continuous (same or nearly same direction)."""
-        # Direction vectors
-        d1 = Vec2(line1.dxf.end) - Vec2(line1.dxf.start)
-        d2 = Vec2(line2.dxf.end) - Vec2(line2.dxf.start)
-        
-        if d1.magnitude < self.tolerance or d2.magnitude < self.tolerance:
-            return False
+        # Extract coordinates and directions once
+        points = []
+        angles = []
+        for line in lines:
+            start, end = line.dxf.start, line.dxf.end
+            points.append((start.x, start.y))
+            points.append((end.x, end.y))
+            dx, dy = end.x - start.x, end.y - start.y
+            if math.hypot(dx, dy) < self.tolerance:
+                angles.append(None)  # degenerate, continues nothing
+            else:
+                angles.append(math.atan2(dy, dx) % math.pi)
         
-        # Normalize
-        d1_norm = d1.normalize()
-        d2_norm = d2.normalize()
+        vertex_of, vertices = self.snap_points(points)
         
-        # Check angle between vectors (allow same or opposite direction)
-        dot_product = abs(d1_norm.dot(d2_norm))
-        return dot_product > 0.9  # cos(~25°)
+        # Lines meeting at each vertex
+        incident = [[] for _ in vertices]
+        for i, angle in enumerate(angles):
+            if angle is None:
+                continue
+            v_start, v_end = vertex_of[2 * i], vertex_of[2 * i + 1]
+            incident[v_start].append((angle, i))
+            if v_end != v_start:
+                incident[v_end].append((angle, i))
+        
+        # Within a vertex, sort by direction: lines within the continuity angle
+        # of each other are then linked through consecutive neighbours only
+        chains = UnionFind(len(lines))
+        limit = self.CONTINUITY_ANGLE
+        for members in incident:
+            if len(members) < 2:
+                continue
+            members.sort()
+            for (a1, i), (a2, j) in zip(members, members[1:]):
+                if a2 - a1 < limit:
+                    chains.union(i, j)
+            # Directions wrap around at 180 degrees
+            (a_first, first), (a_last, last) = members[0], members[-1]
+            if a_first + math.pi - a_last < limit:
+                chains.union(first, last)
+        
+        # Only save chains with > 1 element
+        return [group for group in chains.groups() if len(group) > 1]
     
     def get_chain_total_length(self, chain, lines):
         """Calculates the total length of a chain."""
@@ -232,19 +403,19 @@ class EdgeConnectivityAnalyzer:
         last_line = lines[chain[-1]]
         
         # Find true endpoints of the chain
-        all_points = []
-        point_count = defaultdict(int)
-        
+        points = []
         for idx in chain:
             line = lines[idx]
-            start = self._round_point(Vec2(line.dxf.start))
-            end = self._round_point(Vec2(line.dxf.end))
-            point_count[start] += 1
-            point_count[end] += 1
-            all_points.extend([start, end])
+            points.append((line.dxf.start.x, line.dxf.start.y))
+            points.append((line.dxf.end.x, line.dxf.end.y))
+        vertex_of, vertices = self.snap_points(points)
+        
+        point_count = defaultdict(int)
+        for v in vertex_of:
+            point_count[v] += 1
         
         # Endpoints are points that appear only once
-        endpoints = [point for point, count in point_count.items() if count == 1]
+        endpoints = [vertices[v] for v, count in point_count.items() if count == 1]
         
         if len(endpoints) >= 2:
             return Vec2(endpoints[0]), Vec2(endpoints[1])
@@ -262,8 +433,12 @@ class SmartDimensioner:
         self.tolerance = 1e-6
         self.setup_dimstyles()
         self.dimensioned_features = set()  # Tracks already dimensioned features
-        self.dimensioned_radii = set()        
-        self.dimensioned_diameters = set()
+        self.dimensioned_radii = RadiusIndex(0.2)
+        self.dimensioned_diameters = RadiusIndex(0.2)
+        self.placer = None  # DimensionPlacer of the view being dimensioned
+        self.planned = []  # (factory, label, kwargs) of dimensions to create
+        self.view_planned = 0
+        self.dropped = 0  # dimensions refused by max_dimensions_per_view
 
     def setup_dimstyles(self):
         """Sets up dimension styles based on the chosen standard."""
@@ -277,7 +452,11 @@ class SmartDimensioner:
             self.style_name = "ANSI_STANDARD"
     
     def dimension_projections(self, projections):
-        """Dimensions all orthogonal projections."""
+        """Plans the dimensions of all orthogonal projections.
+        
+        Nothing is added to the modelspace yet; render_planned() creates the
+        planned dimensions afterwards. Returns the number of planned dimensions.
+        """
         dimension_count = 0
         
         # Prioritize dimensioning: Front > Top > Right > Iso
@@ -294,277 +473,244 @@ class SmartDimensioner:
     
     def _dimension_single_projection(self, entities, projection_name):
         """Dimensions a single projection view."""
-        lines = [e for e in entities if e.dxftype() == 'LINE']
-        circles = [e for e in entities if e.dxftype() == 'CIRCLE']
-        arcs = [e for e in entities if e.dxftype() == 'ARC']
-        
+        # Extract all geometry of the view into arrays once
+        geometry = getattr(entities, 'geometry', None)
+        if geometry is None:
+            geometry = GeometryArrays.from_entities(entities)
+        
+        # Placement index of the view: its geometry plus every dimension placed
+        self.placer = DimensionPlacer(
+            text_height=self.dimstyle.dxf.dimtxt,
+            text_gap=self.dimstyle.dxf.dimgap,
+            offset=self.config.get('dimension_offset', 15.0))
+        self.placer.add_geometry(geometry)
+        
+        self.view_planned = 0
         dimension_count = 0
         
         # 1. Dimension horizontal and vertical lines
-        horizontal_lines, vertical_lines, other_lines = self._classify_lines(lines)
+        horizontal_lines, vertical_lines, other_lines = self._classify_lines(geometry)
         
         # Dimension horizontal lines (priority)
         if projection_name in ['front', 'top']:
-            dimension_count += self._dimension_aligned_lines(horizontal_lines, 'horizontal')
+            dimension_count += self._dimension_aligned_lines(geometry, horizontal_lines, 'horizontal')
         
         # Dimension vertical lines
         if projection_name in ['front', 'right']:
-            dimension_count += self._dimension_aligned_lines(vertical_lines, 'vertical')
+            dimension_count += self._dimension_aligned_lines(geometry, vertical_lines, 'vertical')
         
-        # 2. Dimension circles and arcs
+        # 2. Dimension circles and arcs: one "N× Ø d" callout per hole pattern
         if self.config.get('dimension_diameters', True):
-            for circle in circles:
-                self._add_diameter_dimension(circle)
-                dimension_count += 1
+            patterns = find_hole_patterns(geometry.circles)
+            # Sizes dimensioned in an earlier view are skipped; in this view every pattern gets its callout
+            earlier = [self.dimensioned_diameters.find(2 * pattern.radius) is not None for pattern in patterns]
+            for pattern, dimensioned in zip(patterns, earlier):
+                if pattern.count > 1:
+                    print(f"[INFO] Hole pattern in {projection_name.upper()} view: {pattern.describe()}")
+                if dimensioned:
+                    continue
+                cx, cy = self._outermost(pattern.centers)
+                if self._add_diameter_dimension((cx, cy), pattern.radius, pattern.callout()):
+                    dimension_count += 1
         
         if self.config.get('dimension_radii', True):
-            for arc in arcs:
-                self._add_radius_dimension(arc)
-                dimension_count += 1
+            for rows in group_by_radius(geometry.arcs[:, 2], 0.1):
+                cx, cy, radius, start_angle, end_angle = geometry.arcs[rows[0]].tolist()
+                text = f"{len(rows)}× <>" if len(rows) > 1 else "<>"
+                if self._add_radius_dimension((cx, cy), radius, start_angle, end_angle, text):
+                    dimension_count += 1
         
         # 3. Dimension important angles
         if self.config.get('dimension_angles', True):
-            angle_count = self._dimension_angles(other_lines)
+            angle_count = self._dimension_angles(geometry, other_lines)
             dimension_count += angle_count
         
+        if self.placer.conflicts:
+            print(f"[WARNING] {self.placer.conflicts} dimension(s) in {projection_name.upper()} view overlap other items.")
         return dimension_count
     
-    def _classify_lines(self, lines):
-        """Classifies lines by orientation."""
-        horizontal = []
-        vertical = []
-        other = []
-        
-        for line in lines:
-            start = Vec2(line.dxf.start)
-            end = Vec2(line.dxf.end)
-            direction = end - start
-            
-            if abs(direction.y) < self.tolerance:  # Horizontal line
-                horizontal.append(line)
-            elif abs(direction.x) < self.tolerance:  # Vertical line
-                vertical.append(line)
-            else:
-                other.append(line)
-        
-        return horizontal, vertical, other
+    def _outermost(self, centers):
+        """Centre farthest from the view centre, so the callout leader points outwards."""
+        if self.placer.bbox is None or len(centers) == 1:
+            return centers[0].tolist()
+        x0, y0, x1, y1 = self.placer.bbox
+        offsets = centers - ((x0 + x1) / 2, (y0 + y1) / 2)
+        return centers[int(np.argmax(np.hypot(offsets[:, 0], offsets[:, 1])))].tolist()
     
-    def _dimension_aligned_lines(self, lines, orientation):
+    def _classify_lines(self, geometry):
+        """Classifies lines by orientation, returns row indices per class."""
+        classes = classify_orientations(geometry.lines, self.tolerance)
+        return (np.flatnonzero(classes == HORIZONTAL),
+                np.flatnonzero(classes == VERTICAL),
+                np.flatnonzero(classes == OTHER))
+    
+    def _dimension_aligned_lines(self, geometry, indices, orientation):
         """Dimensions aligned lines."""
-        if not lines:
+        if not len(indices):
             return 0
         
+        # Check minimum length for all candidates at once
+        lengths = geometry.line_lengths[indices]
+        keep = lengths >= self.config.get('min_dimension_length', 5.0)
+        indices, lengths = indices[keep], lengths[keep]
+        
         dimension_count = 0
         processed_lengths = set()
         
-        for line in lines:
-            start = Vec2(line.dxf.start)
-            end = Vec2(line.dxf.end)
-            length = (end - start).magnitude
-            
-            # Check minimum length
-            if length < self.config.get('min_dimension_length', 5.0):
-                continue
-            
+        for row, length in zip(indices.tolist(), lengths.tolist()):
             # Avoid duplicate dimensions for the same length
             length_key = round(length, 2)
             if length_key in processed_lengths:
                 continue
             
-            # Calculate dimension placement
-            offset_distance = self.config.get('dimension_offset', 15.0)
-            if orientation == 'horizontal':
-                # Place dimension below the line
-                self._add_aligned_dimension(start, end, -offset_distance)
-            else:
-                # Place dimension to the left of the line
-                self._add_aligned_dimension(start, end, -offset_distance)
-            
-            processed_lengths.add(length_key)
-            dimension_count += 1
+            x1, y1, x2, y2 = geometry.lines[row].tolist()
+            if self._add_aligned_dimension((x1, y1), (x2, y2), f"{length:.2f}"):
+                processed_lengths.add(length_key)
+                dimension_count += 1
         
         return dimension_count
     
-    def _add_aligned_dimension(self, p1, p2, distance):
-        """Adds an aligned dimension."""
-        try:
-            dim = self.msp.add_aligned_dim(
-                p1=(p1.x, p1.y), 
-                p2=(p2.x, p2.y), 
-                distance=distance,
-                dimstyle=self.style_name
-            )
-            dim.render()
-            return dim
-        except Exception as e:
-            print(f"[WARNING] Could not create dimension: {e}")
-            return None
+    def _at_limit(self):
+        """True (and counted as dropped) once the view has max_dimensions_per_view dimensions."""
+        if self.view_planned >= self.config.get('max_dimensions_per_view', 20):
+            self.dropped += 1
+            return True
+        return False
     
-    def _add_diameter_dimension(self, circle):
-        """Adds a diameter dimension, avoiding duplicates."""
-        try:
-            center = Vec2(circle.dxf.center)
-            diameter = 2 * circle.dxf.radius
-            rounded_dia = round(diameter, 1)
-
-            for existing_dia in self.dimensioned_diameters:
-                if abs(existing_dia - rounded_dia) < 0.2:
-                    return None
-
-            self.dimensioned_diameters.add(rounded_dia)
-
-            dim = self.msp.add_diameter_dim(
-                center=(center.x, center.y),
-                radius=circle.dxf.radius,
-                angle=45,
-                dimstyle=self.style_name
-            )   
-            dim.render()
-            return dim
-        except Exception as e:
-            print(f"[WARNING] Could not create diameter dimension: {e}")
-            return None
-
+    def _plan(self, factory, label, **kwargs):
+        """Records a dimension for render_planned(); no entity or block is created yet."""
+        self.planned.append((factory, label, kwargs))
+        self.view_planned += 1
+        return True
+    
+    def render_planned(self, render=True):
+        """Creates the planned DIMENSION entities, with geometry blocks if `render`.
+        
+        Returns the number of dimensions created.
+        """
+        created = 0
+        for factory, label, kwargs in self.planned:
+            try:
+                dim = getattr(self.msp, factory)(dimstyle=self.style_name, **kwargs)
+                if render:
+                    dim.render()
+                else:
+                    # Stores definition points and text location, but no geometry block
+                    dim.render(discard=True)
+                created += 1
+            except Exception as e:
+                print(f"[WARNING] Could not create {label}dimension: {e}")
+        self.planned = []
+        return created
+    
+    def _add_aligned_dimension(self, p1, p2, text):
+        """Plans an aligned dimension on the first clear row outside the line."""
+        if self._at_limit():
+            return False
+        distance = self.placer.place_linear(p1, p2, text)
+        return self._plan('add_aligned_dim', '', p1=p1, p2=p2, distance=distance)
+    
+    def _add_diameter_dimension(self, center, radius, text="<>"):
+        """Plans a diameter dimension; sizes dimensioned in earlier views are skipped by the caller."""
+        diameter = 2 * radius
+        if self._at_limit():
+            return False
+        self.dimensioned_diameters.add(diameter)
 
+        label = text.replace("<>", f"Ø{diameter:.2f}")
+        location = self.placer.place_radial(center, radius, label)
+        return self._plan('add_diameter_dim', 'diameter ', center=center, radius=radius,
+                          location=location, text=text)
     
-    def _add_radius_dimension(self, arc):
-     """Adds a radius dimension, avoiding duplicates by radius value."""
-     try:
-        center = Vec2(arc.dxf.center)
-        radius = arc.dxf.radius
-        rounded_radius = round(radius, 1)
-
-        for existing_radius in self.dimensioned_radii:
-            if abs(existing_radius - rounded_radius) < 0.2:
-                return None  # Duplicate radius already dimensioned
-
-        self.dimensioned_radii.add(rounded_radius)
-
-        angle = (arc.dxf.start_angle + arc.dxf.end_angle) / 2
-        dim = self.msp.add_radius_dim(
-            center=(center.x, center.y),
-            radius=radius,
-            angle=angle,
-            dimstyle=self.style_name
-        )
-        dim.render()
-        return dim
-     except Exception as e:
-        print(f"[WARNING] Could not create radius dimension: {e}")
-        return None
+    def _add_radius_dimension(self, center, radius, start_angle, end_angle, text="<>"):
+     """Plans a radius dimension, avoiding duplicates by radius value."""
+     if self.dimensioned_radii.find(radius) is not None:
+        return False  # Duplicate radius already dimensioned
+
+     if self._at_limit():
+        return False
+     self.dimensioned_radii.add(radius)
+
+     end = end_angle if end_angle > start_angle else end_angle + 360.0
+     label = text.replace("<>", f"R{radius:.2f}")
+     location = self.placer.place_radial(center, radius, label,
+                                         start_angle, end_angle, preferred=(start_angle + end) / 2)
+     return self._plan('add_radius_dim', 'radius ', center=center, radius=radius,
+                       location=location, text=text)
 
     
-    def _dimension_angles(self, lines):
-     """Dimensions important angles, avoiding duplicates."""
-     if len(lines) < 2:
+    def _dimension_angles(self, geometry, indices):
+     """Dimensions important angles, avoiding duplicates.
+
+     Intersections are searched among the oblique lines `indices` of the
+     view. Candidates are ranked by the length of the shorter line: angles
+     between long edges are dimensioned first.
+     """
+     if len(indices) < 2:
         return 0
 
+     first, second, points = intersecting_pairs(
+         geometry.lines, np.asarray(indices, dtype=np.int64), tolerance=self.tolerance)
+
+     angles = pairwise_angles(geometry.lines, first, second)
+     keep = (angles > 10) & (angles < 170)
+     first, second, points, angles = first[keep], second[keep], points[keep], angles[keep]
+
+     significance = np.minimum(geometry.line_lengths[first], geometry.line_lengths[second])
+     order = np.argsort(-significance, kind='stable')
+
      angle_count = 0
-     max_angles = 5
      seen_angles = set()
+     limit = self.config.get('max_dimensions_per_view', 20)
 
-     for i in range(min(len(lines), max_angles)):
-        for j in range(i + 1, min(len(lines), max_angles)):
-            line1, line2 = lines[i], lines[j]
-            intersection = self._find_line_intersection(line1, line2)
-            if intersection:
-                angle = self._calculate_angle_between_lines(line1, line2)
-                rounded = round(angle, 1)
-                if 10 < angle < 170 and rounded not in seen_angles:
-                    if self._add_angular_dimension(line1, line2, intersection):
-                        seen_angles.add(rounded)
-                        angle_count += 1
+     for position, k in enumerate(order.tolist()):
+        if self.view_planned >= limit:
+            # Count the rest as dropped without walking every remaining pair
+            rest = np.unique(np.round(angles[order[position:]], 1))
+            self.dropped += int(np.count_nonzero(~np.isin(rest, list(seen_angles))))
+            break
+        rounded = round(float(angles[k]), 1)
+        if rounded not in seen_angles:
+            if self._add_angular_dimension(geometry.lines[first[k]], geometry.lines[second[k]], points[k]):
+                seen_angles.add(rounded)
+                angle_count += 1
 
      return angle_count
 
     
-    def _find_line_intersection(self, line1, line2):
-        """Finds the intersection point of two lines."""
-        p1 = Vec2(line1.dxf.start)
-        p2 = Vec2(line1.dxf.end)
-        p3 = Vec2(line2.dxf.start)
-        p4 = Vec2(line2.dxf.end)
-        
-        # Direction vectors for each line
-        d1 = p2 - p1
-        d2 = p4 - p3
-        
-        # Check for parallelism
-        det = d1.x * d2.y - d1.y * d2.x
-        if abs(det) < self.tolerance:
-            return None  # Lines are parallel
-        
-        # Calculate intersection parameters
-        dp = p3 - p1
-        t1 = (dp.x * d2.y - dp.y * d2.x) / det
-        t2 = (dp.x * d1.y - dp.y * d1.x) / det
-        
-        # Check if intersection lies on both segments
-        if 0 <= t1 <= 1 and 0 <= t2 <= 1:
-            return p1 + d1 * t1
-        
-        # Check if intersection is near endpoints (within extended tolerance)
-        extended_tolerance = 5.0  # mm
-        if -extended_tolerance <= t1 * d1.magnitude <= d1.magnitude + extended_tolerance and \
-           -extended_tolerance <= t2 * d2.magnitude <= d2.magnitude + extended_tolerance:
-            return p1 + d1 * t1
-            
-        return None
-    
-    def _calculate_angle_between_lines(self, line1, line2):
-        """Calculates the angle between two lines in degrees."""
-        # Direction vectors for each line
-        d1 = Vec2(line1.dxf.end) - Vec2(line1.dxf.start)
-        d2 = Vec2(line2.dxf.end) - Vec2(line2.dxf.start)
-        
-        # Normalize vectors
-        d1_norm = d1.normalize()
-        d2_norm = d2.normalize()
-        
-        # Calculate dot product
-        dot_product = d1_norm.dot(d2_norm)
-        
-        # Clamp to avoid floating point errors
-        dot_product = max(-1.0, min(1.0, dot_product))
-        
-        # Calculate angle (radians -> degrees)
-        angle_rad = math.acos(abs(dot_product))
-        angle_deg = math.degrees(angle_rad)
-        
-        return min(angle_deg, 180 - angle_deg)  # Return the smaller angle
-    
     def _add_angular_dimension(self, line1, line2, vertex):
-     """Adds an angular dimension, compatible with ezdxf 0.18 and 0.20."""
+     """Plans an angular dimension between two lines meeting at `vertex`."""
+     if self._at_limit():
+        return False
      try:
-        p1_start, p1_end = Vec2(line1.dxf.start), Vec2(line1.dxf.end)
-        p2_start, p2_end = Vec2(line2.dxf.start), Vec2(line2.dxf.end)
+        vertex = Vec2(vertex)
+        p1_start, p1_end = Vec2(line1[0:2]), Vec2(line1[2:4])
+        p2_start, p2_end = Vec2(line2[0:2]), Vec2(line2[2:4])
 
         # Choose the point furthest from the vertex on each line
         point1 = p1_end if (vertex - p1_end).magnitude > (vertex - p1_start).magnitude else p1_start
         point2 = p2_end if (vertex - p2_end).magnitude > (vertex - p2_start).magnitude else p2_start
 
-        # ✅ Prioritize 'center' first (newer), fallback to 'base' if error
-        try:
-            dim = self.msp.add_angular_dim_3p(
-                center=(vertex.x, vertex.y),
-                p1=(point1.x, point1.y),
-                p2=(point2.x, point2.y),
-                dimstyle=self.style_name
-            )
-        except TypeError:
-            dim = self.msp.add_angular_dim_3p(
-                base=(vertex.x, vertex.y),
-                p1=(point1.x, point1.y),
-                p2=(point2.x, point2.y),
-                dimstyle=self.style_name
-            )
-
-        dim.render()
-        return dim
+        # The angle is measured counter-clockwise from p1 to p2: keep it below 180°
+        if (point1 - vertex).det(point2 - vertex) < 0:
+            point1, point2 = point2, point1
+
+        # Dimension line (arc) location on the bisector of the two legs
+        bisector = (point1 - vertex).normalize() + (point2 - vertex).normalize()
+        if bisector.magnitude < self.tolerance:
+            return False
+        angle = math.degrees((point1 - vertex).angle_between(point2 - vertex))
+        base = Vec2(self.placer.place_angular(vertex, point1, point2, f"{angle:.1f}°"))
 
      except Exception as e:
         print(f"[WARNING] Could not create angular dimension: {e}")
-        return None
+        return False
+
+     return self._plan('add_angular_dim_3p', 'angular ',
+                       base=(base.x, base.y),
+                       center=(vertex.x, vertex.y),
+                       p1=(point1.x, point1.y),
+                       p2=(point2.x, point2.y))
 
 
 class AutoScaler:
@@ -608,61 +754,190 @@ class AutoScaler:
         
         return 0.1  # Smallest scale
 
+def build_dimension_config(config):
+    """Translates the pipeline config into dimensioning options."""
+    return {
+        'dimension_offset': float(config.get('DIMENSION_OFFSET', '15.0')),
+        'text_height': float(config.get('DIMENSION_TEXT_HEIGHT', '2.5')),
+        'min_dimension_length': float(config.get('MIN_DIMENSION_LENGTH', '5.0')),
+        'max_dimensions_per_view': int(config.get('MAX_DIMENSIONS_PER_VIEW', '20')),
+        'dimension_angles': config.get('DIMENSION_ANGLES', 'true').lower() == 'true',
+        'dimension_radii': config.get('DIMENSION_RADII', 'true').lower() == 'true',
+        'dimension_diameters': config.get('DIMENSION_DIAMETERS', 'true').lower() == 'true',
+        'render_dimensions': config.get('RENDER_DIMENSIONS', 'true').lower() == 'true',
+        'standard': config.get('DRAWING_STANDARD', 'ISO')
+    }
+
+GEOMETRY_TYPES = ('LINE', 'CIRCLE', 'ARC')
+
+def modelspace_geometry(msp):
+    """LINE/CIRCLE/ARC entities of the modelspace, block references expanded.
+
+    dxf_assembler.py places every view as an INSERT of a VIEW_<NAME> block and
+    dxf_normalizer.py moves the drawing into a block placed by one INSERT. The
+    virtual entities are in modelspace coordinates; entities on layer 0 take
+    the layer of their INSERT, as in a CAD viewer.
+    """
+    entities = list(msp.query("LINE CIRCLE ARC"))
+    inserts = list(msp.query("INSERT"))
+    while inserts:
+        insert = inserts.pop()
+        for entity in insert.virtual_entities():
+            if entity.dxf.layer == '0':
+                entity.dxf.layer = insert.dxf.layer
+            dxftype = entity.dxftype()
+            if dxftype == 'INSERT':
+                inserts.append(entity)
+            elif dxftype in GEOMETRY_TYPES:
+                entities.append(entity)
+    return entities
+
+def add_dimensions(doc, config):
+    """Adds dimensions to the modelspace of `doc` in place.
+
+    Returns the number of dimensions, or None if there was nothing to dimension.
+    """
+    # Dimension configuration
+    dimension_config = build_dimension_config(config)
+    
+    print(f"[INFO] Using standard: {dimension_config['standard']}")
+    
+    msp = doc.modelspace()
+    
+    # Get all entities
+    all_entities = modelspace_geometry(msp)
+    print(f"[INFO] Found {len(all_entities)} geometric entities.")
+    
+    if not all_entities:
+        print("[WARNING] No entities found to dimension.")
+        return None
+    
+    # Classify by projection
+    with span("classify", entities=len(all_entities)):
+        projections = GeometryClassifier().classify_by_projection(all_entities)
+    
+    for proj_name, view in projections.items():
+        bbox = "" if view.bbox is None else " bbox ({:.1f}, {:.1f})-({:.1f}, {:.1f})".format(*view.bbox)
+        print(f"[INFO] Classified {len(view)} entities in {proj_name.upper()} view ({view.source}){bbox}.")
+    
+    # Perform smart dimensioning: plan all views first, then create the survivors
+    dimensioner = SmartDimensioner(msp, dimension_config, dimension_config['standard'])
+    blocks_before = len(doc.blocks)
+    with span("dimension_plan") as plan:
+        planned = dimensioner.dimension_projections(projections)
+        plan.set(planned=planned, dropped=dimensioner.dropped)
+    
+    with span("dimension_render", rendered=dimension_config['render_dimensions']) as render:
+        total_dimensions = dimensioner.render_planned(dimension_config['render_dimensions'])
+        render.set(dimensions=total_dimensions, blocks=len(doc.blocks) - blocks_before)
+    
+    print(f"[INFO] Planned {planned} dimensions in {plan.seconds:.3f} s "
+          f"({dimensioner.dropped} dropped over the per-view limit).")
+    if dimension_config['render_dimensions']:
+        print(f"[INFO] Rendered {total_dimensions} dimensions into {len(doc.blocks) - blocks_before} "
+              f"blocks in {render.seconds:.3f} s.")
+    else:
+        print(f"[INFO] Created {total_dimensions} unrendered dimensions in {render.seconds:.3f} s "
+              f"(RENDER_DIMENSIONS=false, the SVG stage renders them).")
+    
+    print(f"✅ [SUCCESS] Added {total_dimensions} dimensions using {dimension_config['standard']} standard.")
+    return total_dimensions
+
+def add_dimensions_streaming(input_dxf, output_dxf, config):
+    """Dimensions a DXF file without loading it as a document.
+
+    The first pass streams the LINE/CIRCLE/ARC geometry into arrays, block
+    references expanded (dxf_streaming.read_geometry). The dimensions are
+    planned as usual and created in a scratch document, rendered into *D
+    blocks unless RENDER_DIMENSIONS is "false". The second pass copies the
+    source file and splices in the dimension style, the blocks and the
+    DIMENSION entities (dxf_streaming.DxfSplicer). Files that cannot be
+    spliced (e.g. DXF R12) are dimensioned in memory instead. Returns the
+    number of dimensions, or None if there was nothing to dimension.
+    """
+    dimension_config = build_dimension_config(config)
+    print(f"[INFO] Using standard: {dimension_config['standard']} (streaming)")
+
+    source = iterdxf.opendxf(input_dxf)
+    try:
+        try:
+            splicer = DxfSplicer(source)
+        except ValueError as e:
+            print(f"[WARNING] {e}: dimensioning in memory instead of streaming.")
+            return add_dimensions_file(input_dxf, output_dxf, config)
+
+        view_of_layer = {layer: GeometryClassifier.VIEW_NAMES.index(view)
+                         for layer, view in GeometryClassifier.VIEW_LAYERS.items()}
+        with span("read_geometry", file=Path(input_dxf).name):
+            geometry, layer_views = read_geometry(source, view_of_layer)
+        print(f"[INFO] Found {len(geometry)} geometric entities.")
+        if not len(geometry):
+            print("[WARNING] No entities found to dimension.")
+            return None
+
+        with span("classify", entities=len(geometry)):
+            projections = GeometryClassifier().classify_geometry(geometry, layer_views)
+        for proj_name, view in projections.items():
+            print(f"[INFO] Classified {len(view)} entities in {proj_name.upper()} view ({view.source}).")
+
+        scratch = splicer.scratch_document()
+        dimensioner = SmartDimensioner(scratch.modelspace(), dimension_config, dimension_config['standard'])
+        with span("dimension_plan") as plan:
+            planned = dimensioner.dimension_projections(projections)
+            plan.set(planned=planned, dropped=dimensioner.dropped)
+        with span("dimension_render", rendered=dimension_config['render_dimensions']) as render:
+            total_dimensions = dimensioner.render_planned(dimension_config['render_dimensions'])
+            render.set(dimensions=total_dimensions)
+        print(f"[INFO] Planned {planned} dimensions ({dimensioner.dropped} dropped over the per-view limit).")
+
+        with span("write_dxf", file=Path(output_dxf).name, streaming=True) as write:
+            try:
+                splicer.write(scratch, output_dxf)
+            except ValueError as e:
+                print(f"[WARNING] {e}: dimensioning in memory instead of streaming.")
+                return add_dimensions_file(input_dxf, output_dxf, config)
+            write.set(bytes_written=file_size(output_dxf))
+    finally:
+        source.close()
+
+    print(f"✅ [SUCCESS] Added {total_dimensions} dimensions using {dimension_config['standard']} standard.")
+    return total_dimensions
+
+def add_dimensions_file(input_dxf, output_dxf, config):
+    """Dimensions `input_dxf` in memory and writes `output_dxf`, see add_dimensions()."""
+    doc = read_dxf(input_dxf)
+    total_dimensions = add_dimensions(doc, config)
+    if total_dimensions is not None:
+        write_dxf(doc, output_dxf)
+    return total_dimensions
+
+def read_dxf(path):
+    with span("read_dxf", file=Path(path).name):
+        return ezdxf.readfile(path)
+
+def write_dxf(doc, path):
+    with span("write_dxf", file=Path(path).name) as write:
+        doc.saveas(path)
+        write.set(bytes_written=file_size(path))
+
 def main():
     """Main function with enhanced dimensioning."""
     print("=== Enhanced DXF Dimensioning System ===")
     
-    INPUT_DXF = "/app/output/step1_from_freecad.dxf"
-    OUTPUT_DXF = "/app/output/step2_with_dims.dxf"
-    CONFIG_PATH = "/app/config.json"
+    OUTPUT_DXF = output_path("step2_with_dims.dxf")
     
     try:
         # Load configuration
-        with open(CONFIG_PATH) as f:
-            config = json.load(f)
-        
-        # Dimension configuration
-        dimension_config = {
-            'dimension_offset': float(config.get('DIMENSION_OFFSET', '15.0')),
-            'text_height': float(config.get('DIMENSION_TEXT_HEIGHT', '2.5')),
-            'min_dimension_length': float(config.get('MIN_DIMENSION_LENGTH', '5.0')),
-            'max_dimensions_per_view': int(config.get('MAX_DIMENSIONS_PER_VIEW', '20')),
-            'dimension_angles': config.get('DIMENSION_ANGLES', 'true').lower() == 'true',
-            'dimension_radii': config.get('DIMENSION_RADII', 'true').lower() == 'true',
-            'dimension_diameters': config.get('DIMENSION_DIAMETERS', 'true').lower() == 'true',
-            'standard': config.get('DRAWING_STANDARD', 'ISO')
-        }
-        
-        print(f"[INFO] Using standard: {dimension_config['standard']}")
-        
-        # Read DXF file
-        doc = ezdxf.readfile(INPUT_DXF)
-        msp = doc.modelspace()
-        
-        # Get all entities
-        all_entities = list(msp.query("LINE CIRCLE ARC"))
-        print(f"[INFO] Found {len(all_entities)} geometric entities.")
-        
-        if not all_entities:
-            print("[WARNING] No entities found to dimension.")
-            return
+        config = load_config()
+        INPUT_DXF = output_path(dimension_input_name(config))
         
-        # Classify by projection
-        classifier = GeometryClassifier()
-        projections = classifier.classify_by_projection(all_entities)
-        
-        for proj_name, entities in projections.items():
-            print(f"[INFO] Classified {len(entities)} entities in {proj_name.upper()} view.")
-        
-        # Perform smart dimensioning
-        dimensioner = SmartDimensioner(msp, dimension_config, dimension_config['standard'])
-        total_dimensions = dimensioner.dimension_projections(projections)
-        
-        # Save file
-        doc.saveas(OUTPUT_DXF)
+        if config_flag(config, 'STREAMING_DIMENSIONS'):
+            if add_dimensions_streaming(INPUT_DXF, OUTPUT_DXF, config) is not None:
+                print(f"✅ Output file saved to: {OUTPUT_DXF}")
+            return
         
-        print(f"✅ [SUCCESS] Added {total_dimensions} dimensions using {dimension_config['standard']} standard.")
-        print(f"✅ Output file saved to: {OUTPUT_DXF}")
+        if add_dimensions_file(INPUT_DXF, OUTPUT_DXF, config) is not None:
+            print(f"✅ Output file saved to: {OUTPUT_DXF}")
         
     except Exception as e:
         print(f"❌ [ERROR] {e}")
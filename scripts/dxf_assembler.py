@@ -1,15 +1,78 @@
-import ezdxf, os, json, math
-from ezdxf.math import Matrix44, X_AXIS, Y_AXIS
+import ezdxf, os, sys, json, math
+from ezdxf.math import BoundingBox, Matrix44, X_AXIS, Y_AXIS
 from ezdxf.addons import Importer
 from ezdxf.bbox import extents
+from dxf_normalizer import store_extents
+from pipeline_config import load_config, output_dir as pipeline_output_dir, paper_size_name
+from tracing import StageTimer, file_size
+
+def view_rotation(name, projected):
+    """Rotation bringing an unprojected FRONT/RIGHT view into the XY plane, or None."""
+    if projected:
+        return None
+    if name == "FRONT":
+        return Matrix44.axis_rotate(axis=X_AXIS, angle=math.radians(-90))
+    if name == "RIGHT":
+        return Matrix44.axis_rotate(axis=Y_AXIS, angle=math.radians(90))
+    return None
+
+PAGE_SIZES = {"A0": (1189, 841), "A1": (841, 594), "A2": (594, 420), "A3": (420, 297), "A4": (297, 210),
+              "A5": (210, 148)}
+
+def page_size(template_file):
+    """Page width and height (mm) of a template file name such as "template_A3.svg".
+
+    Raises ValueError if the name contains no known paper size.
+    """
+    size_name = paper_size_name(template_file, default=None)
+    if size_name is None:
+        raise ValueError(f"No paper size ({', '.join(PAGE_SIZES)}) in template name: {template_file}")
+    return PAGE_SIZES[size_name]
+
+def view_placement(dims, page_width, page_height, min_spacing):
+    """Lower-left corner of every view on the page, from the (width, height) of each view.
+
+    FRONT is centred with TOP above it and RIGHT beside it; ISO goes to the
+    upper right corner.
+    """
+    block_width = dims["FRONT"][0] + min_spacing + dims["RIGHT"][0]
+    block_height = dims["TOP"][1] + min_spacing + dims["FRONT"][1]
+
+    start_x = (page_width - block_width) / 2
+    start_y = (page_height - block_height) / 2
+
+    placement = {
+        "FRONT": (start_x, start_y),
+        "TOP": (start_x, start_y + dims["FRONT"][1] + min_spacing),
+        "RIGHT": (start_x + dims["FRONT"][0] + min_spacing, start_y),
+    }
+    if "ISO" in dims:
+        placement["ISO"] = (page_width - dims["ISO"][0] - 20, page_height - dims["ISO"][1] - 20)
+    return placement
 
 def main():
+    """
+    Lays the temp_<VIEW>.dxf files out on the page.
+    With --projected the views are already flat 2D projections (as written by
+    freecad_view_worker.py), so the FRONT/RIGHT rotations are skipped.
+
+    Every view is imported once into a VIEW_<NAME> block and placed with an
+    INSERT whose transform composes rotation, normalisation and page placement,
+    so the entities themselves are never transformed.
+    """
     print("--- Starting dxf_assembler.py script (Advanced Layout) ---")
+    projected = "--projected" in sys.argv[1:]
+    timer = StageTimer("Assembler", "step")
     
-    with open("/app/config.json", 'r') as f: config = json.load(f)
+    config = load_config()
     min_spacing = float(config["MIN_SPACING"])
     template_file = config["TEMPLATE_FILE"]
-    output_dir = "/app/output"
+    try:
+        page_width, page_height = page_size(template_file)
+    except ValueError as e:
+        print(f"❌ ERROR: {e}")
+        sys.exit(1)
+    output_dir = pipeline_output_dir()
     
     final_dxf_path = os.path.join(output_dir, "step1_from_freecad.dxf")
     doc = ezdxf.new()
@@ -29,58 +92,53 @@ def main():
             continue
         source_doc = ezdxf.readfile(filepath)
         entities = list(source_doc.modelspace())
-        if name == "FRONT":
-            mat = Matrix44.axis_rotate(axis=X_AXIS, angle=math.radians(-90))
-            for e in entities: e.transform(mat)
-        elif name == "RIGHT":
-            mat = Matrix44.axis_rotate(axis=Y_AXIS, angle=math.radians(90))
-            for e in entities: e.transform(mat)
+        rotation = view_rotation(name, projected)
+        # One bbox pass in source coordinates; the quarter turns map it exactly
         bbox = extents(entities, fast=True)
-        if bbox.has_data:
-            mat_normalize = Matrix44.translate(-bbox.extmin.x, -bbox.extmin.y, -bbox.extmin.z)
-            for e in entities: e.transform(mat_normalize)
-        view_data[name] = {'entities': entities, 'bbox': extents(entities, fast=True)}
+        if rotation is not None and bbox.has_data:
+            bbox = BoundingBox(rotation.transform_vertices(bbox.cube_vertices()))
+        view_data[name] = {'doc': source_doc, 'entities': entities, 'rotation': rotation, 'bbox': bbox}
+
+    timer.lap("read_views", views=len(view_data),
+              entities=sum(len(data['entities']) for data in view_data.values()))
 
     # === FIX: CHECK FOR EXISTENCE OF REQUIRED PROJECTIONS ===
     if "FRONT" not in view_data or "TOP" not in view_data or "RIGHT" not in view_data:
         print("❌ ERROR: Missing one of the main projections (Front, Top, Right). Cannot arrange.")
         sys.exit(1)
 
-    page_sizes = { "A0": (1189, 841), "A1": (841, 594), "A2": (594, 420), "A3": (420, 297), "A4": (297, 210) }
-    page_key = template_file.split('_')[0].upper()
-    page_width, page_height = page_sizes.get(page_key, (594, 420))
-
     dims = {name: (data['bbox'].size.x, data['bbox'].size.y) for name, data in view_data.items()}
-    block_width = dims["FRONT"][0] + min_spacing + dims["RIGHT"][0]
-    block_height = dims["TOP"][1] + min_spacing + dims["FRONT"][1]
-    
-    start_x = (page_width - block_width) / 2
-    start_y = (page_height - block_height) / 2
-
-    mat_front = Matrix44.translate(start_x, start_y, 0)
-    mat_top = Matrix44.translate(start_x, start_y + dims["FRONT"][1] + min_spacing, 0)
-    mat_right = Matrix44.translate(start_x + dims["FRONT"][0] + min_spacing, start_y, 0)
-    
-    # Apply transformation only if projection exists
-    if "FRONT" in view_data:
-        for e in view_data["FRONT"]['entities']: e.transform(mat_front)
-    if "TOP" in view_data:
-        for e in view_data["TOP"]['entities']: e.transform(mat_top)
-    if "RIGHT" in view_data:
-        for e in view_data["RIGHT"]['entities']: e.transform(mat_right)
-    if "ISO" in view_data:
-        mat_iso = Matrix44.translate(page_width - dims["ISO"][0] - 20, page_height - dims["ISO"][1] - 20, 0)
-        for e in view_data["ISO"]['entities']: e.transform(mat_iso)
+    placement = view_placement(dims, page_width, page_height, min_spacing)
 
+    page_bbox = BoundingBox()
     for name, data in view_data.items():
         layer_name = f"VIEW_{name}"
         if layer_name not in doc.layers: doc.layers.new(name=layer_name)
-        for entity in data['entities']:
-            new_entity = entity.copy()
-            new_entity.dxf.layer = layer_name
-            msp.add_entity(new_entity)
 
+        block = doc.blocks.new(name=layer_name)
+        importer = Importer(data['doc'], doc)
+        importer.import_entities(data['entities'], block)
+        importer.finalize()
+        # On the copies: the source document has no VIEW_* layer to import
+        for entity in block:
+            entity.dxf.layer = layer_name
+
+        # rotation -> normalisation to the origin -> page placement, in one matrix
+        bbox = data['bbox']
+        x, y = placement[name]
+        mat = Matrix44.translate(x, y, 0)
+        if bbox.has_data:
+            mat = Matrix44.translate(-bbox.extmin.x, -bbox.extmin.y, -bbox.extmin.z) @ mat
+            page_bbox.extend([(x, y), (x + bbox.size.x, y + bbox.size.y)])
+        if data['rotation'] is not None:
+            mat = data['rotation'] @ mat
+        msp.add_blockref(block.name, (0, 0), dxfattribs={'layer': layer_name}).transform(mat)
+
+    if page_bbox.has_data:
+        store_extents(doc, page_bbox)
+    timer.lap("assemble")
     doc.saveas(final_dxf_path)
+    timer.lap("write_dxf", bytes_written=file_size(final_dxf_path))
     print(f"✅ [SUCCESS] Views assembled into: {final_dxf_path}")
     
     for f in temp_files.values():
@@ -1,69 +1,127 @@
-import ezdxf
+# scripts/dxf_normalizer.py
+"""Moves the drawing origin to the lower-left corner of its bounding box.
+
+Translating every modelspace entity cost a Python loop over the whole drawing.
+The modelspace content is moved into one block instead, placed by a single
+INSERT at minus the bbox minimum. The entities are relinked but not
+transformed; block-aware consumers (the dimension stage, the SVG export, CAD
+viewers) see the drawing at (0,0).
+
+The bounding box is cached in the header ($EXTMIN/$EXTMAX plus the
+PIPELINE_EXTENTS custom property that marks them as current), so later stages
+can reuse it instead of scanning the modelspace again. Custom properties need
+DXF R2004+; older files fall back to a scan.
+"""
 import os
-# Import the entire math module of ezdxf for safe use
-from ezdxf import math
+import sys
+
+import ezdxf
 from ezdxf.bbox import extents
+from ezdxf.math import BoundingBox, Vec3
+
+from pipeline_config import output_path
+from tracing import file_size, span
+
+EXTENTS_PROPERTY = "PIPELINE_EXTENTS"
+NORMALIZED_BLOCK = "NORMALIZED_DRAWING"
+
+
+def cached_extents(doc):
+    """Returns the bounding box cached by store_extents(), or None."""
+    custom_vars = doc.header.custom_vars
+    if not custom_vars.has_tag(EXTENTS_PROPERTY):
+        return None
+    try:
+        min_x, min_y, max_x, max_y = (float(v) for v in custom_vars.get(EXTENTS_PROPERTY).split(","))
+    except ValueError:
+        return None
+    return BoundingBox([(min_x, min_y), (max_x, max_y)])
+
+
+def store_extents(doc, bbox):
+    """Caches `bbox` as the current extents of the modelspace in the header."""
+    doc.header['$EXTMIN'] = (bbox.extmin.x, bbox.extmin.y, bbox.extmin.z)
+    doc.header['$EXTMAX'] = (bbox.extmax.x, bbox.extmax.y, bbox.extmax.z)
+    value = f"{bbox.extmin.x!r},{bbox.extmin.y!r},{bbox.extmax.x!r},{bbox.extmax.y!r}"
+    custom_vars = doc.header.custom_vars
+    if custom_vars.has_tag(EXTENTS_PROPERTY):
+        custom_vars.replace(EXTENTS_PROPERTY, value)
+    else:
+        custom_vars.append(EXTENTS_PROPERTY, value)
+
+
+def drawing_extents(doc):
+    """Cached modelspace extents, computed (and cached) on first use."""
+    bbox = cached_extents(doc)
+    if bbox is None:
+        bbox = extents(doc.modelspace(), fast=True)
+        if bbox.has_data:
+            store_extents(doc, bbox)
+    return bbox
+
+
+def normalize_document(doc):
+    """Moves the bbox minimum of the modelspace to (0,0). Returns the offset or None."""
+    bbox = drawing_extents(doc)
+    if not bbox.has_data:
+        return None
+    offset = Vec3(-bbox.extmin.x, -bbox.extmin.y, 0)
+
+    name, count = NORMALIZED_BLOCK, 1
+    while name in doc.blocks:
+        count += 1
+        name = f"{NORMALIZED_BLOCK}_{count}"
+    block = doc.blocks.new(name)
+
+    # Relink the entities into the block: only the owner handle changes, no
+    # geometry is touched (both layouts are model space, paperspace stays 0)
+    msp = doc.modelspace()
+    entities = list(msp)
+    msp.entity_space.clear()
+    owner, space = block.block_record_handle, block.entity_space
+    for entity in entities:
+        entity.dxf.owner = owner
+        space.add(entity)
+    msp.add_blockref(name, offset)
+
+    store_extents(doc, BoundingBox([bbox.extmin + offset, bbox.extmax + offset]))
+    return offset
+
+
+def normalize_file(input_path, normalized_path):
+    """Normalizes a DXF file, see normalize_document()."""
+    with span("read_dxf", file=os.path.basename(input_path)):
+        doc = ezdxf.readfile(input_path)
+    with span("normalize"):
+        offset = normalize_document(doc)
+    if offset is None:
+        print("[WARNING] Bounding box has no data. Skipping normalization.")
+    else:
+        print(f"[INFO] Calculated translation vector: ({offset.x:.2f}, {offset.y:.2f}), "
+              "applied by one INSERT of the drawing block.")
+    with span("write_dxf", file=os.path.basename(normalized_path)) as write:
+        doc.saveas(normalized_path)
+        write.set(bytes_written=file_size(normalized_path))
+    return offset
+
 
 def main():
-    """
-    Reads a DXF file, calculates the overall bounding box,
-    and translates all entities so that the bottom-left corner is at the origin (0,0).
-    This is a crucial "cleanup" step.
-    """
+    """Normalizes step1_from_freecad.dxf into step1_normalized.dxf."""
     print("--- Starting dxf_normalizer.py script ---")
     
-    input_path = "/app/output/step1_from_freecad.dxf"
+    input_path = output_path("step1_from_freecad.dxf")
     # The output of this script will be the input for the add_dim script
-    output_path = "/app/output/step1_normalized.dxf" 
+    normalized_path = output_path("step1_normalized.dxf")
 
     try:
-        doc = ezdxf.readfile(input_path)
-        msp = doc.modelspace()
+        normalize_file(input_path, normalized_path)
     except IOError:
         print(f"❌ ERROR: Could not read DXF file at: {input_path}. FreeCAD step might have failed.")
         sys.exit(1)
 
-    if len(msp) == 0:
-        print("[WARNING] Input DXF file is empty. Generating an empty normalized file.")
-        doc.saveas(output_path)
-        return
-
-    # Calculate the bounding box of all entities
-    try:
-        bbox = extents(msp, fast=True)
-    except Exception as e:
-        print(f"[WARNING] Could not calculate bounding box: {e}. Skipping normalization.")
-        doc.saveas(output_path)
-        return
-
-    if not bbox.has_data:
-        print("[WARNING] Bounding box has no data. Skipping normalization.")
-        doc.saveas(output_path)
-        return
-
-    # === MAIN LOGIC: CALCULATE AND TRANSLATE ===
-    
-    # Create translation vector to bring the bottom-left corner (extmin) to (0,0,0)
-    # Using ezdxf.math.Vec3() is the safest way
-    translation_vector = math.Vec3(-bbox.extmin.x, -bbox.extmin.y, -bbox.extmin.z)
-    
-    print(f"[INFO] Original bounding box (min): ({bbox.extmin.x:.2f}, {bbox.extmin.y:.2f})")
-    print(f"[INFO] Calculated translation vector: ({translation_vector.x:.2f}, {translation_vector.y:.2f})")
-    
-    # Translate all entities in modelspace
-    for entity in msp:
-        try:
-            entity.translate(translation_vector.x, translation_vector.y, translation_vector.z)
-        except AttributeError:
-            # Skip entities that do not support translation (rare)
-            print(f"[DEBUG] Skipping untranslatable entity: {entity.dxftype()}")
-            continue
-
-    doc.saveas(output_path)
-    print(f"✅ [SUCCESS] File normalized and saved to: {output_path}")
+    print(f"✅ [SUCCESS] File normalized and saved to: {normalized_path}")
 
 if __name__ == "__main__":
-    import sys
     try:
         main()
     except Exception as e:
@@ -0,0 +1,360 @@
+# scripts/dxf_preview.py
+"""Level-of-detail preview (thumbnail) of a drawing, e.g. for a PLM list view.
+
+dxf_render_svg.py draws every entity at full fidelity through the ezdxf drawing
+frontend. A thumbnail only needs what is visible at a few hundred pixels:
+
+- all geometry is reduced to line segments in pixel coordinates with NumPy;
+  block references (the VIEW_* blocks of dxf_assembler.py) are expanded with
+  one matrix per INSERT instead of copying their entities,
+- circles and arcs below PREVIEW_MIN_FEATURE pixels are culled, larger ones are
+  flattened with chords of a few pixels,
+- segment end points are rounded to whole pixels; segments that collapse to a
+  single pixel and segments drawn more than once are dropped (there is no
+  further polyline simplification, chords are already a few pixels long),
+- text, arrows and hatches are skipped; DIMENSION entities, hidden lines (layer
+  or linetype named HIDDEN/DASHED) and chosen layers can be dropped as well.
+
+The thumbnail is written as PNG (Pillow) or as an SVG with a single path.
+DIMENSION entities saved without a geometry block (RENDER_DIMENSIONS "false")
+are rendered first, as in dxf_render_svg.py.
+
+Config keys (pipeline.py writes preview.<format> after the render stage when
+PREVIEW_SIZE is set):
+    PREVIEW_SIZE         longest side of the thumbnail in pixels
+    PREVIEW_FORMAT       "png" (default) or "svg"
+    PREVIEW_MIN_FEATURE  smallest circle/arc diameter drawn, in pixels (default 2)
+    PREVIEW_DIMENSIONS   "false" drops the dimensions
+    PREVIEW_HIDDEN       "false" drops the hidden lines
+    PREVIEW_DROP_LAYERS  comma separated layer names or patterns to drop
+
+Usage:
+    python /app/scripts/dxf_preview.py       (output/step2_with_dims.dxf -> output/preview.<format>)
+    python /app/scripts/dxf_preview.py a.dxf [b.dxf ...] [--out DIR] [--size 256] [--format svg]
+                                       [--min-feature 2] [--no-dimensions] [--no-hidden] [--drop-layers A,B]
+"""
+import argparse
+import fnmatch
+import math
+import os
+import sys
+import time
+
+import ezdxf
+import numpy as np
+from ezdxf import path as ezdxf_path
+from ezdxf.math import OCS
+
+from dxf_render_svg import render_pending_dimensions
+from pipeline_config import config_flag, load_config, output_path, preview_size
+from tracing import file_size, span
+
+HIDDEN_NAMES = ('HIDDEN', 'DASHED')
+CURVE_TYPES = ('LWPOLYLINE', 'POLYLINE', 'SPLINE', 'ELLIPSE')
+
+PADDING_PX = 2
+CHORD_PX = 3.0
+MAX_ARC_SEGMENTS = 64
+DEFAULT_PREVIEW_SIZE = 256
+MAX_PREVIEW_SIZE = 16384
+MAX_BLOCK_DEPTH = 16
+
+
+def preview_options(config):
+    """Preview settings from the PREVIEW_* config keys."""
+    drop_layers = [name.strip() for name in str(config.get('PREVIEW_DROP_LAYERS', '')).split(',') if name.strip()]
+    return {
+        'size': min(preview_size(config) or DEFAULT_PREVIEW_SIZE, MAX_PREVIEW_SIZE),
+        'format': str(config.get('PREVIEW_FORMAT', 'png')).lower(),
+        'min_feature': float(config.get('PREVIEW_MIN_FEATURE', '2')),
+        'dimensions': config_flag(config, 'PREVIEW_DIMENSIONS', 'true'),
+        'hidden': config_flag(config, 'PREVIEW_HIDDEN', 'true'),
+        'drop_layers': drop_layers,
+    }
+
+
+class _BlockGeometry:
+    """Geometry of one layout in its own coordinates, as arrays."""
+
+    def __init__(self):
+        self.lines = []     # (start xyz, end xyz)
+        self.arcs = []      # center (OCS) xyz, radius, start angle, sweep, OCS ux, uy, uz
+        self.paths = []     # ezdxf paths of other curves
+        self.children = []  # (block name, 4x4 matrix, layer) of INSERTs and dimension blocks
+
+    def freeze(self):
+        self.lines = np.array(self.lines, dtype=np.float64).reshape(-1, 2, 3)
+        self.arcs = np.array(self.arcs, dtype=np.float64).reshape(-1, 15)
+        return self
+
+
+def _matrix(m44):
+    return np.array([list(row) for row in m44.rows()], dtype=np.float64)
+
+
+class PreviewBuilder:
+    """Collects the visible segments of a drawing in pixel coordinates."""
+
+    def __init__(self, doc, options):
+        self.doc = doc
+        self.options = options
+        self.drop_layers = options['drop_layers']
+        self.hidden_layers = set()
+        if not options['hidden']:
+            self.hidden_layers = {layer.dxf.name.upper() for layer in doc.layers
+                                  if _is_hidden(layer.dxf.name) or _is_hidden(layer.dxf.get('linetype', ''))}
+        self._blocks = {}
+        self._instances = []  # (geometry, matrix to drawing coordinates)
+
+    def _dropped(self, layer, linetype):
+        if self.drop_layers and any(fnmatch.fnmatch(layer.upper(), p.upper()) for p in self.drop_layers):
+            return True
+        if not self.options['hidden']:
+            return layer.upper() in self.hidden_layers or _is_hidden(linetype)
+        return False
+
+    def _geometry(self, entities, parent_layer):
+        geometry = _BlockGeometry()
+        for entity in entities:
+            dxftype = entity.dxftype()
+            dxf = entity.dxf
+            layer = dxf.get('layer', '0')
+            if layer == '0':
+                layer = parent_layer
+            if self._dropped(layer, dxf.get('linetype', 'BYLAYER')):
+                continue
+            if dxftype == 'LINE':
+                geometry.lines.append((tuple(dxf.start), tuple(dxf.end)))
+            elif dxftype in ('CIRCLE', 'ARC'):
+                ocs = OCS(dxf.extrusion)
+                if dxftype == 'CIRCLE':
+                    start, sweep = 0.0, 360.0
+                else:
+                    start = dxf.start_angle
+                    sweep = (dxf.end_angle - start) % 360.0 or 360.0
+                geometry.arcs.append((*dxf.center, dxf.radius, start, sweep, *ocs.ux, *ocs.uy, *ocs.uz))
+            elif dxftype in CURVE_TYPES:
+                try:
+                    geometry.paths.append(ezdxf_path.make_path(entity))
+                except (TypeError, ValueError):
+                    pass
+            elif dxftype == 'INSERT':
+                geometry.children.append((dxf.name, _matrix(entity.matrix44()), layer))
+            elif dxftype == 'DIMENSION' and self.options['dimensions'] and dxf.get('geometry'):
+                # The geometry block of a dimension is in WCS
+                geometry.children.append((dxf.geometry, np.eye(4), layer))
+        return geometry.freeze()
+
+    def _block(self, name, layer):
+        key = (name, layer)
+        if key not in self._blocks:
+            block = self.doc.blocks.get(name)
+            self._blocks[key] = self._geometry(block if block is not None else [], layer)
+        return self._blocks[key]
+
+    def add_layout(self, layout):
+        """Adds `layout` with its block references expanded, in drawing coordinates."""
+        self._collect(self._geometry(layout, '0'), np.eye(4), 0)
+
+    def _collect(self, geometry, matrix, depth):
+        self._instances.append((geometry, matrix))
+        if depth >= MAX_BLOCK_DEPTH:
+            return
+        for name, child_matrix, layer in geometry.children:
+            self._collect(self._block(name, layer), child_matrix @ matrix, depth + 1)
+
+    def extents(self):
+        """(min xy, max xy) of the collected geometry, or None.
+
+        Computed from the arrays instead of ezdxf.bbox, which would build every
+        entity again; arcs count with their end and quadrant points.
+        """
+        points = []
+        for geometry, matrix in self._instances:
+            if len(geometry.lines):
+                points.append(_transform(geometry.lines.reshape(-1, 3), matrix))
+            if len(geometry.arcs):
+                arcs = geometry.arcs
+                angles = np.concatenate([arcs[:, 4:5], arcs[:, 4:5] + arcs[:, 5:6],
+                                         np.broadcast_to([0.0, 90.0, 180.0, 270.0], (len(arcs), 4))], axis=1)
+                inside = (angles - arcs[:, 4:5]) % 360.0 <= arcs[:, 5:6]
+                inside[:, :2] = True
+                owner, column = np.nonzero(inside)
+                points.append(_transform(_arc_points(arcs[owner], np.radians(angles[owner, column])), matrix))
+            for curve in geometry.paths:
+                vertices = np.array([tuple(v) for v in curve.control_vertices()], dtype=np.float64).reshape(-1, 3)
+                points.append(_transform(vertices, matrix))
+        points = [p for p in points if len(p)]
+        if not points:
+            return None
+        points = np.concatenate(points)
+        return points.min(axis=0), points.max(axis=0)
+
+    def segments(self, page_matrix):
+        """Snapped, de-duplicated segments as an (N, 4) int array of pixel coordinates.
+
+        `page_matrix` maps drawing coordinates to pixels.
+        """
+        chunks = []
+        for geometry, matrix in self._instances:
+            matrix = matrix @ page_matrix
+            px_per_unit = math.sqrt(abs(np.linalg.det(matrix[:2, :2]))) or 1.0
+            if len(geometry.lines):
+                chunks.append(_transform(geometry.lines.reshape(-1, 3), matrix).reshape(-1, 4))
+            if len(geometry.arcs):
+                chunks.append(self._arc_segments(geometry.arcs, matrix, px_per_unit))
+            for curve in geometry.paths:
+                points = np.array([tuple(v) for v in curve.flattening(distance=0.5 / px_per_unit)], dtype=np.float64)
+                if len(points) > 1:
+                    points = _transform(points, matrix)
+                    chunks.append(np.hstack([points[:-1], points[1:]]))
+        if not chunks:
+            return np.zeros((0, 4), dtype=np.int64)
+
+        segments = np.rint(np.concatenate(chunks)).astype(np.int64)
+        segments = segments[(segments[:, 0] != segments[:, 2]) | (segments[:, 1] != segments[:, 3])]
+        # Same segment in either direction -> one key; keep the drawing order
+        flip = (segments[:, 0] > segments[:, 2]) | ((segments[:, 0] == segments[:, 2]) & (segments[:, 1] > segments[:, 3]))
+        canonical = np.clip(np.where(flip[:, None], segments[:, [2, 3, 0, 1]], segments), 0, (1 << 15) - 1)
+        keys = (((canonical[:, 0] << 16 | canonical[:, 1]) << 16 | canonical[:, 2]) << 16) | canonical[:, 3]
+        _, first = np.unique(keys, return_index=True)
+        return segments[np.sort(first)]
+
+    def _arc_segments(self, arcs, matrix, px_per_unit):
+        arcs = arcs[arcs[:, 3] * px_per_unit * 2 >= self.options['min_feature']]
+        if not len(arcs):
+            return np.zeros((0, 4))
+        radius, start, sweep = arcs[:, 3], arcs[:, 4], arcs[:, 5]
+        counts = np.clip(np.ceil(np.radians(sweep) * radius * px_per_unit / CHORD_PX), 2, MAX_ARC_SEGMENTS).astype(np.int64)
+        owner = np.repeat(np.arange(len(arcs)), counts + 1)
+        first = np.cumsum(counts + 1) - (counts + 1)
+        step = np.arange(len(owner)) - first[owner]
+        angle = np.radians(start[owner] + sweep[owner] * step / counts[owner])
+        points = _transform(_arc_points(arcs[owner], angle), matrix)
+        consecutive = owner[:-1] == owner[1:]
+        return np.hstack([points[:-1], points[1:]])[consecutive]
+
+
+def _is_hidden(name):
+    return any(hidden in str(name).upper() for hidden in HIDDEN_NAMES)
+
+
+def _arc_points(arcs, angle):
+    """Points at `angle` (radians) on the arcs (one row per point), in WCS."""
+    x = arcs[:, 0] + arcs[:, 3] * np.cos(angle)
+    y = arcs[:, 1] + arcs[:, 3] * np.sin(angle)
+    return x[:, None] * arcs[:, 6:9] + y[:, None] * arcs[:, 9:12] + arcs[:, 2:3] * arcs[:, 12:15]
+
+
+def _transform(points, matrix):
+    """Applies a row-vector 4x4 matrix to (N, 3) points, returns (N, 2)."""
+    return points @ matrix[:3, :2] + matrix[3, :2]
+
+
+def preview_segments(doc, options):
+    """Returns (segments, width, height) of the thumbnail in pixels."""
+    builder = PreviewBuilder(doc, options)
+    builder.add_layout(doc.modelspace())
+    size = options['size']
+    bounds = builder.extents()
+    if bounds is None:
+        return np.zeros((0, 4), dtype=np.int64), size, size
+    extmin, extmax = bounds
+    d_width, d_height = max(extmax[0] - extmin[0], 1e-9), max(extmax[1] - extmin[1], 1e-9)
+    scale = (size - 2 * PADDING_PX) / max(d_width, d_height)
+    width = int(math.ceil(d_width * scale)) + 2 * PADDING_PX
+    height = int(math.ceil(d_height * scale)) + 2 * PADDING_PX
+
+    # Drawing -> pixels, y pointing down
+    page_matrix = np.eye(4)
+    page_matrix[0, 0], page_matrix[1, 1] = scale, -scale
+    page_matrix[3, 0] = PADDING_PX - extmin[0] * scale
+    page_matrix[3, 1] = height - PADDING_PX + extmin[1] * scale
+    return builder.segments(page_matrix), width, height
+
+
+def write_png(segments, width, height, path):
+    from PIL import Image, ImageDraw
+    image = Image.new('L', (width, height), 255)
+    draw = ImageDraw.Draw(image)
+    for x0, y0, x1, y1 in segments.tolist():
+        draw.line((x0, y0, x1, y1), fill=0)
+    image.save(path, optimize=True)
+
+
+def write_svg(segments, width, height, path):
+    commands = []
+    last = None
+    for x0, y0, x1, y1 in segments.tolist():
+        if last != (x0, y0):
+            commands.append(f"M{x0} {y0}")
+        commands.append(f"L{x1} {y1}")
+        last = (x1, y1)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+                f'viewBox="0 0 {width} {height}"><rect width="100%" height="100%" fill="white"/>'
+                f'<path d="{"".join(commands)}" fill="none" stroke="black" stroke-width="1"/></svg>\n')
+
+
+def write_preview(doc, path, options):
+    """Writes the thumbnail of `doc` to `path`, returns the number of segments drawn."""
+    with span("preview", size=options['size'], format=options['format']) as preview:
+        if options['dimensions']:
+            preview.set(dimensions_rendered=render_pending_dimensions(doc.modelspace()))
+        segments, width, height = preview_segments(doc, options)
+        if options['format'] == 'svg':
+            write_svg(segments, width, height, path)
+        else:
+            write_png(segments, width, height, path)
+        preview.set(segments=len(segments), bytes_written=file_size(path))
+    return len(segments)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("drawings", nargs="*", help="DXF files (default: step2_with_dims.dxf of the current output)")
+    parser.add_argument("--out", help="Output directory (default: next to each drawing)")
+    parser.add_argument("--size", type=int, help="Longest side in pixels")
+    parser.add_argument("--format", choices=("png", "svg"))
+    parser.add_argument("--min-feature", type=float, help="Smallest circle/arc diameter drawn, in pixels")
+    parser.add_argument("--no-dimensions", action="store_true", help="Drop the dimensions")
+    parser.add_argument("--no-hidden", action="store_true", help="Drop the hidden lines")
+    parser.add_argument("--drop-layers", help="Comma separated layer names or patterns to drop")
+    args = parser.parse_args(argv)
+
+    config = {} if args.drawings else load_config()
+    overrides = {'PREVIEW_SIZE': args.size, 'PREVIEW_FORMAT': args.format, 'PREVIEW_MIN_FEATURE': args.min_feature,
+                 'PREVIEW_DROP_LAYERS': args.drop_layers,
+                 'PREVIEW_DIMENSIONS': 'false' if args.no_dimensions else None,
+                 'PREVIEW_HIDDEN': 'false' if args.no_hidden else None}
+    config.update({key: value for key, value in overrides.items() if value is not None})
+    options = preview_options(config)
+
+    if args.drawings:
+        jobs = []
+        for dxf_path in args.drawings:
+            stem = os.path.splitext(os.path.basename(dxf_path))[0]
+            directory = args.out or os.path.dirname(os.path.abspath(dxf_path))
+            jobs.append((dxf_path, os.path.join(directory, f"{stem}_preview.{options['format']}")))
+        if args.out:
+            os.makedirs(args.out, exist_ok=True)
+    else:
+        jobs = [(output_path("step2_with_dims.dxf"), output_path(f"preview.{options['format']}"))]
+
+    failed = 0
+    for dxf_path, preview_path in jobs:
+        start = time.perf_counter()
+        try:
+            with span("read_dxf", file=os.path.basename(dxf_path)):
+                doc = ezdxf.readfile(dxf_path)
+            count = write_preview(doc, preview_path, options)
+        except (IOError, ezdxf.DXFStructureError) as e:
+            print(f"❌ ERROR: Could not preview {dxf_path}: {e}")
+            failed += 1
+            continue
+        print(f"✅ [SUCCESS] Preview ({count} segments, {time.perf_counter() - start:.3f} s) written to: {preview_path}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
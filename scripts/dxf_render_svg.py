@@ -1,5 +1,10 @@
 # scripts/dxf_render_svg.py
 # Hybrid Version - Final and precise Transform fix
+#
+# SVG_BACKEND "native" (default) draws the DXF with ezdxf's own SVG backend,
+# laid out on the template page in millimetres. "matplotlib" keeps the former
+# MatplotlibBackend path, which is also used if the native backend is missing
+# (ezdxf < 1.1). matplotlib is only imported when that path runs.
 
 import os
 import sys
@@ -10,39 +15,93 @@ import ezdxf
 from ezdxf.bbox import extents
 from lxml import etree
 
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
 from ezdxf.addons.drawing import Frontend, RenderContext
-from ezdxf.addons.drawing.matplotlib import MatplotlibBackend
-from ezdxf.addons.drawing.config import Configuration, ColorPolicy
+from ezdxf.addons.drawing.config import Configuration, ColorPolicy, BackgroundPolicy
+try:
+    from ezdxf.addons.drawing import layout, svg
+except ImportError:
+    layout = svg = None
 
+from dxf_normalizer import cached_extents
+from pipeline_config import load_config, output_path
+from template_cache import load_template
+from tracing import file_size, span
 
-def main():
+SVG_NS = 'http://www.w3.org/2000/svg'
+
+# Free border around the drawing, as a fraction of the template size
+PAGE_MARGIN = 0.05
+
+
+def render_pending_dimensions(msp):
+    """Renders DIMENSION entities saved without a geometry block.
+
+    The dimension stage leaves them unrendered with RENDER_DIMENSIONS=false;
+    the drawing frontend would skip them. Returns the number rendered.
     """
-    Combines drawing and template, using the thoroughly fixed transform formula.
+    count = 0
+    for dim in msp.query('DIMENSION'):
+        if dim.get_geometry_block() is None:
+            override = dim.override()
+            if dim.dxf.dimtype & 128:  # user defined text location
+                override.user_location_override(dim.dxf.text_midpoint)
+            override.render()
+            count += 1
+    return count
+
+
+def content_group(**attrib):
+    """The <g> holding the drawing, in the SVG namespace so it serialises on its own."""
+    return etree.Element(f"{{{SVG_NS}}}g", nsmap={None: SVG_NS}, id="FinalDrawingContent", **attrib)
+
+
+def drawing_bbox(doc):
+    """Extents of the modelspace, from the normalizer's cached bbox if present.
+
+    The dimension stage only adds DIMENSION entities, so the cached bbox is
+    extended by those instead of scanning the whole drawing again.
     """
-    print("--- Starting dxf_render_svg.py (Hybrid Version - Final Transform fix) ---")
+    msp = doc.modelspace()
+    if len(msp) == 0:
+        return None
+    bbox = cached_extents(doc)
+    if bbox is None:
+        return extents(msp, fast=True)
+    return bbox.union(extents(msp.query('DIMENSION'), fast=True))
 
-    if len(sys.argv) < 2:
-        sys.exit("ERROR: Missing template file path.")
-    
-    template_path = sys.argv[1]
-    dxf_file_to_read = "/app/output/step2_with_dims.dxf"
-    final_svg_output_path = "/app/output/final_drawing.svg"
 
-    # --- STEP A: Read DXF and get dimensions (width, height) ---
-    try:
-        doc = ezdxf.readfile(dxf_file_to_read)
-        msp = doc.modelspace()
-        bbox = extents(msp, fast=True) if msp and len(msp) > 0 else None
-        if not bbox or not bbox.has_data:
-            print("[WARNING] Modelspace is empty or BBox could not be calculated.")
-            bbox = None
+def render_native_group(doc, t_width, t_height):
+    """Draws the modelspace with ezdxf's SVGBackend into a <g> in template units.
 
-    except Exception as e:
-        print(f"ERROR reading DXF file: {e}")
-        sys.exit(1)
+    The page layout fits the drawing into the template minus PAGE_MARGIN, so no
+    bbox or transform has to be computed here.
+    """
+    print("[INFO] Starting to render views using the ezdxf SVG backend...")
+    config = Configuration.defaults().with_changes(color_policy=ColorPolicy.BLACK,
+                                                   background_policy=BackgroundPolicy.OFF)
+    backend = svg.SVGBackend()
+    Frontend(RenderContext(doc), backend, config=config).draw_layout(doc.modelspace())
+
+    margin_x, margin_y = t_width * PAGE_MARGIN, t_height * PAGE_MARGIN
+    page = layout.Page(t_width, t_height, layout.Units.mm,
+                       margins=layout.Margins(margin_y, margin_x, margin_y, margin_x))
+    drawing_root = etree.fromstring(backend.get_string(page, xml_declaration=False).encode())
+
+    # The backend works in an integer coordinate space spanning the page width
+    view_box = [float(f) for f in drawing_root.get('viewBox').split()]
+    scale = t_width / view_box[2]
+    group = content_group(transform=f"scale({scale:.8f})")
+    for element in drawing_root:
+        group.append(element)
+    return group
+
+
+def render_matplotlib_group(doc, bbox, t_width, t_height):
+    """Draws the modelspace with Matplotlib and fits it into a <g> in template units."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from ezdxf.addons.drawing.matplotlib import MatplotlibBackend
 
     # --- STEP B: Render DXF using Matplotlib (Unchanged) ---
     print("[INFO] Starting to render views using Matplotlib...")
@@ -50,8 +109,8 @@ def main():
         fig, ax = plt.subplots()
         config = Configuration.defaults().with_changes(color_policy=ColorPolicy.BLACK)
         backend = MatplotlibBackend(ax)
-        Frontend(RenderContext(doc), backend, config=config).draw_layout(msp)
-        
+        Frontend(RenderContext(doc), backend, config=config).draw_layout(doc.modelspace())
+
         ax.set_aspect('equal')
         ax.axis('off')
         fig.tight_layout(pad=0)
@@ -63,64 +122,116 @@ def main():
         drawing_svg_string = drawing_buffer.read()
     except Exception as e:
         print(f"ERROR during Matplotlib rendering: {e}")
-        traceback.print_exc()
-        sys.exit(1)
+        raise
+
+    parser = etree.XMLParser(remove_blank_text=True, recover=True)
+    drawing_root = etree.fromstring(drawing_svg_string, parser=parser)
+    final_drawing_group = content_group()
+
+    if bbox:
+        d_width = bbox.size.x if bbox.size.x > 0 else 1.0
+        d_height = bbox.size.y if bbox.size.y > 0 else 1.0
+
+        target_w = t_width * (1 - 2 * PAGE_MARGIN)
+        target_h = t_height * (1 - 2 * PAGE_MARGIN)
+
+        scale = min(target_w / d_width, target_h / d_height)
+        scaled_w = d_width * scale
+        scaled_h = d_height * scale
+
+        # --- CORRECT TRANSFORM FORMULA ---
+        # Assuming the drawing rendered by Matplotlib has been normalized to origin (0,0).
+        # We just need to translate it to the center of the page.
+
+        # Translate X to align the left edge of the drawing to the correct position
+        translate_x = (t_width - scaled_w) / 2
+
+        # Translate Y to align the top edge of the drawing (after flipping) to the correct position
+        translate_y = (t_height - scaled_h) / 2
+        # ---------------------------------
+
+        transform_str = f"translate({translate_x:.4f}, {translate_y:.4f}) scale({scale:.5f}, {scale:.5f})"
+        final_drawing_group.set('transform', transform_str)
+        print(f"[INFO] Applying fixed transform: {transform_str}")
+
+    main_figure_group = drawing_root.find('svg:g', namespaces={'svg': SVG_NS})
+    if main_figure_group is not None:
+        for element in main_figure_group:
+            final_drawing_group.append(element)
+    else:
+        print("[WARNING] No geometry group found in SVG from Matplotlib.")
+    return final_drawing_group
+
+
+def render_svg(doc, template_path, final_svg_output_path, backend="native"):
+    """
+    Combines drawing and template, using the thoroughly fixed transform formula.
+    Takes a loaded ezdxf document, so the dimension stage can hand its live
+    document over without a DXF round-trip. `backend` is "native" or
+    "matplotlib" (see SVG_BACKEND above). Raises on failure.
+    """
+    # --- STEP A: Get dimensions (width, height) ---
+    msp = doc.modelspace()
+    with span("render_dimensions") as deferred:
+        pending = render_pending_dimensions(msp)
+        deferred.set(dimensions=pending)
+    if pending:
+        print(f"[INFO] Rendered {pending} deferred dimensions.")
+
+    if backend == "native" and svg is None:
+        print("[WARNING] ezdxf has no SVG backend, falling back to Matplotlib.")
+        backend = "matplotlib"
 
     # --- STEP C: MERGE VECTOR INTO TEMPLATE WITH FIXED TRANSFORM ---
-    print("[INFO] Starting to merge vector into template...")
     try:
-        parser = etree.XMLParser(remove_blank_text=True, recover=True)
-        template_tree = etree.parse(template_path, parser)
-        template_root = template_tree.getroot()
-        drawing_root = etree.fromstring(drawing_svg_string, parser=parser)
-
-        t_vb_str = template_root.get('viewBox', '0 0 1189 841')
-        t_vb = [float(f) for f in t_vb_str.split()]
-        t_width, t_height = t_vb[2], t_vb[3]
-        
-        final_drawing_group = etree.Element("g", id="FinalDrawingContent")
-
-        if bbox:
-            d_width = bbox.size.x if bbox.size.x > 0 else 1.0
-            d_height = bbox.size.y if bbox.size.y > 0 else 1.0
-
-            margin = 0.05
-            target_w = t_width * (1 - 2 * margin)
-            target_h = t_height * (1 - 2 * margin)
-            
-            scale = min(target_w / d_width, target_h / d_height)
-            scaled_w = d_width * scale
-            scaled_h = d_height * scale
-
-            # --- CORRECT TRANSFORM FORMULA ---
-            # Assuming the drawing rendered by Matplotlib has been normalized to origin (0,0).
-            # We just need to translate it to the center of the page.
-
-            # Translate X to align the left edge of the drawing to the correct position
-            translate_x = (t_width - scaled_w) / 2
-            
-            # Translate Y to align the top edge of the drawing (after flipping) to the correct position
-            translate_y = (t_height - scaled_h) / 2
-            # ---------------------------------
-            
-            transform_str = f"translate({translate_x:.4f}, {translate_y:.4f}) scale({scale:.5f}, {scale:.5f})"
-            final_drawing_group.set('transform', transform_str)
-            print(f"[INFO] Applying fixed transform: {transform_str}")
-
-        NS = {'svg': 'http://www.w3.org/2000/svg'}
-        main_figure_group = drawing_root.find('svg:g', namespaces=NS)
-        if main_figure_group is not None:
-            for element in main_figure_group:
-                final_drawing_group.append(element)
-        else:
-            print("[WARNING] No geometry group found in SVG from Matplotlib.")
-
-        template_root.append(final_drawing_group)
-        template_tree.write(final_svg_output_path, pretty_print=True, xml_declaration=True, encoding='UTF-8')
+        # Parsed once per process; the viewBox and insertion point are cached
+        template = load_template(template_path)
+        t_width, t_height = template.width, template.height
+
+        with span("render", backend=backend, entities=len(msp)):
+            if len(msp) == 0:
+                print("[WARNING] Modelspace is empty, writing the template only.")
+                final_drawing_group = content_group()
+            elif backend == "native":
+                final_drawing_group = render_native_group(doc, t_width, t_height)
+            else:
+                bbox = drawing_bbox(doc)
+                if not bbox or not bbox.has_data:
+                    print("[WARNING] Modelspace is empty or BBox could not be calculated.")
+                    bbox = None
+                final_drawing_group = render_matplotlib_group(doc, bbox, t_width, t_height)
+
+        print("[INFO] Starting to merge vector into template...")
+        with span("merge") as merge:
+            template.write(final_svg_output_path, final_drawing_group)
+            merge.set(bytes_written=file_size(final_svg_output_path))
         print(f"✅ [SUCCESS] Generated complete SVG file at: {final_svg_output_path}")
 
     except Exception as e:
         print(f"ERROR in Step C (SVG Merging): {e}")
+        raise
+
+def main():
+    print("--- Starting dxf_render_svg.py (Hybrid Version - Final Transform fix) ---")
+
+    if len(sys.argv) < 2:
+        sys.exit("ERROR: Missing template file path.")
+    
+    template_path = sys.argv[1]
+    dxf_file_to_read = output_path("step2_with_dims.dxf")
+    final_svg_output_path = output_path("final_drawing.svg")
+
+    try:
+        with span("read_dxf", file=os.path.basename(dxf_file_to_read)):
+            doc = ezdxf.readfile(dxf_file_to_read)
+    except Exception as e:
+        print(f"ERROR reading DXF file: {e}")
+        sys.exit(1)
+
+    try:
+        backend = load_config().get('SVG_BACKEND', 'native')
+        render_svg(doc, template_path, final_svg_output_path, backend)
+    except Exception:
         traceback.print_exc()
         sys.exit(1)
 
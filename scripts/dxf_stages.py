@@ -0,0 +1,83 @@
+# scripts/dxf_stages.py
+"""In-process runner for the ezdxf stages (dimensioning + SVG render/merge).
+
+The separate-script pipeline writes step2_with_dims.dxf in dxf_add_dim.py and
+parses it again in dxf_render_svg.py, each in its own interpreter and each
+re-reading config.json. Here the live ezdxf document is handed from the
+dimensioner straight to the renderer. The intermediate DXF is only written when
+DEBUG_INTERMEDIATE_DXF is "true".
+
+pipeline.py calls run_dxf_stages() directly when IN_PROCESS_DXF_STAGES is
+"true"; the script can also be run standalone:
+    python /app/scripts/dxf_stages.py <template.svg>
+"""
+import os
+import sys
+import traceback
+
+from dxf_add_dim import add_dimensions, add_dimensions_streaming, read_dxf, write_dxf
+from dxf_normalizer import normalize_document, normalize_file
+from dxf_preview import preview_options, write_preview
+from dxf_render_svg import render_svg
+from pipeline_config import config_flag, load_config, output_dir, preview_size
+from tracing import span
+
+
+def run_dxf_stages(config, out_dir, template_path):
+    """Dimensions step1_from_freecad.dxf and renders it onto the template (and the preview)."""
+    input_dxf = os.path.join(out_dir, "step1_from_freecad.dxf")
+    intermediate_dxf = os.path.join(out_dir, "step2_with_dims.dxf")
+    final_svg = os.path.join(out_dir, "final_drawing.svg")
+
+    print("=== In-process DXF stages (dimension -> render) ===")
+    normalize = config_flag(config, 'NORMALIZE_DRAWING')
+    if config_flag(config, 'STREAMING_DIMENSIONS'):
+        # The streaming dimensioner works file to file, the renderer reads its output
+        if normalize:
+            normalized_dxf = os.path.join(out_dir, "step1_normalized.dxf")
+            normalize_file(input_dxf, normalized_dxf)
+            input_dxf = normalized_dxf
+        if add_dimensions_streaming(input_dxf, intermediate_dxf, config) is None:
+            intermediate_dxf = input_dxf
+        doc = read_dxf(intermediate_dxf)
+        render_svg(doc, template_path, final_svg, config.get('SVG_BACKEND', 'native'))
+        write_stage_preview(doc, config, out_dir)
+        return
+
+    doc = read_dxf(input_dxf)
+    if normalize:
+        with span("normalize"):
+            normalize_document(doc)
+    add_dimensions(doc, config)
+
+    if config_flag(config, 'DEBUG_INTERMEDIATE_DXF'):
+        write_dxf(doc, intermediate_dxf)
+        print(f"[DEBUG] Intermediate DXF saved to: {intermediate_dxf}")
+
+    render_svg(doc, template_path, final_svg, config.get('SVG_BACKEND', 'native'))
+    write_stage_preview(doc, config, out_dir)
+
+
+def write_stage_preview(doc, config, out_dir):
+    """Writes preview.<format> of the live document if PREVIEW_SIZE is set."""
+    if not preview_size(config):
+        return
+    options = preview_options(config)
+    preview_path = os.path.join(out_dir, f"preview.{options['format']}")
+    write_preview(doc, preview_path, options)
+    print(f"✅ [SUCCESS] Preview written to: {preview_path}")
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit("ERROR: Missing template file path.")
+
+    try:
+        run_dxf_stages(load_config(), output_dir(), sys.argv[1])
+    except Exception as e:
+        print(f"❌ [ERROR] {e}")
+        traceback.print_exc()
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+# scripts/dxf_streaming.py
+"""Out-of-core access to large ASCII DXF files for the dimension stage.
+
+iterdxf only iterates the ENTITIES section. read_geometry() also streams the
+block definitions, so block references (dxf_assembler.py writes every view as
+an INSERT of a VIEW_<NAME> block) are expanded the way
+Insert.virtual_entities() does it, as NumPy transforms of each block's compact
+LINE/CIRCLE/ARC arrays.
+
+DxfSplicer writes a copy of the source file with the entities of a scratch
+document spliced in: table entries before the ENDTAB of their table, block
+definitions (e.g. the *D geometry blocks of rendered dimensions) at the end of
+BLOCKS and modelspace entities at the end of ENTITIES. The scratch handles
+start above the source $HANDSEED; references to the scratch tables and
+modelspace are redirected to the source ones. Everything else is copied from
+the source in chunks, so the source is never loaded as a whole.
+"""
+import io
+import math
+import re
+from array import array
+
+import ezdxf
+import numpy as np
+from ezdxf.lldxf.tagwriter import TagCollector, TagWriter
+from ezdxf.lldxf.types import DXFTag, is_pointer_code
+
+from geometry_kernel import GeometryArrays
+
+COLUMNS = {'LINE': 4, 'CIRCLE': 3, 'ARC': 5}
+# View code of an entity on layer 0 inside a block: it takes the layer of its INSERT
+INHERIT = -2
+# Deeper block nesting is treated as a reference cycle
+MAX_NESTING = 32
+COPY_CHUNK = 1 << 20
+
+# $HANDSEED (next free handle) in the HEADER section
+HANDSEED_PATTERN = re.compile(rb'(\$HANDSEED\s*\r?\n\s*5\s*\r?\n)([0-9A-Fa-f]+)')
+TABLE_ENTRY_TYPES = ('APPID', 'BLOCK_RECORD', 'DIMSTYLE', 'LAYER', 'LTYPE', 'STYLE', 'UCS', 'VIEW', 'VPORT')
+
+
+def _affine(insert):
+    """3 x 3 affine (row vectors) of an INSERT without the block base point."""
+    m = insert.matrix44()
+    return np.array([[m[0, 0], m[0, 1], 0.0], [m[1, 0], m[1, 1], 0.0], [m[3, 0], m[3, 1], 1.0]])
+
+
+class _EntitySpace:
+    """LINE/CIRCLE/ARC rows, view codes and block references of a block or the modelspace."""
+
+    def __init__(self, base_point=(0.0, 0.0)):
+        self.base_point = base_point
+        self.rows = {dxftype: array('d') for dxftype in COLUMNS}
+        self.views = {dxftype: array('b') for dxftype in COLUMNS}
+        self.inserts = []  # (block name, affine, view code)
+
+    def add(self, entity, code):
+        dxftype = entity.dxftype()
+        dxf = entity.dxf
+        if dxftype == 'INSERT':
+            self.inserts.append((dxf.name.upper(), _affine(entity), code))
+            return
+        if dxftype == 'LINE':
+            start, end = dxf.start, dxf.end
+            self.rows[dxftype].extend((start.x, start.y, end.x, end.y))
+        elif dxftype == 'CIRCLE':
+            center = dxf.center
+            self.rows[dxftype].extend((center.x, center.y, dxf.radius))
+        else:
+            center = dxf.center
+            self.rows[dxftype].extend((center.x, center.y, dxf.radius, dxf.start_angle, dxf.end_angle))
+        self.views[dxftype].append(code)
+
+    def freeze(self):
+        """Turns the rows into (n, columns) arrays once the space is complete."""
+        self.rows = {t: np.frombuffer(rows, dtype=np.float64).reshape(-1, COLUMNS[t]) for t, rows in self.rows.items()}
+        self.views = {t: np.frombuffer(views, dtype=np.int8) for t, views in self.views.items()}
+        return self
+
+
+def _transform(dxftype, rows, affine):
+    """Rows of one entity type in the coordinate system `affine` maps to, or None if not representable."""
+    if dxftype == 'LINE':
+        points = rows.reshape(-1, 2) @ affine[:2, :2] + affine[2, :2]
+        return points.reshape(-1, 4)
+    # Circles and arcs stay circular only under uniform scaling (Insert.virtual_entities
+    # turns them into ellipses otherwise, which are not dimensioned either)
+    x_axis, y_axis = affine[0, :2], affine[1, :2]
+    scale = math.hypot(*x_axis)
+    if not math.isclose(scale, math.hypot(*y_axis), rel_tol=1e-9) or abs(float(x_axis @ y_axis)) > 1e-9 * scale ** 2:
+        return None
+    result = rows.copy()
+    result[:, 0:2] = rows[:, 0:2] @ affine[:2, :2] + affine[2, :2]
+    result[:, 2] = rows[:, 2] * scale
+    if dxftype == 'ARC':
+        rotation = math.degrees(math.atan2(x_axis[1], x_axis[0]))
+        if x_axis[0] * y_axis[1] - x_axis[1] * y_axis[0] > 0:
+            result[:, 3], result[:, 4] = rows[:, 3] + rotation, rows[:, 4] + rotation
+        else:  # mirrored: the arc runs the other way round
+            result[:, 3], result[:, 4] = rotation - rows[:, 4], rotation - rows[:, 3]
+        result[:, 3:5] %= 360.0
+    return result
+
+
+def read_geometry(source, view_of_layer):
+    """LINE/CIRCLE/ARC rows of the modelspace of an iterdxf source, block references expanded.
+
+    `view_of_layer` maps layer names to view codes (others are -1); entities
+    on layer 0 inside a block take the layer of their INSERT. Rows follow the
+    order of dxf_add_dim.modelspace_geometry(): modelspace entities first,
+    then the block references. Returns (GeometryArrays without entities,
+    int8 view code per row).
+    """
+    def code_of(layer, in_block):
+        if in_block and layer == '0':
+            return INHERIT
+        return view_of_layer.get(layer, -1)
+
+    types = [*COLUMNS, 'INSERT']
+    blocks, block = {}, None
+    if 'BLOCKS' in source.sections:
+        for entity in source.load_entities(source.sections['BLOCKS'] + 1, {*types, 'BLOCK', 'ENDBLK'}):
+            dxftype = entity.dxftype()
+            if dxftype == 'BLOCK':
+                block = blocks[entity.dxf.name.upper()] = _EntitySpace(tuple(entity.dxf.base_point)[:2])
+            elif dxftype == 'ENDBLK':
+                if block is not None:
+                    block.freeze()
+                block = None
+            elif block is not None:
+                block.add(entity, code_of(entity.dxf.layer, True))
+
+    modelspace = _EntitySpace()
+    for entity in source.modelspace(types=types):
+        modelspace.add(entity, code_of(entity.dxf.layer, False))
+    modelspace.freeze()
+
+    parts = {dxftype: [modelspace.rows[dxftype]] for dxftype in COLUMNS}
+    codes = {dxftype: [modelspace.views[dxftype]] for dxftype in COLUMNS}
+    # Same traversal as modelspace_geometry(): the last reference first, nested ones next
+    stack = [(name, affine, np.eye(3), code, 0) for name, affine, code in modelspace.inserts]
+    skipped = 0
+    while stack:
+        name, affine, parent, code, depth = stack.pop()
+        block = blocks.get(name)
+        if block is None or depth > MAX_NESTING:
+            continue
+        base = np.eye(3)
+        base[2, :2] = -np.asarray(block.base_point)
+        transform = base @ affine @ parent
+        for dxftype in COLUMNS:
+            if not len(block.rows[dxftype]):
+                continue
+            rows = _transform(dxftype, block.rows[dxftype], transform)
+            if rows is None:
+                skipped += len(block.rows[dxftype])
+                continue
+            parts[dxftype].append(rows)
+            views = block.views[dxftype]
+            codes[dxftype].append(np.where(views == INHERIT, code, views).astype(np.int8))
+        for nested, nested_affine, nested_code in block.inserts:
+            stack.append((nested, nested_affine, transform, code if nested_code == INHERIT else nested_code,
+                          depth + 1))
+    if skipped:
+        print(f"[WARNING] {skipped} circles/arcs in non-uniformly scaled block references were skipped.")
+
+    geometry = GeometryArrays(*(np.concatenate(parts[dxftype]) for dxftype in COLUMNS))
+    layer_views = np.concatenate([np.concatenate(codes[dxftype]) for dxftype in COLUMNS])
+    # Layer 0 entities of a reference on layer 0 belong to no view
+    layer_views[layer_views == INHERIT] = -1
+    return geometry, layer_views
+
+
+def _tag_pairs(data, encoding):
+    lines = data.decode(encoding, errors='surrogateescape').splitlines()
+    return [(int(code), value.strip()) for code, value in zip(lines[0::2], lines[1::2])]
+
+
+class DxfSplicer:
+    """Copies an iterdxf source with the new entities of a scratch document spliced in.
+
+    Raises ValueError for sources it cannot extend (no $HANDSEED, no
+    BLOCK_RECORD table, e.g. DXF R12).
+    """
+
+    def __init__(self, source):
+        self.source = source
+        index = source.structure.index
+        self.index = index
+        for name in ('HEADER', 'TABLES', 'BLOCKS', 'ENTITIES'):
+            if name not in source.sections:
+                raise ValueError(f"No {name} section")
+
+        header_start, header_end = self._section_range('HEADER')
+        header = self._read(index[header_start].location, index[header_end].location)
+        match = HANDSEED_PATTERN.search(header)
+        if match is None:
+            raise ValueError("No $HANDSEED in the header")
+        self.handseed = int(match.group(2), 16)
+        self.handseed_span = (index[header_start].location + match.start(2),
+                              index[header_start].location + match.end(2))
+        self.newline = '\r\n' if b'\r\n' in header else '\n'
+
+        # Table heads and entries: {table: {'handle', 'entries': {NAME: handle}, 'end': ENDTAB offset}}
+        self.tables = {}
+        table = None
+        start, end = self._section_range('TABLES')
+        for i in range(start + 1, end):
+            entry = index[i]
+            if entry.value == 'ENDTAB':
+                table['end'] = entry.location
+                continue
+            tags = _tag_pairs(self._read(entry.location, index[i + 1].location), source.encoding)
+            name = next((value for code, value in tags if code == 2), '')
+            handle = next((value for code, value in tags if code in (5, 105)), None)
+            if entry.value == 'TABLE':
+                table = self.tables[name.upper()] = {'handle': handle, 'entries': {}, 'end': None}
+            elif table is not None:
+                table['entries'][name.upper()] = handle
+        records = self.tables.get('BLOCK_RECORD')
+        if records is None or '*MODEL_SPACE' not in records['entries']:
+            raise ValueError("No BLOCK_RECORD table")
+
+        self.blocks_end = index[self._section_range('BLOCKS')[1]].location
+        self.entities_end = index[self._section_range('ENTITIES')[1]].location
+
+    def _section_range(self, name):
+        """(index of the SECTION entry, index of its ENDSEC entry)."""
+        start = self.source.sections[name]
+        following = [i for i in self.source.sections.values() if i > start]
+        if following:
+            return start, min(following) - 1
+        return start, next(i for i in range(start + 1, len(self.index)) if self.index[i].value == 'ENDSEC')
+
+    def _read(self, begin, end):
+        self.source.file.seek(begin)
+        return self.source.file.read(end - begin)
+
+    def scratch_document(self):
+        """Empty document for the new entities; its new handles are free in the source."""
+        doc = ezdxf.new(self.source.dxfversion)
+        # Anonymous block names of the source stay taken (*D1, *D2, ... of earlier dimensions)
+        for name in self.tables['BLOCK_RECORD']['entries']:
+            if name.startswith('*D'):
+                doc.blocks.new(name)
+        self.reserved = set(doc.entitydb.keys())
+        doc.entitydb.handles.reset('%X' % max(self.handseed, int(str(doc.entitydb.handles), 16)))
+        return doc
+
+    def write(self, doc, output):
+        """Writes the source with the new table entries, blocks and modelspace entities of `doc`.
+
+        Raises ValueError before writing if a new entity refers to a scratch
+        resource the source does not have.
+        """
+        if any(obj.dxf.handle not in self.reserved for obj in doc.objects):
+            raise ValueError("New OBJECTS section entries cannot be spliced")
+        # Exporting can create resources on demand (the arrow blocks of a dimstyle): repeat until none appear
+        while True:
+            count = len(doc.entitydb)
+            table_entries, blocks, entities = self._export(doc)
+            if len(doc.entitydb) == count:
+                break
+
+        splices = [(*self.handseed_span, str(doc.entitydb.handles).encode('ascii'))]
+        splices += [(self.tables[table]['end'], self.tables[table]['end'], self._encode(tags, doc.dxfversion))
+                    for table, tags in table_entries.items()]
+        splices.append((self.blocks_end, self.blocks_end, self._encode(blocks, doc.dxfversion)))
+        splices.append((self.entities_end, self.entities_end, self._encode(entities, doc.dxfversion)))
+        self._copy(output, sorted(splices, key=lambda splice: splice[0]))
+
+    def _export(self, doc):
+        """Tags of the new table entries by table, of the new block definitions and of the modelspace."""
+        reserved = self.reserved
+        redirect = {}
+        for entity in list(doc.entitydb.values()):
+            handle = entity.dxf.handle
+            dxftype = entity.dxftype()
+            if dxftype == 'TABLE' and entity.dxf.name.upper() in self.tables:
+                redirect[handle] = self.tables[entity.dxf.name.upper()]['handle']
+            elif dxftype in TABLE_ENTRY_TYPES:
+                existing = self.tables.get(dxftype, {}).get('entries', {}).get(entity.dxf.name.upper())
+                if existing is not None:
+                    redirect[handle] = existing
+
+        def export(entity, block=False):
+            collector = TagCollector(dxfversion=doc.dxfversion)
+            if block:
+                entity.export_block_definition(collector)
+            else:
+                entity.export_dxf(collector)
+            tags = []
+            for tag in collector.tags:
+                if (is_pointer_code(tag.code) or tag.code == 1005) and tag.value in reserved:
+                    if tag.value not in redirect:
+                        target = doc.entitydb.get(tag.value)
+                        raise ValueError(f"New entities refer to {target.dxftype()} "
+                                         f"{getattr(target.dxf, 'name', tag.value)}, missing in the source")
+                    tag = DXFTag(tag.code, redirect[tag.value])
+                tags.append(tag)
+            return tags
+
+        table_entries, blocks = {}, []
+        for entity in list(doc.entitydb.values()):
+            dxftype = entity.dxftype()
+            if entity.dxf.handle in reserved or entity.dxf.handle in redirect or dxftype not in TABLE_ENTRY_TYPES:
+                continue
+            if self.tables.get(dxftype, {}).get('end') is None:
+                raise ValueError(f"No {dxftype} table")
+            table_entries.setdefault(dxftype, []).extend(export(entity))
+            if dxftype == 'BLOCK_RECORD':
+                blocks.extend(export(entity, block=True))
+        entities = [tag for entity in doc.modelspace() for tag in export(entity)]
+        return table_entries, blocks, entities
+
+    def _encode(self, tags, dxfversion):
+        text = io.StringIO()
+        writer = TagWriter(text, dxfversion)
+        for tag in tags:
+            writer.write_tag(tag)
+        return text.getvalue().replace('\n', self.newline).encode(self.source.encoding, errors='dxfreplace')
+
+    def _copy(self, output, splices):
+        """Copies the source to `output`, replacing each (begin, end) byte range by its data."""
+        position = 0
+        with open(output, 'wb') as out:
+            for begin, end, data in splices:
+                self._copy_range(out, position, begin)
+                out.write(data)
+                position = end
+            self._copy_range(out, position, None)
+
+    def _copy_range(self, out, begin, end):
+        """Copies source bytes begin..end (None: to the end of the file) in chunks."""
+        source = self.source.file
+        source.seek(begin)
+        remaining = math.inf if end is None else end - begin
+        while remaining > 0:
+            chunk = source.read(int(min(remaining, COPY_CHUNK)))
+            if not chunk:
+                break
+            out.write(chunk)
+            remaining -= len(chunk)
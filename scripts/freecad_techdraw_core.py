@@ -1,9 +1,15 @@
 # scripts/freecad_techdraw_enhanced.py
-import sys, os, time, math, json, traceback
+import sys, os, time, math, traceback
 import FreeCAD as App
 import Part, TechDraw
 from FreeCAD import Vector, Units, Rotation
 
+# freecadcmd does not put the script directory on sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) if '__file__' in globals() else "/app/scripts")
+from pipeline_config import INPUT_DIR, TEMPLATE_DIR, VIEW_DIRECTIONS, load_config, output_path, paper_size_name
+from profiling import profiled
+from tracing import StageTimer, file_size
+
 class PaperSizeManager:
     """Manages standard paper sizes and their parameters"""
     
@@ -19,11 +25,9 @@ class PaperSizeManager:
     @classmethod
     def get_paper_info(cls, template_file):
         """Retrieves paper size information from the template file name"""
-        for size_name, info in cls.PAPER_SIZES.items():
-            if size_name.lower() in template_file.lower():
-                return size_name, info
-        # Default to A3 if not identified
-        return 'A3', cls.PAPER_SIZES['A3']
+        # Defaults to A3 if not identified
+        size_name = paper_size_name(template_file)
+        return size_name, cls.PAPER_SIZES[size_name]
 
 class AutoScaleCalculator:
     """Calculates automatic scale based on paper size and part dimensions"""
@@ -254,17 +258,67 @@ class SmartLayoutManager:
         
         return layout
 
-def main():
-    """Main function with enhanced TechDraw"""
+def _process_events():
+    """Lets queued Qt events run, TechDraw finishes HLR results through them"""
+    try:
+        from PySide import QtCore
+    except ImportError:
+        return
+    app = QtCore.QCoreApplication.instance()
+    if app is not None:
+        app.processEvents()
+
+def _view_ready(view):
+    """Checks whether the hidden-line result of a view is ready.
+
+    recompute() clears Touched before TechDraw's background HLR thread has
+    delivered the projection, so that flag alone says nothing. Where the
+    view reports the pending result (waitingForHlr) that is used; otherwise
+    the view is ready once it holds projected edges, visible or hidden.
+    """
+    if view.isTouched():
+        return False
+    waiting = getattr(view, 'waitingForHlr', None)
+    if callable(waiting):
+        return not waiting()
+    try:
+        return len(view.getVisibleEdges()) + len(view.getHiddenEdges()) > 0
+    except Exception:
+        # Older TechDraw without the edge accessors: not touched is all we can check
+        return True
+
+def wait_for_views(views, timeout=30.0, poll_interval=0.05):
+    """Polls until all views have their HLR result, replacing a fixed sleep.
+
+    Raises RuntimeError as soon as a view is Invalid, as it will never
+    become ready.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        _process_events()
+        invalid = [view.Name for view in views if 'Invalid' in view.State]
+        if invalid:
+            raise RuntimeError(f"TechDraw could not project views: {', '.join(invalid)}")
+        pending = [view.Name for view in views if not _view_ready(view)]
+        if not pending:
+            return True
+        if time.monotonic() >= deadline:
+            print(f"[WARNING] Views not ready after {timeout:.1f} s: {', '.join(pending)}")
+            return False
+        time.sleep(poll_interval)
+
+def generate_drawing(config, dxf_output_path):
+    """Projects the STEP part of `config` onto a page and exports it as DXF.
+
+    Works in its own document, which is always closed again, so it can be
+    called repeatedly from a long-lived process (see freecad_worker.py).
+    """
     doc = None
     try:
         print("[INFO] Starting Enhanced FreeCAD TechDraw...")
         
-        with open("/app/config.json", 'r') as f:
-            config = json.load(f)
-        
-        template_path = os.path.join("/app/templates", config.get("TEMPLATE_FILE", ""))
-        step_file_path = os.path.join("/app/input", config["INPUT_FILE"])
+        template_path = os.path.join(TEMPLATE_DIR, config.get("TEMPLATE_FILE", ""))
+        step_file_path = os.path.join(INPUT_DIR, config["INPUT_FILE"])
         
         print(f"[INFO] STEP file: {step_file_path}")
         print(f"[INFO] Template: {template_path}")
@@ -274,10 +328,12 @@ def main():
         if not os.path.exists(template_path):
             raise FileNotFoundError(f"Template not found: {template_path}")
         
+        timer = StageTimer()
         doc = App.newDocument("EnhancedDrawing")
         Part.insert(step_file_path, doc.Name)
         doc.recompute()
         part = doc.Objects[0]
+        timer.lap("step_import", file=os.path.basename(step_file_path))
         
         print(f"[INFO] Part imported: {part.Name}")
         
@@ -286,6 +342,7 @@ def main():
         template.Template = template_path
         page.Template = template
         doc.recompute()
+        timer.lap("page_setup")
         
         paper_name, paper_info = PaperSizeManager.get_paper_info(template_path)
         print(f"[INFO] Paper size: {paper_name} ({paper_info['width']}x{paper_info['height']}mm)")
@@ -300,12 +357,7 @@ def main():
             scale_value = float(config.get("SCALE", "1.0"))
             print(f"[INFO] Using manual scale: {scale_value}")
         
-        directions = {
-            "Front": Vector(0, -1, 0),
-            "Top": Vector(0, 0, -1),
-            "Right": Vector(-1, 0, 0),
-            "Iso": Vector(1, 1, 1).normalize()
-        }
+        directions = {name: Vector(*direction).normalize() for name, direction in VIEW_DIRECTIONS.items()}
         
         views = {}
         for name, direction in directions.items():
@@ -320,7 +372,11 @@ def main():
             print(f"[INFO] Created {name} view")
         
         doc.recompute()
-        time.sleep(2) # Add a delay for FreeCAD to complete processing
+        # Wait for the HLR projections instead of a fixed delay
+        wait_for_views(list(views.values()),
+                       timeout=float(config.get('FREECAD_READY_TIMEOUT', '30')),
+                       poll_interval=float(config.get('FREECAD_READY_POLL', '0.05')))
+        timer.lap("hlr_recompute", views=len(views))
         
         enhancer = TechDrawEnhancer(doc, page)
         
@@ -331,6 +387,7 @@ def main():
             enhancer.add_section_lines(view, part)
         
         doc.recompute()
+        timer.lap("enhancement")
         
         def estimate_view_bounds(obj, direction, scale):
             """Estimates view bounds"""
@@ -372,10 +429,10 @@ def main():
                 print(f"[INFO] {view_name} view positioned at ({position['x']:.1f}, {position['y']:.1f})")
         
         doc.recompute()
+        timer.lap("layout")
         
-        # Fix output file name to match dxf_add_dim.py input file
-        dxf_output_path = "/app/output/step1_from_freecad.dxf"
         TechDraw.writeDXFPage(page, dxf_output_path)
+        timer.lap("write_dxf", bytes_written=file_size(dxf_output_path))
         
         print(f"✅ [SUCCESS] Enhanced TechDraw completed!")
         print(f"✅ DXF exported: {dxf_output_path}")
@@ -384,14 +441,24 @@ def main():
         print(f"   - Layout: {config.get('LAYOUT_MODE', 'auto')}")
         print(f"   - Hidden lines: Enabled")
         print(f"   - Centerlines: Added")
+        timer.report(os.path.basename(step_file_path),
+                     os.path.join(os.path.dirname(dxf_output_path), "freecad_timings.json"))
         
+    finally:
+        if doc:
+            App.closeDocument(doc.Name)
+
+def main():
+    """Main function with enhanced TechDraw"""
+    try:
+        config = load_config()
+        # Fix output file name to match dxf_add_dim.py input file
+        with profiled("freecad_techdraw_core"):
+            generate_drawing(config, output_path("step1_from_freecad.dxf"))
     except Exception as e:
         sys.stderr.write(f"\n❌ ERROR in freecad_techdraw_enhanced.py: {e}\n")
         traceback.print_exc()
         sys.exit(1)
-    finally:
-        if 'doc' in locals() and doc:
-            App.closeDocument(doc.Name)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,94 @@
+# scripts/freecad_view_worker.py
+"""Computes the hidden-line projection of a single view (parallel stage 1).
+
+TechDraw computes the HLR of all views one after another in a single document.
+With PARALLEL_VIEWS enabled, pipeline.py starts one of these workers per view:
+
+    VIEW_NAME=Front xvfb-run -a freecadcmd /app/scripts/freecad_view_worker.py
+
+Each worker imports the STEP file, projects it along the view direction with
+TechDraw.projectToDXF and writes temp_<VIEW>.dxf into the output directory.
+dxf_assembler.py (with --projected) then lays the views out on the page.
+
+The parallel path only carries the projected edges: the TechDrawEnhancer centre
+lines and section lines are not drawn, and LAYOUT_MODE/MANUAL_POSITIONS are
+ignored because the assembler places the views in its fixed layout. At most
+parallel_view_workers() of these processes run at once.
+"""
+import os
+import sys
+import traceback
+
+import FreeCAD as App
+import Part, TechDraw
+from FreeCAD import Vector
+
+# freecadcmd does not put the script directory on sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) if '__file__' in globals() else "/app/scripts")
+from pipeline_config import INPUT_DIR, VIEW_DIRECTIONS, load_config, output_path
+from freecad_techdraw_core import AutoScaleCalculator, PaperSizeManager
+from profiling import profiled
+from tracing import file_size, span
+
+
+def _as_dxf_document(dxf_string):
+    """projectToDXF returns bare entities on some versions, wrap them into a DXF file."""
+    if "SECTION" in dxf_string:
+        return dxf_string
+    return "0\nSECTION\n2\nENTITIES\n" + dxf_string.strip("\n") + "\n0\nENDSEC\n0\nEOF\n"
+
+
+def project_view(config, view_name, dxf_path):
+    """Projects the part along one view direction and writes it as DXF."""
+    step_file_path = os.path.join(INPUT_DIR, config["INPUT_FILE"])
+    if not os.path.exists(step_file_path):
+        raise FileNotFoundError(f"STEP file not found: {step_file_path}")
+
+    doc = App.newDocument(f"View_{view_name}")
+    try:
+        with span("step_import", "freecad", view=view_name, file=config["INPUT_FILE"]) as step_import:
+            Part.insert(step_file_path, doc.Name)
+            doc.recompute()
+            part = doc.Objects[0]
+
+        # Same scale the single-document stage would use
+        if config.get('AUTO_SCALE', 'false').lower() == 'true':
+            _, paper_info = PaperSizeManager.get_paper_info(config.get("TEMPLATE_FILE", ""))
+            scale_value = AutoScaleCalculator(part, paper_info).calculate_optimal_scale()
+        else:
+            scale_value = float(config.get("SCALE", "1.0"))
+
+        direction = Vector(*VIEW_DIRECTIONS[view_name]).normalize()
+        with span("hlr_projection", "freecad", view=view_name) as hlr:
+            try:
+                dxf_string = TechDraw.projectToDXF(part.Shape, direction, "ShowHiddenLines", scale_value)
+            except TypeError as e:
+                # A 1:1 view would not match the scale of the page
+                raise RuntimeError(f"TechDraw.projectToDXF does not take a scale on this FreeCAD version "
+                                   f"(needed for PARALLEL_VIEWS): {e}") from e
+
+        with span("write_dxf", "freecad", view=view_name) as write:
+            with open(dxf_path, 'w') as f:
+                f.write(_as_dxf_document(dxf_string))
+            write.set(bytes_written=file_size(dxf_path))
+
+        print(f"[INFO] {view_name} view projected (import {step_import.seconds:.2f} s, "
+              f"HLR {hlr.seconds:.2f} s) -> {dxf_path}")
+    finally:
+        App.closeDocument(doc.Name)
+
+
+def main():
+    view_name = os.environ.get("VIEW_NAME", "")
+    try:
+        if view_name not in VIEW_DIRECTIONS:
+            raise ValueError(f"VIEW_NAME must be one of {', '.join(VIEW_DIRECTIONS)}, got '{view_name}'")
+        with profiled(f"freecad_view_worker_{view_name.lower()}"):
+            project_view(load_config(), view_name, output_path(f"temp_{view_name.upper()}.dxf"))
+    except Exception as e:
+        sys.stderr.write(f"\n❌ ERROR in freecad_view_worker.py ({view_name}): {e}\n")
+        traceback.print_exc()
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
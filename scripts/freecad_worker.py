@@ -0,0 +1,216 @@
+# scripts/freecad_worker.py
+"""Long-lived FreeCAD worker for stage 1.
+
+Starting `xvfb-run freecadcmd` costs more than the projection itself for small
+parts. The worker loads FreeCAD, Part and TechDraw once and then serves drawing
+jobs over a Unix socket, one JSON request per connection:
+
+    {"cmd": "ping"}
+    {"cmd": "run", "config": "/path/config.json", "output": "/path/step1.dxf", "trace": "/path/trace_spans.jsonl",
+     "profile": null or "/path/profiles"}
+    {"cmd": "shutdown"}
+
+Each job runs freecad_techdraw_core.generate_drawing() in a fresh document that
+is closed afterwards. The worker exits on its own after FREECAD_WORKER_MAX_JOBS
+jobs (to contain leaks) or after FREECAD_WORKER_IDLE_TIMEOUT seconds without a
+request. FreeCADWorkerClient runs on the pipeline side; it starts the worker,
+health-checks it and restarts it whenever it has exited or stopped answering.
+
+Server side (inside the container):
+    FREECAD_WORKER_SOCKET=/tmp/fc.sock xvfb-run -a freecadcmd /app/scripts/freecad_worker.py
+"""
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import traceback
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__)) if '__file__' in globals() else "/app/scripts"
+DEFAULT_MAX_JOBS = 50
+DEFAULT_IDLE_TIMEOUT = 600.0
+
+
+def _send(conn, message):
+    conn.sendall(json.dumps(message).encode('utf-8') + b"\n")
+
+
+def _recv(conn):
+    buffer = b""
+    while not buffer.endswith(b"\n"):
+        chunk = conn.recv(65536)
+        if not chunk:
+            break
+        buffer += chunk
+    if not buffer:
+        raise ConnectionError("Connection closed without a message")
+    return json.loads(buffer.decode('utf-8'))
+
+
+# --- Server (runs inside freecadcmd) ---
+
+def serve(socket_path, max_jobs=DEFAULT_MAX_JOBS, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+    """Serves drawing jobs until max_jobs is reached, idle timeout or shutdown."""
+    sys.path.insert(0, SCRIPT_DIR)
+    import FreeCAD as App
+    import freecad_techdraw_core as core  # imports Part and TechDraw once
+    from pipeline_config import load_config
+    from profiling import profiled
+    from tracing import set_trace_file
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen(1)
+    server.settimeout(idle_timeout)
+    print(f"[INFO] FreeCAD worker {os.getpid()} listening on {socket_path} (max {max_jobs} jobs)", flush=True)
+
+    jobs_done = 0
+    try:
+        while max_jobs <= 0 or jobs_done < max_jobs:
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                print(f"[INFO] FreeCAD worker idle for {idle_timeout:.0f} s, exiting.", flush=True)
+                break
+
+            with conn:
+                try:
+                    request = _recv(conn)
+                except (ConnectionError, ValueError) as e:
+                    print(f"[WARNING] Ignoring malformed request: {e}", flush=True)
+                    continue
+
+                cmd = request.get('cmd')
+                if cmd == 'ping':
+                    _send(conn, {'ok': True, 'pid': os.getpid(), 'jobs': jobs_done, 'max_jobs': max_jobs,
+                                 'open_documents': len(App.listDocuments())})
+                elif cmd == 'run':
+                    start = time.perf_counter()
+                    try:
+                        # The spans of this job go to the trace file of its pipeline run
+                        set_trace_file(request.get('trace'))
+                        with profiled("freecad_techdraw_core", request.get('profile')):
+                            core.generate_drawing(load_config(request['config']), request['output'])
+                        reply = {'ok': True}
+                    except Exception as e:
+                        traceback.print_exc()
+                        reply = {'ok': False, 'error': str(e)}
+                    jobs_done += 1
+                    reply.update({'seconds': round(time.perf_counter() - start, 3), 'jobs': jobs_done})
+                    sys.stdout.flush()
+                    _send(conn, reply)
+                elif cmd == 'shutdown':
+                    _send(conn, {'ok': True})
+                    break
+                else:
+                    _send(conn, {'ok': False, 'error': f"Unknown command: {cmd}"})
+    finally:
+        server.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        print(f"[INFO] FreeCAD worker {os.getpid()} stopped after {jobs_done} jobs.", flush=True)
+
+
+# --- Client (runs in the pipeline process) ---
+
+class FreeCADWorkerClient:
+    """Starts, health-checks and talks to one warm FreeCAD worker."""
+
+    def __init__(self, socket_path, max_jobs=DEFAULT_MAX_JOBS, log_path=None,
+                 startup_timeout=120.0, job_timeout=900.0):
+        self.socket_path = socket_path
+        self.max_jobs = max_jobs
+        self.log_path = log_path or f"{os.path.splitext(socket_path)[0]}.log"
+        self.startup_timeout = startup_timeout
+        self.job_timeout = job_timeout
+        self.process = None
+        self.restarts = 0
+
+    def _request(self, message, timeout):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.settimeout(timeout)
+            conn.connect(self.socket_path)
+            _send(conn, message)
+            return _recv(conn)
+
+    def ping(self, timeout=5.0):
+        """Health check: returns the worker status or None if it does not answer."""
+        try:
+            return self._request({'cmd': 'ping'}, timeout)
+        except (OSError, ValueError):
+            return None
+
+    def start(self):
+        """Starts a new worker process and waits until it answers a ping."""
+        self.stop()
+        env = dict(os.environ)
+        env['FREECAD_WORKER_SOCKET'] = self.socket_path
+        env['FREECAD_WORKER_MAX_JOBS'] = str(self.max_jobs)
+        log = open(self.log_path, 'a')
+        self.process = subprocess.Popen(
+            ["xvfb-run", "-a", "freecadcmd", os.path.join(SCRIPT_DIR, "freecad_worker.py")],
+            env=env, stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+        log.close()
+
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"FreeCAD worker exited during startup, see {self.log_path}")
+            if self.ping(timeout=1.0):
+                return
+            time.sleep(0.2)
+        self.stop()
+        raise RuntimeError(f"FreeCAD worker did not become ready within {self.startup_timeout:.0f} s")
+
+    def ensure_running(self):
+        """Restarts the worker if it has exited (job limit) or fails the health check."""
+        if self.process is None or self.process.poll() is not None or not self.ping():
+            if self.process is not None:
+                self.restarts += 1
+            self.start()
+
+    def run_job(self, config_file, dxf_output_path, profile_dir=None):
+        """Runs one drawing job, retrying once on a fresh worker if the connection fails.
+
+        With `profile_dir` the worker profiles the job into it (see profiling.py).
+        """
+        from tracing import trace_file
+        for attempt in range(2):
+            self.ensure_running()
+            try:
+                reply = self._request({'cmd': 'run', 'config': config_file, 'output': dxf_output_path,
+                                       'trace': trace_file(), 'profile': profile_dir}, self.job_timeout)
+                break
+            except (OSError, ValueError) as e:
+                if attempt:
+                    raise RuntimeError(f"FreeCAD worker failed: {e}")
+                self.stop()
+        if not reply.get('ok'):
+            raise RuntimeError(f"FreeCAD worker job failed: {reply.get('error')} (see {self.log_path})")
+        return reply
+
+    def stop(self):
+        """Stops the worker process (and its xvfb-run wrapper)."""
+        if self.process is None:
+            return
+        if self.process.poll() is None:
+            try:
+                self._request({'cmd': 'shutdown'}, timeout=5.0)
+                self.process.wait(timeout=10)
+            except (OSError, ValueError, subprocess.TimeoutExpired):
+                try:
+                    os.killpg(self.process.pid, signal.SIGTERM)
+                    self.process.wait(timeout=10)
+                except (ProcessLookupError, subprocess.TimeoutExpired):
+                    os.killpg(self.process.pid, signal.SIGKILL)
+        self.process = None
+
+
+if __name__ == "__main__":
+    serve(os.environ.get('FREECAD_WORKER_SOCKET', "/tmp/freecad_worker.sock"),
+          int(os.environ.get('FREECAD_WORKER_MAX_JOBS', DEFAULT_MAX_JOBS)),
+          float(os.environ.get('FREECAD_WORKER_IDLE_TIMEOUT', DEFAULT_IDLE_TIMEOUT)))
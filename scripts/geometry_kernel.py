@@ -0,0 +1,352 @@
+# scripts/geometry_kernel.py
+"""Batched NumPy geometry kernel for the dimensioning stage.
+
+The dimensioner used to rebuild Vec2 objects from entity.dxf.start/end for
+every test. GeometryArrays extracts the LINE/ARC/CIRCLE geometry of a view into
+NumPy arrays once, and the functions below compute orientation classes,
+lengths, pairwise angles and segment intersections as array operations.
+"""
+import numpy as np
+
+HORIZONTAL, VERTICAL, OTHER = 0, 1, 2
+
+
+class GeometryArrays:
+    """Column arrays of the LINE, CIRCLE and ARC entities of one view.
+
+    lines:   (n, 4) x1, y1, x2, y2
+    circles: (m, 3) cx, cy, r
+    arcs:    (k, 5) cx, cy, r, start_angle, end_angle (degrees)
+
+    The *_entities lists keep the source entities in the same row order.
+    """
+
+    def __init__(self, lines, circles, arcs, line_entities=None, circle_entities=None, arc_entities=None):
+        self.lines = np.asarray(lines, dtype=np.float64).reshape(-1, 4)
+        self.circles = np.asarray(circles, dtype=np.float64).reshape(-1, 3)
+        self.arcs = np.asarray(arcs, dtype=np.float64).reshape(-1, 5)
+        self.line_entities = line_entities or []
+        self.circle_entities = circle_entities or []
+        self.arc_entities = arc_entities or []
+        self._lengths = None
+
+    @classmethod
+    def from_entities(cls, entities):
+        """Extracts the geometry of LINE/CIRCLE/ARC entities in one pass."""
+        lines, circles, arcs = [], [], []
+        line_entities, circle_entities, arc_entities = [], [], []
+        for entity in entities:
+            dxftype = entity.dxftype()
+            dxf = entity.dxf
+            if dxftype == 'LINE':
+                start, end = dxf.start, dxf.end
+                lines.append((start.x, start.y, end.x, end.y))
+                line_entities.append(entity)
+            elif dxftype == 'CIRCLE':
+                center = dxf.center
+                circles.append((center.x, center.y, dxf.radius))
+                circle_entities.append(entity)
+            elif dxftype == 'ARC':
+                center = dxf.center
+                arcs.append((center.x, center.y, dxf.radius, dxf.start_angle, dxf.end_angle))
+                arc_entities.append(entity)
+        return cls(lines, circles, arcs, line_entities, circle_entities, arc_entities)
+
+    def __len__(self):
+        return len(self.lines) + len(self.circles) + len(self.arcs)
+
+    @property
+    def entities(self):
+        """Source entities in row order (lines, circles, arcs); empty for streamed geometry."""
+        return self.line_entities + self.circle_entities + self.arc_entities
+
+    def subset(self, line_rows, circle_rows, arc_rows):
+        """GeometryArrays with the given rows of each entity type."""
+        def pick(entities, rows):
+            return [entities[i] for i in rows] if entities else []
+        return GeometryArrays(self.lines[line_rows], self.circles[circle_rows], self.arcs[arc_rows],
+                              pick(self.line_entities, line_rows), pick(self.circle_entities, circle_rows),
+                              pick(self.arc_entities, arc_rows))
+
+    def entity_bboxes(self):
+        """(len(self), 4) bounding boxes min_x, min_y, max_x, max_y in row order."""
+        lines, circles, arcs = self.lines, self.circles, self.arcs
+        return np.concatenate([
+            np.column_stack([np.minimum(lines[:, 0], lines[:, 2]), np.minimum(lines[:, 1], lines[:, 3]),
+                             np.maximum(lines[:, 0], lines[:, 2]), np.maximum(lines[:, 1], lines[:, 3])]),
+            np.column_stack([circles[:, 0] - circles[:, 2], circles[:, 1] - circles[:, 2],
+                             circles[:, 0] + circles[:, 2], circles[:, 1] + circles[:, 2]]),
+            np.column_stack([arcs[:, 0] - arcs[:, 2], arcs[:, 1] - arcs[:, 2],
+                             arcs[:, 0] + arcs[:, 2], arcs[:, 1] + arcs[:, 2]]),
+        ])
+
+    def connection_points(self):
+        """End points of lines and arcs, and the row (as in entity_bboxes) owning each."""
+        n, m, k = len(self.lines), len(self.circles), len(self.arcs)
+        arcs = self.arcs
+        start, end = np.radians(arcs[:, 3]), np.radians(arcs[:, 4])
+        points = np.concatenate([
+            self.lines[:, 0:2], self.lines[:, 2:4],
+            np.column_stack([arcs[:, 0] + arcs[:, 2] * np.cos(start), arcs[:, 1] + arcs[:, 2] * np.sin(start)]),
+            np.column_stack([arcs[:, 0] + arcs[:, 2] * np.cos(end), arcs[:, 1] + arcs[:, 2] * np.sin(end)]),
+        ])
+        line_rows, arc_rows = np.arange(n), n + m + np.arange(k)
+        owners = np.concatenate([line_rows, line_rows, arc_rows, arc_rows])
+        return points, owners
+
+    @property
+    def line_vectors(self):
+        return self.lines[:, 2:4] - self.lines[:, 0:2]
+
+    @property
+    def line_lengths(self):
+        if self._lengths is None:
+            self._lengths = np.hypot(*self.line_vectors.T) if len(self.lines) else np.zeros(0)
+        return self._lengths
+
+
+def classify_orientations(lines, tolerance=1e-6):
+    """Returns HORIZONTAL/VERTICAL/OTHER per line (horizontal wins for points)."""
+    d = lines[:, 2:4] - lines[:, 0:2]
+    classes = np.full(len(lines), OTHER, dtype=np.int8)
+    classes[np.abs(d[:, 0]) < tolerance] = VERTICAL
+    classes[np.abs(d[:, 1]) < tolerance] = HORIZONTAL
+    return classes
+
+
+def pairwise_angles(lines, first, second):
+    """Acute angle in degrees between line pairs (first[i], second[i])."""
+    d = lines[:, 2:4] - lines[:, 0:2]
+    norms = np.hypot(d[:, 0], d[:, 1])
+    norms[norms == 0] = 1.0
+    u = d / norms[:, None]
+    dots = np.abs(np.einsum('ij,ij->i', u[first], u[second]))
+    return np.degrees(np.arccos(np.clip(dots, 0.0, 1.0)))
+
+
+def segment_intersections(lines, first, second, extension=5.0, tolerance=1e-6):
+    """Intersection points of the line pairs (first[i], second[i]).
+
+    Pairs intersect if their infinite lines cross on both segments, or within
+    `extension` (mm) beyond either end. Parallel pairs never intersect.
+    Returns (mask, points) where points[i] is only valid where mask[i].
+    """
+    p1 = lines[first, 0:2]
+    d1 = lines[first, 2:4] - p1
+    p3 = lines[second, 0:2]
+    d2 = lines[second, 2:4] - p3
+
+    det = d1[:, 0] * d2[:, 1] - d1[:, 1] * d2[:, 0]
+    valid = np.abs(det) >= tolerance
+    safe_det = np.where(valid, det, 1.0)
+
+    dp = p3 - p1
+    t1 = (dp[:, 0] * d2[:, 1] - dp[:, 1] * d2[:, 0]) / safe_det
+    t2 = (dp[:, 0] * d1[:, 1] - dp[:, 1] * d1[:, 0]) / safe_det
+
+    len1 = np.hypot(d1[:, 0], d1[:, 1])
+    len2 = np.hypot(d2[:, 0], d2[:, 1])
+    s1, s2 = t1 * len1, t2 * len2
+    within = (s1 >= -extension) & (s1 <= len1 + extension) & (s2 >= -extension) & (s2 <= len2 + extension)
+
+    points = p1 + d1 * t1[:, None]
+    return valid & within, points
+
+
+def _grown_boxes(boxes, margin):
+    return np.asarray(boxes, dtype=np.float64).reshape(-1, 4) + np.array([-margin, -margin, margin, margin])
+
+
+def _overlap(boxes, first, second):
+    return ((boxes[first, 0] <= boxes[second, 2]) & (boxes[second, 0] <= boxes[first, 2]) &
+            (boxes[first, 1] <= boxes[second, 3]) & (boxes[second, 1] <= boxes[first, 3]))
+
+
+def _triangle_blocks(size, chunk_pairs):
+    """Yields the pairs (a, b), a < b, of range(size) in blocks of about `chunk_pairs` pairs."""
+    a = 0
+    while a < size - 1:
+        # Row a pairs with the size - a - 1 rows after it
+        stop = a + 1
+        pairs = size - a - 1
+        while stop < size - 1 and pairs + size - stop - 1 <= chunk_pairs:
+            pairs += size - stop - 1
+            stop += 1
+        counts = size - np.arange(a, stop) - 1
+        first = np.repeat(np.arange(a, stop), counts)
+        second = np.arange(len(first)) - np.repeat(np.cumsum(counts) - counts, counts) + first + 1
+        yield first, second
+        a = stop
+
+
+def _overlapping_chunks(boxes, max_cells, chunk_pairs=1 << 20):
+    """Yields (first, second) chunks of overlapping box rows, each pair once.
+
+    Grid-bucketed broad phase: each box is binned into the cells it covers
+    (cell size = median box size), and only boxes sharing a cell are paired.
+    A pair sharing several cells is only kept in the cell holding the lower
+    left corner of its overlap. Boxes spanning more than `max_cells` cells are
+    tested against all others directly instead of filling the grid. Chunks
+    hold about `chunk_pairs` candidates, also inside a single crowded cell, so
+    dense drawings do not materialise all candidates at once.
+    """
+    extent = np.maximum(boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1])
+    cell = max(float(np.median(extent)), 1e-9)
+
+    origin = boxes[:, 0:2].min(axis=0)
+    lo = np.floor((boxes[:, 0:2] - origin) / cell).astype(np.int64)
+    hi = np.floor((boxes[:, 2:4] - origin) / cell).astype(np.int64)
+    span = hi - lo + 1
+    counts = span[:, 0] * span[:, 1]
+    large = counts > max_cells
+    rows = int(hi[:, 1].max()) + 1
+
+    # Broad phase 1: grid buckets of the regular boxes
+    small = np.flatnonzero(~large)
+    reps = counts[small]
+    owner = np.repeat(small, reps)
+    offset = np.arange(reps.sum()) - np.repeat(np.cumsum(reps) - reps, reps)
+    cx = lo[owner, 0] + offset % span[owner, 0]
+    cy = lo[owner, 1] + offset // span[owner, 0]
+    cell_id = cx * rows + cy
+
+    order = np.lexsort((owner, cell_id))
+    cell_id, owner = cell_id[order], owner[order]
+    starts = np.flatnonzero(np.r_[True, cell_id[1:] != cell_id[:-1]])
+    sizes = np.diff(np.r_[starts, len(cell_id)])
+
+    def keep(first, second, cells):
+        corner = np.floor((np.maximum(boxes[first, 0:2], boxes[second, 0:2]) - origin) / cell).astype(np.int64)
+        hit = _overlap(boxes, first, second) & (corner[:, 0] * rows + corner[:, 1] == cells)
+        return first[hit], second[hit]
+
+    # All pairs inside each cell, built once per distinct cell population
+    dense = max(2, int(np.sqrt(2 * chunk_pairs)))
+    for size in np.unique(sizes[(sizes > 1) & (sizes <= dense)]).tolist():
+        a, b = np.triu_indices(size, k=1)
+        cell_starts = starts[sizes == size]
+        step = max(1, chunk_pairs // len(a))
+        for i in range(0, len(cell_starts), step):
+            batch = cell_starts[i:i + step, None]
+            yield keep(owner[(batch + a).ravel()], owner[(batch + b).ravel()],
+                       np.repeat(cell_id[batch[:, 0]], len(a)))
+
+    # Cells too dense for one triangle of pairs: streamed a block of rows at a time
+    for start, size in zip(starts[sizes > dense].tolist(), sizes[sizes > dense].tolist()):
+        members = owner[start:start + size]
+        for a, b in _triangle_blocks(size, chunk_pairs):
+            yield keep(members[a], members[b], cell_id[start])
+
+    # Broad phase 2: large boxes against everything
+    for i in np.flatnonzero(large).tolist():
+        others = np.flatnonzero(
+            (boxes[:, 0] <= boxes[i, 2]) & (boxes[:, 2] >= boxes[i, 0]) &
+            (boxes[:, 1] <= boxes[i, 3]) & (boxes[:, 3] >= boxes[i, 1]))
+        others = others[(others != i) & (~large[others] | (others > i))]
+        yield np.full(len(others), i), others
+
+
+def overlapping_boxes(boxes, margin=0.0, max_cells=64):
+    """Pairs (first, second) of rows of the (n, 4) `boxes` that overlap when grown by `margin`.
+
+    Cost is about O(n + k) for k reported pairs, instead of O(n^2) for
+    testing every pair (see _overlapping_chunks). Pairs are sorted, with
+    first < second.
+    """
+    empty = np.zeros(0, dtype=np.int64)
+    n = len(boxes)
+    if n < 2:
+        return empty, empty
+
+    chunks = list(_overlapping_chunks(_grown_boxes(boxes, margin), max_cells))
+    if not chunks:
+        return empty, empty
+    first = np.concatenate([c[0] for c in chunks])
+    second = np.concatenate([c[1] for c in chunks])
+    first, second = np.minimum(first, second), np.maximum(first, second)
+    pair_keys = np.sort(first * n + second)
+    return pair_keys // n, pair_keys % n
+
+
+def _hook(parent, first, second):
+    """Merges the components joined by the edges (first[i], second[i]) into `parent`.
+
+    Vectorised union-find: every round hooks the larger root of each edge
+    under the smaller one, then compresses paths by pointer jumping. Edges
+    inside one component drop out, so the rounds get cheaper as they merge.
+    """
+    while len(first):
+        root_first, root_second = parent[first], parent[second]
+        open_edges = root_first != root_second
+        if not open_edges.any():
+            break
+        first, second = first[open_edges], second[open_edges]
+        low = np.minimum(root_first[open_edges], root_second[open_edges])
+        high = np.maximum(root_first[open_edges], root_second[open_edges])
+        np.minimum.at(parent, high, low)
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent[:] = grand
+
+
+def box_components(boxes, margin=0.0, max_cells=64, link=None):
+    """Component label per box, joining boxes that overlap when grown by `margin`.
+
+    Same broad phase as overlapping_boxes, but every chunk of pairs is merged
+    into the components right away instead of collecting all pairs first.
+    `link(first, second)`, if given, returns which overlapping pairs to join.
+    Labels are the smallest row of each component.
+    """
+    parent = np.arange(len(boxes))
+    if len(boxes) > 1:
+        for first, second in _overlapping_chunks(_grown_boxes(boxes, margin), max_cells):
+            if link is not None:
+                keep = link(first, second)
+                first, second = first[keep], second[keep]
+            _hook(parent, first, second)
+    return parent
+
+
+def _line_boxes(lines, indices):
+    seg = lines[indices].reshape(-1, 4)
+    return np.column_stack([
+        np.minimum(seg[:, 0], seg[:, 2]), np.minimum(seg[:, 1], seg[:, 3]),
+        np.maximum(seg[:, 0], seg[:, 2]), np.maximum(seg[:, 1], seg[:, 3]),
+    ])
+
+
+def candidate_pairs(lines, indices, margin=0.0, max_cells=64):
+    """Pairs (first, second) of `indices` whose bounding boxes, grown by `margin`, overlap."""
+    indices = np.asarray(indices, dtype=np.int64)
+    first, second = overlapping_boxes(_line_boxes(lines, indices), margin, max_cells)
+    return indices[first], indices[second]
+
+
+def intersecting_pairs(lines, indices, extension=5.0, tolerance=1e-6, max_cells=64):
+    """All intersecting pairs among the lines `indices` (see segment_intersections).
+
+    The candidate pairs are tested chunk by chunk as the broad phase yields
+    them. Returns (first, second, points) with one row per intersecting pair,
+    sorted by (first, second) position in `indices`.
+    """
+    indices = np.asarray(indices, dtype=np.int64)
+    empty = np.zeros(0, dtype=np.int64)
+    if len(indices) < 2:
+        return empty, empty, np.zeros((0, 2))
+
+    n = len(indices)
+    keys, points = [], []
+    for first, second in _overlapping_chunks(_grown_boxes(_line_boxes(lines, indices), extension), max_cells):
+        first, second = np.minimum(first, second), np.maximum(first, second)
+        hits, chunk_points = segment_intersections(lines, indices[first], indices[second], extension, tolerance)
+        keys.append(first[hits] * n + second[hits])
+        points.append(chunk_points[hits])
+    if not keys:
+        return empty, empty, np.zeros((0, 2))
+
+    keys, points = np.concatenate(keys), np.concatenate(points)
+    order = np.argsort(keys, kind='stable')
+    keys, points = keys[order], points[order]
+    return indices[keys // n], indices[keys % n], points
@@ -0,0 +1,220 @@
+# scripts/hole_patterns.py
+"""Hole-pattern recognition for the dimensioning stage.
+
+The dimensioner used to drop every circle whose diameter was already
+dimensioned, so a bolt-circle part showed a single Ø without a count.
+find_hole_patterns groups the circles of a view by radius (sorted sweep with a
+tolerance), splits each group into spatial clusters and classifies the centres
+of each cluster as a linear row, a rectangular grid, a polar (bolt-circle)
+pattern or a scattered set, so one "N× Ø d" callout can be emitted per
+pattern. RadiusIndex replaces the linear scans over already dimensioned sizes
+with a bucketed lookup.
+"""
+import math
+
+import numpy as np
+
+from geometry_kernel import box_components
+
+LINEAR, GRID, POLAR, SCATTERED = 'linear', 'grid', 'polar', 'scattered'
+
+# Centres closer than LINK_FACTOR times the nearest-neighbour distance of both belong to one cluster
+LINK_FACTOR = 3.0
+
+
+class RadiusIndex:
+    """Set of sizes with tolerance lookup, bucketed by floor(value / tolerance).
+
+    A value within the tolerance of a stored one can only sit in the same or
+    a neighbouring bucket, so lookups stay O(1).
+    """
+
+    def __init__(self, tolerance):
+        self.tolerance = tolerance
+        self.buckets = {}
+
+    def _key(self, value):
+        return math.floor(value / self.tolerance)
+
+    def find(self, value):
+        """Returns a stored value closer than the tolerance, or None."""
+        key = self._key(value)
+        for k in (key - 1, key, key + 1):
+            for stored in self.buckets.get(k, ()):
+                if abs(stored - value) < self.tolerance:
+                    return stored
+        return None
+
+    def add(self, value):
+        self.buckets.setdefault(self._key(value), []).append(value)
+
+
+class HolePattern:
+    """Same-size holes of one view and the arrangement of their centres."""
+
+    def __init__(self, kind, radius, rows, centers, pitch=None, pitch_radius=None, equally_spaced=False):
+        self.kind = kind
+        self.radius = radius
+        self.rows = rows  # row indices into GeometryArrays.circles
+        self.centers = centers
+        self.pitch = pitch  # spacing along a row (linear) or (x, y) spacing (grid)
+        self.pitch_radius = pitch_radius  # bolt-circle radius (polar)
+        self.equally_spaced = equally_spaced
+
+    @property
+    def count(self):
+        return len(self.rows)
+
+    def callout(self):
+        """Dimension text, '<>' is replaced by the measurement (Ø d) when rendering."""
+        if self.count == 1:
+            return "<>"
+        suffix = " EQS" if self.kind == POLAR and self.equally_spaced else ""
+        return f"{self.count}× <>{suffix}"
+
+    def describe(self):
+        if self.kind == LINEAR and self.pitch is not None:
+            return f"{self.count}× Ø{2 * self.radius:.2f} linear, pitch {self.pitch:.2f}"
+        if self.kind == GRID:
+            return f"{self.count}× Ø{2 * self.radius:.2f} grid, pitch {self.pitch[0]:.2f} x {self.pitch[1]:.2f}"
+        if self.kind == POLAR:
+            spacing = "equally spaced" if self.equally_spaced else "unequal"
+            return f"{self.count}× Ø{2 * self.radius:.2f} polar on Ø{2 * self.pitch_radius:.2f} ({spacing})"
+        return f"{self.count}× Ø{2 * self.radius:.2f} {self.kind}"
+
+
+def group_by_radius(radii, tolerance):
+    """Row groups of radii chained within `tolerance`, largest radius first."""
+    radii = np.asarray(radii, dtype=np.float64)
+    if not len(radii):
+        return []
+    order = np.argsort(radii, kind='stable')
+    breaks = np.flatnonzero(np.diff(radii[order]) > tolerance) + 1
+    return [group for group in reversed(np.split(order, breaks))]
+
+
+def _equal_steps(values, tolerance):
+    steps = np.diff(np.sort(values))
+    return len(steps) > 0 and float(np.ptp(steps)) < tolerance and float(steps.min()) > tolerance, steps
+
+
+def _nearest_distances(centers, tolerance):
+    """Distance from each centre to its nearest other hole, `tolerance` if there is none.
+
+    Grid search: every centre closer than the cell size lies in the 3 x 3
+    cells around a centre, so a nearest distance up to the cell size is
+    final. The other centres are searched again on a grid of twice the cell
+    size, until one cell spans all centres. Centres closer than `tolerance`
+    count as one hole.
+    """
+    n = len(centers)
+    nearest = np.full(n, np.inf)
+    origin = centers.min(axis=0)
+    extent = float(np.ptp(centers, axis=0).max())
+    cell = max(tolerance, 1e-9)
+    pending = np.arange(n)
+    while len(pending):
+        ij = np.floor((centers - origin) / cell).astype(np.int64) + 1
+        rows = int(ij[:, 1].max()) + 2
+        keys = ij[:, 0] * rows + ij[:, 1]
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                target = keys[pending] + dx * rows + dy
+                lo = np.searchsorted(sorted_keys, target, side='left')
+                counts = np.searchsorted(sorted_keys, target, side='right') - lo
+                query = np.repeat(pending, counts)
+                other = order[np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts - lo, counts)]
+                d = np.hypot(centers[query, 0] - centers[other, 0], centers[query, 1] - centers[other, 1])
+                np.minimum.at(nearest, query, np.where(d < tolerance, np.inf, d))
+        if cell >= extent:
+            break
+        pending = pending[nearest[pending] > cell]
+        cell *= 2
+    nearest[np.isinf(nearest)] = tolerance
+    return nearest
+
+
+def cluster_centers(centers, tolerance):
+    """Splits hole centres into spatial clusters, returns a list of row arrays.
+
+    Two centres are linked when their distance is at most LINK_FACTOR times
+    the nearest-neighbour distance of both, so evenly spaced patterns stay
+    together while same-size holes elsewhere in the view form their own
+    clusters. Centres closer than `tolerance` count as one hole. Each centre
+    gets a box as wide as its link reach, so box_components only checks the
+    pairs of overlapping boxes.
+    """
+    n = len(centers)
+    if n < 3:
+        return [np.arange(n)]
+
+    nearest = _nearest_distances(centers, tolerance)
+    half = np.maximum(LINK_FACTOR * nearest, tolerance)[:, None] / 2
+    boxes = np.hstack([centers - half, centers + half])
+
+    def link(first, second):
+        d = np.hypot(centers[first, 0] - centers[second, 0], centers[first, 1] - centers[second, 1])
+        return d <= np.maximum(LINK_FACTOR * np.minimum(nearest[first], nearest[second]), tolerance)
+
+    labels = box_components(boxes, link=link)
+    order = np.argsort(labels, kind='stable')
+    return np.split(order, np.flatnonzero(np.diff(labels[order])) + 1)
+
+
+def classify_centers(centers, tolerance):
+    """Returns (kind, pitch, pitch_radius, equally_spaced) of a set of hole centres."""
+    n = len(centers)
+    if n < 2:
+        return SCATTERED, None, None, False
+
+    # Linear: all centres on one line
+    mean = centers.mean(axis=0)
+    offsets = centers - mean
+    _, axes = np.linalg.eigh(offsets.T @ offsets)  # principal axes, major axis last
+    along = offsets @ axes[:, 1]
+    across = offsets @ axes[:, 0]
+    if float(np.abs(across).max()) < tolerance:
+        equal, steps = _equal_steps(along, tolerance)
+        return LINEAR, float(steps.mean()) if equal else None, None, equal
+
+    # Rectangular grid: every (x, y) combination of equally spaced columns and rows.
+    # Tested before polar: the four centres of a 2 x 2 grid also lie on one circle.
+    cols = np.round(centers[:, 0] / tolerance)
+    rows = np.round(centers[:, 1] / tolerance)
+    xs, ys = np.unique(cols), np.unique(rows)
+    full = len(np.unique(np.column_stack([cols, rows]), axis=0)) == n
+    if len(xs) * len(ys) == n and len(xs) > 1 and len(ys) > 1 and full:
+        equal_x, steps_x = _equal_steps(xs * tolerance, 2 * tolerance)
+        equal_y, steps_y = _equal_steps(ys * tolerance, 2 * tolerance)
+        if equal_x and equal_y:
+            return GRID, (float(steps_x.mean()), float(steps_y.mean())), None, True
+
+    # Polar: all centres on one circle around their centroid
+    distances = np.hypot(offsets[:, 0], offsets[:, 1])
+    if n >= 3 and float(np.ptp(distances)) < tolerance and distances.mean() > tolerance:
+        pitch_radius = float(distances.mean())
+        angles = np.sort(np.arctan2(centers[:, 1] - mean[1], centers[:, 0] - mean[0]))
+        steps = np.diff(np.r_[angles, angles[0] + 2 * math.pi])
+        equal = float(np.ptp(steps)) * pitch_radius < tolerance
+        return POLAR, None, pitch_radius, equal
+
+    return SCATTERED, None, None, False
+
+
+def find_hole_patterns(circles, radius_tolerance=0.1, position_tolerance=0.5):
+    """Groups the (m, 3) circle array of a view into HolePatterns, largest holes first.
+
+    Same-size holes are split into spatial clusters (see cluster_centers), one pattern each.
+    """
+    circles = np.asarray(circles, dtype=np.float64).reshape(-1, 3)
+    patterns = []
+    for group in group_by_radius(circles[:, 2], radius_tolerance):
+        for cluster in cluster_centers(circles[group, 0:2], position_tolerance):
+            rows = group[cluster]
+            centers = circles[rows, 0:2]
+            kind, pitch, pitch_radius, equal = classify_centers(centers, position_tolerance)
+            radius = float(circles[rows, 2].mean())
+            patterns.append(HolePattern(kind, radius, rows, centers, pitch, pitch_radius, equal))
+    return patterns
@@ -1,32 +1,191 @@
 # scripts/pipeline.py
-import os, subprocess, sys, json
+import os, subprocess, sys, json, contextlib
+from concurrent.futures import ThreadPoolExecutor
 
-def run_command(command):
-    print(f"--- Running command: {' '.join(command)} ---")
-    subprocess.run(command, check=True)
+from pipeline_config import (INPUT_DIR, SCRIPT_DIR, TEMPLATE_DIR, VIEW_DIRECTIONS, config_flag, config_path,
+                             dimension_input_name, output_dir, parallel_view_workers, preview_size, stage_env)
+from profiling import PROFILE_DIR_ENV, PROFILES_NAME, profiled, profiling_enabled
+from projection_cache import PROJECTION_SCRIPTS, open_projection_cache, projection_settings
+from stage_forkserver import StageRunner
+from stage_graph import Stage, StageGraph
+from tracing import finish_run, span, start_run
+
+def run_command(command, env=None, stdout=None):
+    print(f"--- Running command: {' '.join(command)} ---", file=stdout or sys.stdout, flush=True)
+    subprocess.run(command, check=True, env=env, stdout=stdout, stderr=subprocess.STDOUT if stdout else None)
+
+def run_parallel_views(env, log=None):
+    """Projects every view in its own freecadcmd process, then assembles the page."""
+    def project(view_name):
+        command = ["xvfb-run", "-a", "freecadcmd", f"{SCRIPT_DIR}/freecad_view_worker.py"]
+        run_command(command, dict(env, VIEW_NAME=view_name), log)
+
+    with ThreadPoolExecutor(max_workers=parallel_view_workers()) as pool:
+        # list() re-raises the first failed projection
+        list(pool.map(project, VIEW_DIRECTIONS))
+
+    run_command([sys.executable, f"{SCRIPT_DIR}/dxf_assembler.py", "--projected"], env, log)
+
+def run_projection_stage(config, config_file, out_dir, env, log=None, freecad_worker=None):
+    """Stage 1: produces step1_from_freecad.dxf, from the projection cache if possible."""
+    step1_path = os.path.join(out_dir, "step1_from_freecad.dxf")
+    out = log or sys.stdout
+
+    cache = open_projection_cache(config)
+    if cache:
+        key = cache.make_key(config)
+        if cache.get(key, step1_path):
+            print(f"--- Projection cache hit ({key[:12]}), skipping FreeCAD ---", file=out, flush=True)
+            return
+        print(f"--- Projection cache miss ({key[:12]}) ---", file=out, flush=True)
+
+    if config_flag(config, 'PARALLEL_VIEWS'):
+        run_parallel_views(env, log)
+    elif freecad_worker:
+        print(f"--- Sending job to warm FreeCAD worker: {config_file} ---", file=out, flush=True)
+        freecad_worker.run_job(config_file, step1_path, profile_dir=env.get(PROFILE_DIR_ENV))
+    else:
+        # (-a picks a free display so several jobs can run side by side)
+        run_command(["xvfb-run", "-a", "freecadcmd", f"{SCRIPT_DIR}/freecad_techdraw_core.py"], env, log)
+
+    if cache:
+        cache.put(key, step1_path)
+
+# Scripts (and their helper modules) that version each Python stage
+DIMENSION_SCRIPTS = ('dxf_add_dim.py', 'dimension_placement.py', 'hole_patterns.py', 'geometry_kernel.py',
+                     'dxf_streaming.py')
+DIMENSION_CONFIG_KEYS = ('DIMENSION_OFFSET', 'DIMENSION_TEXT_HEIGHT', 'MIN_DIMENSION_LENGTH', 'MAX_DIMENSIONS_PER_VIEW',
+                         'DIMENSION_ANGLES', 'DIMENSION_RADII', 'DIMENSION_DIAMETERS', 'RENDER_DIMENSIONS',
+                         'DRAWING_STANDARD', 'STREAMING_DIMENSIONS')
+RENDER_SCRIPTS = ('dxf_render_svg.py', 'template_cache.py', 'dxf_normalizer.py')
+PREVIEW_CONFIG_KEYS = ('PREVIEW_SIZE', 'PREVIEW_FORMAT', 'PREVIEW_MIN_FEATURE', 'PREVIEW_DIMENSIONS',
+                       'PREVIEW_HIDDEN', 'PREVIEW_DROP_LAYERS')
+
+def build_stage_graph(config, config_file, out_dir, log=None, freecad_worker=None, stage_runner=None, force=False):
+    """Declares the pipeline stages with their inputs and outputs, see stage_graph.py.
+
+    Returns (graph, runner); `runner` is None on the in-process path.
+    """
+    env = stage_env(config_file, out_dir)
+    profiles_dir = None
+    if profiling_enabled(config):
+        # Every stage process profiles itself into profiles/<stage>, see profiling.py
+        profiles_dir = env[PROFILE_DIR_ENV] = os.path.join(out_dir, PROFILES_NAME)
+    template_path = os.path.join(TEMPLATE_DIR, config['TEMPLATE_FILE'])
+    step1_path = os.path.join(out_dir, "step1_from_freecad.dxf")
+    step2_path = os.path.join(out_dir, "step2_with_dims.dxf")
+    svg_path = os.path.join(out_dir, "final_drawing.svg")
+    graph = StageGraph(out_dir, config, force=force, log=log)
+
+    # Step 1: FreeCAD - Create DXF from STEP and Template
+    graph.add(Stage("projection", lambda: run_projection_stage(config, config_file, out_dir, env, log, freecad_worker),
+                    outputs=[step1_path], inputs=[os.path.join(INPUT_DIR, config['INPUT_FILE'])],
+                    scripts=PROJECTION_SCRIPTS, key=projection_settings(config)))
+
+    preview_path = None
+    preview_keys = ()
+    if preview_size(config):
+        preview_path = os.path.join(out_dir, f"preview.{str(config.get('PREVIEW_FORMAT', 'png')).lower()}")
+        preview_keys = PREVIEW_CONFIG_KEYS
+
+    if config_flag(config, 'IN_PROCESS_DXF_STAGES'):
+        # Steps 2+3 in this interpreter, handing the live ezdxf document over
+        def run_in_process():
+            from dxf_stages import run_dxf_stages
+            with contextlib.redirect_stdout(log or sys.stdout), profiled("dxf_stages", profiles_dir):
+                run_dxf_stages(config, out_dir, template_path)
+
+        outputs = [svg_path] + ([preview_path] if preview_path else [])
+        graph.add(Stage("dxf_stages", run_in_process, outputs=outputs, inputs=[step1_path, template_path],
+                        scripts=('dxf_stages.py', 'dxf_preview.py', *DIMENSION_SCRIPTS, *RENDER_SCRIPTS),
+                        config_keys=('NORMALIZE_DRAWING', 'SVG_BACKEND', *DIMENSION_CONFIG_KEYS, *preview_keys)))
+        return graph, None
+
+    runner = stage_runner or StageRunner(config_flag(config, 'FORK_SERVER'))
+    dimension_input = os.path.join(out_dir, dimension_input_name(config))
+
+    # Optional: move the drawing origin to its lower-left corner
+    if config_flag(config, 'NORMALIZE_DRAWING'):
+        graph.add(Stage("normalize", lambda: runner.run(f"{SCRIPT_DIR}/dxf_normalizer.py", env=env, log=log),
+                        outputs=[dimension_input], inputs=[step1_path], scripts=('dxf_normalizer.py',)))
+
+    # Step 2: Add dimensions using ezdxf
+    graph.add(Stage("dimension", lambda: runner.run(f"{SCRIPT_DIR}/dxf_add_dim.py", env=env, log=log),
+                    outputs=[step2_path], inputs=[dimension_input], scripts=DIMENSION_SCRIPTS,
+                    config_keys=DIMENSION_CONFIG_KEYS))
+
+    # Step 3: Render and merge SVG template
+    def render():
+        if runner.fork_server:
+            # Compiled in the parent, so every forked render stage inherits it
+            from template_cache import load_template
+            load_template(template_path)
+        runner.run(f"{SCRIPT_DIR}/dxf_render_svg.py", [template_path], env=env, log=log)
+
+    graph.add(Stage("render", render, outputs=[svg_path], inputs=[step2_path, template_path],
+                    scripts=RENDER_SCRIPTS, config_keys=('SVG_BACKEND',)))
+
+    # Optional: low-detail thumbnail (PREVIEW_SIZE)
+    if preview_path:
+        graph.add(Stage("preview", lambda: runner.run(f"{SCRIPT_DIR}/dxf_preview.py", env=env, log=log),
+                        outputs=[preview_path], inputs=[step2_path], scripts=('dxf_preview.py', 'dxf_render_svg.py'),
+                        config_keys=PREVIEW_CONFIG_KEYS))
+    return graph, runner
+
+def run_stages(config, config_file, out_dir, log=None, freecad_worker=None, stage_runner=None, force=False):
+    """Runs the pipeline stages whose inputs changed for one config/output directory.
+
+    The stages (projection, optional normalize, dimension, render, optional
+    preview) are skipped when their fingerprint in stage_manifest.json is
+    unchanged, unless `force` or FORCE_RERUN is set. With `freecad_worker` (a
+    FreeCADWorkerClient) stage 1 is sent to the warm worker instead of starting
+    a fresh freecadcmd. `stage_runner` (a StageRunner) runs the Python stages;
+    by default one is created from the FORK_SERVER option. Returns the stage
+    timings of the separate-script path.
+
+    Every run writes metrics.json and trace.json into `out_dir`, see tracing.py.
+    With profiling enabled (profiling.py) every stage runs again and is profiled.
+    """
+    if profiling_enabled(config):
+        print(f"--- Profiling every stage into {os.path.join(out_dir, PROFILES_NAME)} ---",
+              file=log or sys.stdout, flush=True)
+        force = True
+    start_run(out_dir)
+    job = {'input': config.get('INPUT_FILE'), 'template': config.get('TEMPLATE_FILE'), 'output_dir': out_dir}
+    status = 'failed'
+    try:
+        with span("pipeline", "pipeline", **job):
+            graph, runner = build_stage_graph(config, config_file, out_dir, log, freecad_worker, stage_runner, force)
+            ran = graph.run()
+        status = 'ok'
+    finally:
+        metrics = finish_run(out_dir, job, status)
+        print(f"--- Metrics: {status}, {metrics['total_seconds']} s, peak RSS {metrics['peak_rss_mb']} MB "
+              f"-> {os.path.join(out_dir, 'metrics.json')} ---", file=log or sys.stdout, flush=True)
+    print(f"--- Stages run: {', '.join(ran) or 'none (all up to date)'} ---", file=log or sys.stdout, flush=True)
+    if runner is not None:
+        return runner.write_timings(out_dir)
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--batch":
+        from batch_runner import main as batch_main
+        sys.exit(batch_main(sys.argv[2:]))
+
     print("🚀 Starting pipeline process...")
-    with open("/app/config.json", 'r') as f:
+    config_file = config_path()
+    with open(config_file, 'r') as f:
         config = json.load(f)
 
     print("ℹ️ Configuration received from config.json:")
     for key, value in config.items():
         print(f"  {key}: {value}")
 
-    template_path = f"/app/templates/{config['TEMPLATE_FILE']}"
-    project_input = "/app/output/step2_with_dims.dxf"
-    project_output = "/app/output/projections_only.svg"
-
     try:
-        # Step 1: FreeCAD - Create DXF from STEP and Template
-        run_command(["xvfb-run", "freecadcmd", "/app/scripts/freecad_techdraw_core.py"])
-
-        # Step 2: Add dimensions using ezdxf
-        run_command(["python", "/app/scripts/dxf_add_dim.py"])
+        run_stages(config, config_file, output_dir(), force="--force" in sys.argv[1:])
 
-        # Step 3: Render and merge SVG template
-        run_command(["python", "/app/scripts/dxf_render_svg.py", template_path])
+        cache = open_projection_cache(config)
+        if cache:
+            print(f"ℹ️ Projection cache: {json.dumps(cache.stats())}")
 
         print("✅ Pipeline inside container completed successfully!")
 
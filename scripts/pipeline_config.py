@@ -0,0 +1,119 @@
+# scripts/pipeline_config.py
+"""Shared config and path helpers for the pipeline stage scripts.
+
+Every stage used to hard-code /app/config.json and /app/output. Batch runs need
+one config and one output directory per job, so the locations can be overridden
+through the PIPELINE_CONFIG and PIPELINE_OUTPUT_DIR environment variables. The
+defaults keep the single-run container layout unchanged.
+"""
+import json
+import os
+
+from tracing import SPANS_NAME, TRACE_FILE_ENV
+
+DEFAULT_CONFIG_PATH = "/app/config.json"
+DEFAULT_OUTPUT_DIR = "/app/output"
+INPUT_DIR = "/app/input"
+TEMPLATE_DIR = "/app/templates"
+SCRIPT_DIR = "/app/scripts"
+
+# Same defaults run.sh offers interactively (INPUT_FILE/TEMPLATE_FILE excluded)
+DEFAULT_CONFIG = {
+    "PROJECTION_METHOD": "THIRD_ANGLE",
+    "DRAWING_STANDARD": "ISO",
+    "SCALE": "1",
+    "SPACING_FACTOR": "1.5",
+    "MIN_SPACING": "20.0",
+    "DIMENSION_OFFSET": "15.0",
+    "DIMENSION_TEXT_HEIGHT": "2.5",
+    "MIN_DIMENSION_LENGTH": "5.0",
+    "MAX_DIMENSIONS_PER_VIEW": "20",
+    "DIMENSION_ANGLES": "true",
+    "DIMENSION_RADII": "true",
+    "DIMENSION_DIAMETERS": "true",
+    "PROJECTION_CACHE": "true",
+}
+
+# Projection directions (x, y, z) of the views created by the FreeCAD stage
+VIEW_DIRECTIONS = {
+    "Front": (0, -1, 0),
+    "Top": (0, 0, -1),
+    "Right": (-1, 0, 0),
+    "Iso": (1, 1, 1),
+}
+
+# Size of the batch_runner.py process pool (unset for single runs)
+BATCH_WORKERS_ENV = "PIPELINE_BATCH_WORKERS"
+
+PAPER_SIZE_NAMES = ('A0', 'A1', 'A2', 'A3', 'A4', 'A5')
+
+
+def paper_size_name(template_file, default='A3'):
+    """Returns the paper size named in a template file name (`default` if none)."""
+    for size_name in PAPER_SIZE_NAMES:
+        if size_name.lower() in template_file.lower():
+            return size_name
+    return default
+
+
+def config_path():
+    """Returns the config.json path for the current stage."""
+    return os.environ.get("PIPELINE_CONFIG", DEFAULT_CONFIG_PATH)
+
+
+def output_dir():
+    """Returns the output directory for the current stage."""
+    return os.environ.get("PIPELINE_OUTPUT_DIR", DEFAULT_OUTPUT_DIR)
+
+
+def output_path(name):
+    """Returns the path of a file inside the current output directory."""
+    return os.path.join(output_dir(), name)
+
+
+def dimension_input_name(config):
+    """DXF file read by the dimension stage: the normalized drawing if enabled."""
+    if config_flag(config, 'NORMALIZE_DRAWING'):
+        return "step1_normalized.dxf"
+    return "step1_from_freecad.dxf"
+
+
+def load_config(path=None):
+    """Loads the pipeline configuration."""
+    with open(path or config_path(), 'r') as f:
+        return json.load(f)
+
+
+def config_flag(config, key, default='false'):
+    """Reads a 'true'/'false' string option from the config."""
+    return str(config.get(key, default)).lower() == 'true'
+
+
+def preview_size(config):
+    """Thumbnail size in pixels requested with PREVIEW_SIZE, 0 if none."""
+    try:
+        return max(int(config.get('PREVIEW_SIZE') or 0), 0)
+    except ValueError:
+        return 0
+
+
+def parallel_view_workers():
+    """freecadcmd processes PARALLEL_VIEWS may run at once in this process.
+
+    batch_runner.py exports its pool size as PIPELINE_BATCH_WORKERS, so the
+    pool workers share the CPUs instead of each starting one process per core.
+    """
+    try:
+        batch_workers = max(int(os.environ.get(BATCH_WORKERS_ENV) or 1), 1)
+    except ValueError:
+        batch_workers = 1
+    return max(min(len(VIEW_DIRECTIONS), (os.cpu_count() or 1) // batch_workers), 1)
+
+
+def stage_env(config_file, out_dir):
+    """Builds the environment passed to a stage subprocess (spans go to its output directory)."""
+    env = dict(os.environ)
+    env["PIPELINE_CONFIG"] = config_file
+    env["PIPELINE_OUTPUT_DIR"] = out_dir
+    env[TRACE_FILE_ENV] = os.path.join(out_dir, SPANS_NAME)
+    return env
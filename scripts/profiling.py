@@ -0,0 +1,172 @@
+# scripts/profiling.py
+"""Opt-in cProfile and tracemalloc dumps per pipeline stage.
+
+With PROFILE_STAGES "true" in the config, or PIPELINE_PROFILE=1 in the
+environment of pipeline.py, every stage runs under cProfile and writes into
+<output>/profiles/<stage>/:
+- profile.prof: the cProfile stats (python -m pstats, snakeviz, ...),
+- summary.txt: the top-N functions by cumulative and by own time,
+- memory.snapshot (ezdxf stages only): a tracemalloc snapshot
+  (tracemalloc.Snapshot.load) with its top-N allocation sites in summary.txt,
+  next to the exact peak of traced memory. A sampler thread polls the traced
+  memory, which is cheap, and only takes a snapshot when it reaches
+  PEAK_GROWTH times the last one, so a stage pays for a few snapshots at most;
+  one more is taken at the end of the stage if memory is higher than that.
+
+PIPELINE_PROFILE_TOP sets N (default 30). tracemalloc keeps one frame per
+allocation; set PIPELINE_PROFILE_FRAMES to keep more, e.g. to group the
+snapshot by 'traceback', at the price of a slower run.
+
+The stage name is the script name (dxf_add_dim, dxf_render_svg, ...,
+freecad_techdraw_core, freecad_view_worker_<view>). pipeline.py passes the
+profiles directory to the stage processes in PIPELINE_PROFILE_DIR and reruns
+every stage while profiling, so unchanged stages are profiled too. Profiling
+slows the stages down (tracemalloc several times), so the timings in the
+profiles and in metrics.json are only comparable with each other.
+
+Any Python code can be profiled the same way with `with profiled(name):`.
+"""
+import contextlib
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+
+from pipeline_config import config_flag
+
+PROFILE_ENV = "PIPELINE_PROFILE"
+PROFILE_DIR_ENV = "PIPELINE_PROFILE_DIR"
+PROFILE_TOP_ENV = "PIPELINE_PROFILE_TOP"
+PROFILE_FRAMES_ENV = "PIPELINE_PROFILE_FRAMES"
+PROFILES_NAME = "profiles"
+DEFAULT_TOP = 30
+# Frames kept per allocation. The summary groups by line, which needs one;
+# every extra frame slows tracemalloc down (10 frames: about 4x slower)
+TRACEMALLOC_FRAMES = 1
+# Traced memory is polled every PEAK_SAMPLE_INTERVAL seconds, a snapshot is
+# taken when it reaches PEAK_GROWTH times the last snapshot (at least
+# PEAK_MIN_BYTES). Every snapshot walks all traced blocks, so the factor
+# bounds the snapshot cost to about twice that of a single one at the peak.
+PEAK_SAMPLE_INTERVAL = 0.1
+PEAK_GROWTH = 2.0
+PEAK_MIN_BYTES = 1 << 20
+
+# Stages whose Python allocations are traced (FreeCAD allocates in C++)
+MEMORY_STAGES = ('dxf_assembler', 'dxf_normalizer', 'dxf_add_dim', 'dxf_render_svg', 'dxf_preview', 'dxf_stages')
+
+
+def profiling_enabled(config):
+    """True if PROFILE_STAGES is "true" or PIPELINE_PROFILE is set to 1/true."""
+    return config_flag(config, 'PROFILE_STAGES') or os.environ.get(PROFILE_ENV, '').lower() in ('1', 'true')
+
+
+def profile_dir():
+    """Profiles directory of the current run, or None if not profiling."""
+    return os.environ.get(PROFILE_DIR_ENV) or None
+
+
+def _env_count(name, default):
+    try:
+        return max(int(os.environ.get(name) or default), 1)
+    except ValueError:
+        return default
+
+
+def _top():
+    return _env_count(PROFILE_TOP_ENV, DEFAULT_TOP)
+
+
+class PeakSampler(threading.Thread):
+    """Keeps a tracemalloc snapshot taken near the peak of traced memory."""
+
+    def __init__(self, interval=PEAK_SAMPLE_INTERVAL):
+        super().__init__(name="tracemalloc-peak", daemon=True)
+        self.interval = interval
+        self.snapshot = None
+        self.size = 0
+        self._done = threading.Event()
+
+    def sample(self):
+        current = tracemalloc.get_traced_memory()[0]
+        if current >= max(self.size, PEAK_MIN_BYTES) * PEAK_GROWTH:
+            self.snapshot, self.size = tracemalloc.take_snapshot(), current
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            self.sample()
+
+    def finish(self):
+        """Stops sampling, returns (snapshot, traced bytes at the snapshot, peak traced bytes)."""
+        self._done.set()
+        self.join()
+        current, peak = tracemalloc.get_traced_memory()
+        if self.snapshot is None or current > self.size:
+            self.snapshot, self.size = tracemalloc.take_snapshot(), current
+        return self.snapshot, self.size, peak
+
+
+@contextlib.contextmanager
+def profiled(name, directory=None, memory=None):
+    """Profiles the block as stage `name` if profiling is enabled (see module docstring).
+
+    `memory` traces allocations with tracemalloc; by default only for MEMORY_STAGES.
+    """
+    directory = directory or profile_dir()
+    if not directory:
+        yield
+        return
+    if memory is None:
+        memory = name in MEMORY_STAGES
+    # Inside another traced block the outer one keeps tracing
+    memory = memory and not tracemalloc.is_tracing()
+
+    sampler = None
+    if memory:
+        tracemalloc.start(_env_count(PROFILE_FRAMES_ENV, TRACEMALLOC_FRAMES))
+        sampler = PeakSampler()
+        sampler.start()
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        seconds = time.perf_counter() - start
+        memory_usage = None
+        if sampler is not None:
+            memory_usage = sampler.finish()
+            tracemalloc.stop()
+        write_profile(os.path.join(directory, name), name, profiler, seconds, memory_usage)
+
+
+def write_profile(stage_dir, name, profiler, seconds, memory_usage=None):
+    """Writes profile.prof, summary.txt and memory.snapshot of one stage."""
+    top = _top()
+    try:
+        os.makedirs(stage_dir, exist_ok=True)
+        profiler.dump_stats(os.path.join(stage_dir, "profile.prof"))
+
+        summary = io.StringIO()
+        summary.write(f"Profile of {name}: {seconds:.3f} s wall time (cProfile overhead included)\n")
+        for order, title in (('cumulative', "cumulative time"), ('tottime', "own time")):
+            summary.write(f"\n=== Top {top} functions by {title} ===\n")
+            pstats.Stats(profiler, stream=summary).strip_dirs().sort_stats(order).print_stats(top)
+
+        if memory_usage is not None:
+            snapshot, size, peak = memory_usage
+            snapshot.dump(os.path.join(stage_dir, "memory.snapshot"))
+            summary.write(f"\n=== Memory (tracemalloc): peak {peak / 2**20:.1f} MB traced, "
+                          f"snapshot at {size / 2**20:.1f} MB ===\n")
+            summary.write(f"Top {top} allocation sites in the snapshot:\n")
+            for stat in snapshot.statistics('lineno')[:top]:
+                summary.write(f"  {stat}\n")
+
+        with open(os.path.join(stage_dir, "summary.txt"), 'w') as f:
+            f.write(summary.getvalue())
+        print(f"[INFO] Profile of {name} written to: {stage_dir}")
+    except OSError as e:
+        print(f"[WARNING] Could not write the profile of {name}: {e}")
@@ -0,0 +1,182 @@
+# scripts/projection_cache.py
+"""Content-addressed on-disk cache for the FreeCAD projection output.
+
+Re-running a part with only template or dimension changes used to re-import the
+STEP file and re-run TechDraw HLR. The cache stores step1_from_freecad.dxf under
+a key built from the STEP file hash and only the settings that change the
+projection (see PROJECTION_CONFIG_KEYS), so a warm rerun skips FreeCAD.
+
+Layout of the cache directory:
+    objects/<key>.dxf   cached projections, mtime = last use (LRU order)
+    stats.json          hit/miss/store/eviction counters
+    .lock               flock() lock guarding stats and eviction
+
+Entries are written to a temporary file and moved in place with os.replace(),
+so concurrent writers of the same key never expose a partial file and readers
+see either the old or the new complete entry.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from pipeline_config import INPUT_DIR, SCRIPT_DIR, VIEW_DIRECTIONS, config_flag, paper_size_name
+
+# Config fields that change the FreeCAD projection output
+# (PARALLEL_VIEWS switches to the per-view projection + assembler path)
+PROJECTION_CONFIG_KEYS = ('SCALE', 'AUTO_SCALE', 'LAYOUT_MODE', 'MIN_SPACING', 'PARALLEL_VIEWS')
+
+PROJECTION_SCRIPTS = ('freecad_techdraw_core.py', 'freecad_view_worker.py', 'dxf_assembler.py')
+
+DEFAULT_CACHE_DIR = "/app/cache/projections"
+DEFAULT_MAX_MB = 2048
+
+
+def projection_settings(config):
+    """The settings of `config` that change the projection output."""
+    projection = {key: str(config.get(key, '')) for key in PROJECTION_CONFIG_KEYS}
+    if config.get('LAYOUT_MODE') == 'manual':
+        projection['MANUAL_POSITIONS'] = config.get('MANUAL_POSITIONS', {})
+    projection['PAPER_SIZE'] = paper_size_name(config.get('TEMPLATE_FILE', ''))
+    projection['VIEW_DIRECTIONS'] = VIEW_DIRECTIONS
+    return projection
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ProjectionCache:
+    """Size-capped LRU cache of projection DXFs keyed by content."""
+
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_MB * 1024 * 1024):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.stats_path = os.path.join(root, "stats.json")
+        self.lock_path = os.path.join(root, ".lock")
+        self.max_bytes = max_bytes
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(config):
+        """Builds the cache key for the part and projection settings of `config`."""
+        step_path = os.path.join(INPUT_DIR, config["INPUT_FILE"])
+        projection = projection_settings(config)
+
+        # Changes to the projection scripts invalidate old entries as well
+        for script in PROJECTION_SCRIPTS:
+            script_path = os.path.join(SCRIPT_DIR, script)
+            if os.path.exists(script_path):
+                projection[script] = _file_hash(script_path)
+
+        digest = hashlib.sha256(_file_hash(step_path).encode('ascii'))
+        digest.update(json.dumps(projection, sort_keys=True).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _object_path(self, key):
+        return os.path.join(self.objects_dir, f"{key}.dxf")
+
+    @contextmanager
+    def _locked(self):
+        with open(self.lock_path, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _bump(self, **counters):
+        """Adds to the persistent counters; caller must hold the lock."""
+        stats = self._read_stats()
+        for name, value in counters.items():
+            stats[name] = stats.get(name, 0) + value
+        tmp_fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        with os.fdopen(tmp_fd, 'w') as f:
+            json.dump(stats, f, indent=2)
+        os.replace(tmp_path, self.stats_path)
+
+    def _read_stats(self):
+        try:
+            with open(self.stats_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, key, dest_path):
+        """Copies the cached projection to dest_path. Returns True on a hit."""
+        src = self._object_path(key)
+        try:
+            # An open handle stays valid even if a concurrent eviction unlinks the file
+            with open(src, 'rb') as f_in, open(dest_path, 'wb') as f_out:
+                shutil.copyfileobj(f_in, f_out)
+            os.utime(src)  # mark as most recently used
+            hit = True
+        except FileNotFoundError:
+            hit = False
+        with self._locked():
+            self._bump(**{'hits' if hit else 'misses': 1})
+        return hit
+
+    def put(self, key, src_path):
+        """Stores a projection atomically, then evicts down to the size cap."""
+        tmp_fd, tmp_path = tempfile.mkstemp(dir=self.objects_dir, suffix=".tmp")
+        try:
+            with os.fdopen(tmp_fd, 'wb') as f_out, open(src_path, 'rb') as f_in:
+                shutil.copyfileobj(f_in, f_out)
+            os.replace(tmp_path, self._object_path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        with self._locked():
+            evicted = self._evict()
+            self._bump(stores=1, evictions=evicted)
+
+    def _evict(self):
+        """Deletes least recently used entries above the size cap; caller must hold the lock."""
+        entries = []
+        for entry in os.scandir(self.objects_dir):
+            if entry.name.endswith(".dxf"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        return evicted
+
+    def stats(self):
+        """Returns the counters plus the current entry count and size."""
+        stats = self._read_stats()
+        sizes = [e.stat().st_size for e in os.scandir(self.objects_dir) if e.name.endswith(".dxf")]
+        lookups = stats.get('hits', 0) + stats.get('misses', 0)
+        stats.update({
+            'entries': len(sizes),
+            'size_mb': round(sum(sizes) / (1024 * 1024), 2),
+            'max_mb': round(self.max_bytes / (1024 * 1024), 2),
+            'hit_rate': round(stats.get('hits', 0) / lookups, 3) if lookups else 0.0,
+        })
+        return stats
+
+
+def open_projection_cache(config):
+    """Returns the ProjectionCache configured by `config`, or None if disabled."""
+    if not config_flag(config, 'PROJECTION_CACHE'):
+        return None
+    root = config.get('PROJECTION_CACHE_DIR', DEFAULT_CACHE_DIR)
+    max_mb = float(config.get('PROJECTION_CACHE_MAX_MB', DEFAULT_MAX_MB))
+    return ProjectionCache(root, int(max_mb * 1024 * 1024))
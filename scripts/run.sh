@@ -6,12 +6,14 @@ PROJECT_ROOT=$(dirname "$(realpath "$0")")/..
 INPUT_DIR="$PROJECT_ROOT/input"
 TEMPLATE_DIR="$PROJECT_ROOT/templates"
 OUTPUT_DIR="$PROJECT_ROOT/output"
+CACHE_DIR="$PROJECT_ROOT/cache"
 SCRIPT_DIR="$PROJECT_ROOT/scripts"
 CONFIG_FILE="$PROJECT_ROOT/config.tmp.json" # Temporary config file
 
 # --- Cleanup ---
-echo "🧹 Cleaning up old output files and configs..."
-rm -f "$OUTPUT_DIR"/*
+# Outputs are kept: pipeline.py only re-runs the stages whose inputs changed
+# (see stage_manifest.json in the output directory).
+echo "🧹 Cleaning up old configs..."
 rm -f "$CONFIG_FILE"
 echo ""
 
@@ -135,7 +137,8 @@ cat > "$CONFIG_FILE" << EOL
   "MAX_DIMENSIONS_PER_VIEW": "$MAX_DIMENSIONS_PER_VIEW",
   "DIMENSION_ANGLES": "$DIMENSION_ANGLES",
   "DIMENSION_RADII": "$DIMENSION_RADII",
-  "DIMENSION_DIAMETERS": "$DIMENSION_DIAMETERS"
+  "DIMENSION_DIAMETERS": "$DIMENSION_DIAMETERS",
+  "PROJECTION_CACHE": "true"
 }
 EOL
 echo "✅ Created config.tmp.json"
@@ -153,17 +156,27 @@ fi
 echo ""
 
 echo "🚀 Starting processing inside the container..."
+mkdir -p "$CACHE_DIR"
+mkdir -p "$OUTPUT_DIR"
 docker run --rm \
   -v "$INPUT_DIR:/app/input" \
   -v "$TEMPLATE_DIR:/app/templates" \
   -v "$OUTPUT_DIR:/app/output" \
+  -v "$CACHE_DIR:/app/cache" \
   -v "$SCRIPT_DIR:/app/scripts" \
   -v "$CONFIG_FILE:/app/config.json" \
   freecad-automation-macro
+PIPELINE_STATUS=$?
 
 # Clean up config file after execution
 rm -f "$CONFIG_FILE"
 
+# The output directory is no longer emptied, so don't open a previous result
+if [[ $PIPELINE_STATUS -ne 0 ]]; then
+    echo "❌ Error: The pipeline failed (exit code $PIPELINE_STATUS)."
+    exit $PIPELINE_STATUS
+fi
+
 echo ""
 echo "🎉🎉🎉 PROCESS COMPLETE! 🎉🎉🎉"
 final_svg_file="$OUTPUT_DIR/final_drawing.svg"
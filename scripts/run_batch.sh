@@ -0,0 +1,62 @@
+#!/bin/bash
+# scripts/run_batch.sh
+# Non-interactive batch run: converts every STEP file in ./input (or the jobs of
+# a manifest) inside a single container.
+#
+# Usage: ./scripts/run_batch.sh <template.svg> [manifest.json] [workers]
+#   The manifest path is relative to the project root.
+#   Optional base config: ./config.batch.json (same keys as config.tmp.json).
+
+set -e
+
+# --- Setup Paths ---
+PROJECT_ROOT=$(dirname "$(realpath "$0")")/..
+INPUT_DIR="$PROJECT_ROOT/input"
+TEMPLATE_DIR="$PROJECT_ROOT/templates"
+OUTPUT_DIR="$PROJECT_ROOT/output"
+CACHE_DIR="$PROJECT_ROOT/cache"
+SCRIPT_DIR="$PROJECT_ROOT/scripts"
+BASE_CONFIG="$PROJECT_ROOT/config.batch.json"
+
+TEMPLATE_FILE="$1"
+MANIFEST_FILE="$2"
+WORKERS="${3:-$(nproc)}"
+
+if [[ -z "$TEMPLATE_FILE" ]]; then
+    echo "Usage: $0 <template.svg> [manifest.json] [workers]"
+    exit 1
+fi
+if [[ ! -f "$TEMPLATE_DIR/$TEMPLATE_FILE" ]]; then
+    echo "❌ Error: Template not found: $TEMPLATE_DIR/$TEMPLATE_FILE"
+    exit 1
+fi
+
+mkdir -p "$OUTPUT_DIR" "$CACHE_DIR"
+
+BATCH_ARGS=(--batch --template "$TEMPLATE_FILE" --workers "$WORKERS")
+DOCKER_MOUNTS=(
+  -v "$INPUT_DIR:/app/input"
+  -v "$TEMPLATE_DIR:/app/templates"
+  -v "$OUTPUT_DIR:/app/output"
+  -v "$CACHE_DIR:/app/cache"
+  -v "$SCRIPT_DIR:/app/scripts"
+)
+if [[ -n "$MANIFEST_FILE" ]]; then
+    DOCKER_MOUNTS+=(-v "$(realpath "$PROJECT_ROOT/$MANIFEST_FILE"):/app/manifest.json")
+    BATCH_ARGS+=(--manifest /app/manifest.json)
+fi
+if [[ -f "$BASE_CONFIG" ]]; then
+    DOCKER_MOUNTS+=(-v "$BASE_CONFIG:/app/config.json")
+fi
+
+# --- EXECUTE WITH DOCKER ---
+if [[ "$(docker images -q freecad-automation-macro 2> /dev/null)" == "" ]]; then
+  echo "🐳 Docker image not found. Building now..."
+  docker build -t freecad-automation-macro "$PROJECT_ROOT"
+fi
+
+echo "🚀 Starting batch processing inside the container ($WORKERS workers)..."
+docker run --rm "${DOCKER_MOUNTS[@]}" freecad-automation-macro "${BATCH_ARGS[@]}"
+
+echo "📊 Per-job outputs: $OUTPUT_DIR/batch/<part>/final_drawing.svg"
+echo "📊 Summary       : $OUTPUT_DIR/batch/batch_summary.json"
@@ -0,0 +1,184 @@
+# scripts/stage_forkserver.py
+"""Preloading fork-server for the Python stages (dxf_add_dim, dxf_render_svg).
+
+Every stage used to start a fresh interpreter that imported ezdxf, lxml, NumPy
+and matplotlib again, which costs more than the stage itself on small parts.
+With FORK_SERVER "true" the pipeline process (or each batch pool process)
+imports these modules once and runs every stage in a forked child, which
+inherits the warm interpreter through copy-on-write. Without it, each stage
+runs in a fresh interpreter through this script as launcher.
+
+Both paths report per stage how long it took from launch until the stage
+script and its imports were loaded (interpreter startup + imports) and the
+total time. The timings are printed and written to stage_timings.json in the
+output directory. With PIPELINE_PROFILE_DIR set, both paths run the stage
+under cProfile (see profiling.py).
+
+Launcher (used by StageRunner without the fork-server):
+    python /app/scripts/stage_forkserver.py <stage_script.py> [args...]
+"""
+import json
+import os
+import runpy
+import subprocess
+import sys
+import time
+import traceback
+
+from profiling import profiled
+from tracing import span
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Heavy modules shared by the stages, imported once by the fork-server
+PRELOAD_MODULES = ('numpy', 'lxml.etree', 'ezdxf', 'ezdxf.addons.drawing', 'matplotlib',
+                   'dxf_add_dim', 'dxf_render_svg', 'dxf_preview')
+
+LAUNCH_TIME_ENV = "PIPELINE_STAGE_LAUNCH_TIME"
+REPORT_FD_ENV = "PIPELINE_STAGE_REPORT_FD"
+
+
+def preload(modules=PRELOAD_MODULES):
+    """Imports the stage modules, returns the import time in seconds."""
+    start = time.perf_counter()
+    if SCRIPT_DIR not in sys.path:
+        sys.path.insert(0, SCRIPT_DIR)
+    import matplotlib
+    matplotlib.use('Agg')
+    import importlib
+    for name in modules:
+        importlib.import_module(name)
+    return time.perf_counter() - start
+
+
+def import_stage(script):
+    """Imports the stage script as a module, which runs its top-level imports."""
+    import importlib
+    directory = os.path.dirname(os.path.abspath(script))
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+    importlib.import_module(os.path.splitext(os.path.basename(script))[0])
+
+
+def _report(startup):
+    """Sends the startup time of this stage to the runner, if it asked for it."""
+    fd = os.environ.get(REPORT_FD_ENV)
+    if fd:
+        os.write(int(fd), json.dumps({'startup': startup}).encode('utf-8'))
+        os.close(int(fd))
+
+
+def _run_script(script, args):
+    """Runs a stage script as __main__, returns its exit code."""
+    sys.argv = [script, *args]
+    try:
+        # No-op unless pipeline.py profiles the stages (PIPELINE_PROFILE_DIR)
+        with profiled(os.path.splitext(os.path.basename(script))[0]):
+            runpy.run_path(script, run_name="__main__")
+        return 0
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        print(e.code, file=sys.stderr)
+        return 1
+    except BaseException:
+        traceback.print_exc()
+        return 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+
+class StageRunner:
+    """Runs the Python stage scripts, forked from a preloaded parent or as launcher processes."""
+
+    def __init__(self, fork_server=False):
+        self.fork_server = fork_server and hasattr(os, 'fork')
+        self.preload_seconds = preload() if self.fork_server else 0.0
+        self.timings = {}
+
+    def run(self, script, args=(), env=None, log=None):
+        """Runs one stage, raises RuntimeError on a non-zero exit code."""
+        out = log or sys.stdout
+        name = os.path.basename(script)
+        mode = "fork-server" if self.fork_server else "fresh interpreter"
+        print(f"--- Running stage: {' '.join([name, *args])} ({mode}) ---", file=out, flush=True)
+
+        read_fd, write_fd = os.pipe()
+        env = dict(env or os.environ)
+        env[LAUNCH_TIME_ENV] = repr(time.time())
+        env[REPORT_FD_ENV] = str(write_fd)
+        start = time.perf_counter()
+        with span(name, "launch", mode=mode) as launch:
+            try:
+                if self.fork_server:
+                    code = self._fork(script, args, env, log, read_fd, write_fd)
+                else:
+                    os.set_inheritable(write_fd, True)
+                    code = subprocess.run([sys.executable, os.path.abspath(__file__), script, *args],
+                                          env=env, stdout=log, stderr=subprocess.STDOUT if log else None,
+                                          pass_fds=(write_fd,)).returncode
+            finally:
+                os.close(write_fd)
+                with os.fdopen(read_fd, 'rb') as report:
+                    data = report.read()
+            startup = json.loads(data)['startup'] if data else None
+            launch.set(startup=startup and round(startup, 4), exit_code=code)
+        total = time.perf_counter() - start
+
+        self.timings[name] = {'mode': mode, 'startup': startup, 'total': round(total, 4)}
+        startup_text = f"{startup * 1000:.1f} ms" if startup is not None else "n/a"
+        print(f"--- Stage {name}: startup+imports {startup_text}, total {total:.3f} s ---", file=out, flush=True)
+        if code != 0:
+            raise RuntimeError(f"Stage {name} failed with exit code {code}")
+
+    def _fork(self, script, args, env, log, read_fd, write_fd):
+        sys.stdout.flush()
+        sys.stderr.flush()
+        if log:
+            log.flush()
+        pid = os.fork()
+        if pid == 0:
+            # Child: inherits the preloaded modules; never returns into the caller
+            code = 1
+            try:
+                os.close(read_fd)
+                os.environ.clear()
+                os.environ.update(env)
+                if log:
+                    os.dup2(log.fileno(), 1)
+                    os.dup2(log.fileno(), 2)
+                import_stage(script)
+                _report(time.time() - float(env[LAUNCH_TIME_ENV]))
+                code = _run_script(script, args)
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                os._exit(code)
+        _, status = os.waitpid(pid, 0)
+        return os.waitstatus_to_exitcode(status)
+
+    def write_timings(self, out_dir):
+        """Writes the timings of the stages run since the last call, returns them."""
+        timings, self.timings = self.timings, {}
+        path = os.path.join(out_dir, "stage_timings.json")
+        try:
+            with open(path, 'w') as f:
+                json.dump({'preload': round(self.preload_seconds, 4), 'stages': timings}, f, indent=2)
+        except OSError as e:
+            print(f"[WARNING] Could not write stage timings: {e}")
+        return timings
+
+
+def main():
+    """Launcher: imports the stage, reports the startup time, then runs the stage."""
+    if len(sys.argv) < 2:
+        sys.exit("ERROR: Missing stage script path.")
+    import_stage(sys.argv[1])
+    launch = os.environ.get(LAUNCH_TIME_ENV)
+    _report(time.time() - float(launch) if launch else 0.0)
+    sys.exit(_run_script(sys.argv[1], sys.argv[2:]))
+
+
+if __name__ == "__main__":
+    main()
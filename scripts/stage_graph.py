@@ -0,0 +1,146 @@
+# scripts/stage_graph.py
+"""Stage graph with input fingerprints, so a rerun only repeats what changed.
+
+Every stage declares its inputs: the files it reads (the outputs of upstream
+stages, the template, ...), the scripts it runs and the config keys it uses.
+Their fingerprint is stored in stage_manifest.json next to the outputs. On the
+next run a stage whose fingerprint is unchanged and whose outputs still exist
+is skipped; a stage that does run rewrites its outputs, so the stages reading
+them get a new fingerprint and run as well.
+
+File hashes are cached in the manifest by path, modification time and size, so
+unchanged files are not hashed again. FORCE_RERUN "true" (or pipeline.py
+--force) runs every stage.
+"""
+import hashlib
+import json
+import os
+import time
+
+from pipeline_config import SCRIPT_DIR, config_flag
+from tracing import file_size, record_span, span
+
+MANIFEST_NAME = "stage_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Stage:
+    """One node of the graph.
+
+    `inputs` and `outputs` are file paths, `scripts` are names inside
+    SCRIPT_DIR whose content versions the stage, `config_keys` the options it
+    reads and `key` any further fingerprint data (e.g. a projection cache key).
+    """
+
+    def __init__(self, name, run, outputs, inputs=(), scripts=(), config_keys=(), key=None):
+        self.name = name
+        self.run = run
+        self.outputs = list(outputs)
+        self.inputs = list(inputs)
+        self.scripts = list(scripts)
+        self.config_keys = list(config_keys)
+        self.key = key
+
+
+class StageGraph:
+    """Runs stages in dependency order, skipping the ones whose inputs did not change."""
+
+    def __init__(self, out_dir, config, force=False, log=None):
+        self.out_dir = out_dir
+        self.config = config
+        self.force = force or config_flag(config, 'FORCE_RERUN')
+        self.log = log
+        self.manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+        self.stages = []
+        self.manifest = self._load_manifest()
+
+    def add(self, stage):
+        """Adds a stage; the stages producing its inputs must have been added before."""
+        produced = {path for s in self.stages for path in s.outputs}
+        for path in stage.outputs:
+            if path in produced:
+                raise ValueError(f"Stage '{stage.name}' writes {path}, which another stage already produces")
+        self.stages.append(stage)
+        return stage
+
+    def dependencies(self, stage):
+        """Names of the stages producing the inputs of `stage`."""
+        return [s.name for s in self.stages if s is not stage and set(s.outputs) & set(stage.inputs)]
+
+    def run(self):
+        """Runs the graph, returns the names of the stages that ran."""
+        out = self.log
+        ran = []
+        for stage in self.stages:
+            fingerprint = self.fingerprint(stage)
+            entry = self.manifest['stages'].get(stage.name, {})
+            if (not self.force and entry.get('fingerprint') == fingerprint
+                    and all(os.path.exists(path) for path in stage.outputs)):
+                print(f"--- Stage {stage.name} unchanged ({fingerprint[:12]}), skipping ---", file=out, flush=True)
+                record_span(stage.name, "stage", time.time(), 0.0, {'ran': False})
+                continue
+
+            # Forget the old entry first, so a failing stage is never taken as done
+            self.manifest['stages'].pop(stage.name, None)
+            self._save_manifest()
+            with span(stage.name, "stage", ran=True) as traced:
+                stage.run()
+                traced.set(bytes_written=file_size(*stage.outputs))
+            self.manifest['stages'][stage.name] = {
+                'fingerprint': fingerprint,
+                'depends_on': self.dependencies(stage),
+                'outputs': {os.path.basename(path): self.file_hash(path)
+                            for path in stage.outputs if os.path.exists(path)},
+            }
+            self._save_manifest()
+            ran.append(stage.name)
+        return ran
+
+    def fingerprint(self, stage):
+        """Hash of everything `stage` declares as input."""
+        data = {
+            'stage': stage.name,
+            'scripts': {name: self.file_hash(os.path.join(SCRIPT_DIR, name)) for name in stage.scripts},
+            'config': {key: self.config.get(key) for key in stage.config_keys},
+            'inputs': {path: self.file_hash(path) for path in stage.inputs},
+            'key': stage.key,
+        }
+        return hashlib.sha256(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def file_hash(self, path):
+        """SHA-256 of a file (None if missing), reused while mtime and size are unchanged."""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        files = self.manifest['files']
+        cached = files.get(path)
+        if cached and cached['mtime_ns'] == stat.st_mtime_ns and cached['size'] == stat.st_size:
+            return cached['sha256']
+        digest = _file_hash(path)
+        files[path] = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha256': digest}
+        return digest
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, 'r') as f:
+                manifest = json.load(f)
+            if manifest.get('version') == MANIFEST_VERSION:
+                return manifest
+        except (OSError, ValueError):
+            pass
+        return {'version': MANIFEST_VERSION, 'stages': {}, 'files': {}}
+
+    def _save_manifest(self):
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
@@ -0,0 +1,277 @@
+# scripts/synthetic_drawing.py
+"""Synthetic multi-view drawings for scalability tests of the ezdxf stages.
+
+Writes a drawing with a chosen number and mix of LINE/ARC/CIRCLE entities, far
+larger than the bundled parts, without going through FreeCAD. Every view is a
+grid of small parts that look like HLR output:
+
+- orthogonal outlines whose edges are fragmented into collinear segments,
+- angled chamfers and fillet arcs on the corners, slots with arc ends,
+- hole grids (circles) with their bore silhouettes as hidden lines,
+- duplicate edges: visible edges emitted again as hidden (DASHED) lines.
+
+The ISO view holds the same kind of parts rotated by 30 degrees. The views are
+laid out like dxf_assembler.py does: by default every view is a VIEW_<NAME>
+block placed by one INSERT on the page (the pipeline's step1_from_freecad.dxf);
+with --flat the entities sit directly on the VIEW_* layers, as in the
+per-view projections. Output is deterministic for a given seed: the same
+arguments write the same file byte for byte.
+
+Usage:
+    python /app/scripts/synthetic_drawing.py out.dxf [--entities 100000] [--mix 0.7,0.1,0.2]
+                                             [--seed 0] [--flat] [--template A3_template.svg]
+"""
+import argparse
+import contextlib
+import math
+import random
+import sys
+
+import ezdxf
+from ezdxf.math import BoundingBox
+
+from dxf_assembler import page_size, view_placement
+from dxf_normalizer import store_extents
+
+VIEWS = ("FRONT", "TOP", "RIGHT", "ISO")
+# Bump when the output for a given seed changes, so cached fixtures are rebuilt
+GENERATOR_VERSION = 1
+DEFAULT_MIX = (0.7, 0.1, 0.2)  # LINE, ARC, CIRCLE
+HIDDEN_LINETYPE = "DASHED"
+ISO_ANGLE = 30.0
+MIN_SPACING = 20.0
+
+# Grid pitch of the parts (mm) and the rough entity count of one part
+PART_PITCH = (70.0, 50.0)
+ISO_PART_PITCH = (85.0, 80.0)
+ENTITIES_PER_PART = 30
+
+
+class ViewGeometry:
+    """Entities of one view in view coordinates."""
+
+    def __init__(self):
+        self.lines = []    # (x1, y1, x2, y2, hidden)
+        self.arcs = []     # (cx, cy, r, start_angle, end_angle)
+        self.circles = []  # (cx, cy, r)
+
+    def __len__(self):
+        return len(self.lines) + len(self.arcs) + len(self.circles)
+
+    def bbox(self):
+        points = [(x, y) for x1, y1, x2, y2, _ in self.lines for x, y in ((x1, y1), (x2, y2))]
+        points += [(cx + dx, cy + dy) for cx, cy, r, *_ in self.arcs + self.circles
+                   for dx, dy in ((-r, -r), (r, r))]
+        return BoundingBox(points)
+
+
+class PartGenerator:
+    """Emits parts into a view until the per-type budgets are used up."""
+
+    def __init__(self, rng, budget, rotation=0.0):
+        self.rng = rng
+        self.budget = dict(budget)  # remaining entities per type: 'line', 'arc', 'circle'
+        self.rotation = rotation
+        self.cos, self.sin = math.cos(math.radians(rotation)), math.sin(math.radians(rotation))
+        self.origin = (0.0, 0.0)
+        self.view = None
+
+    def done(self):
+        return all(count <= 0 for count in self.budget.values())
+
+    def _point(self, x, y):
+        ox, oy = self.origin
+        return ox + x * self.cos - y * self.sin, oy + x * self.sin + y * self.cos
+
+    def line(self, p1, p2, hidden=False):
+        if self.budget['line'] > 0:
+            self.budget['line'] -= 1
+            self.view.lines.append((*self._point(*p1), *self._point(*p2), hidden))
+
+    def arc(self, center, radius, start, end):
+        if self.budget['arc'] > 0:
+            self.budget['arc'] -= 1
+            self.view.arcs.append((*self._point(*center), radius, start + self.rotation, end + self.rotation))
+
+    def circle(self, center, radius):
+        if self.budget['circle'] > 0:
+            self.budget['circle'] -= 1
+            self.view.circles.append((*self._point(*center), radius))
+
+    def edge(self, p1, p2):
+        """Straight outline edge, fragmented into collinear pieces, sometimes duplicated as hidden."""
+        pieces = self.rng.randint(1, 4)
+        (x1, y1), (x2, y2) = p1, p2
+        for k in range(pieces):
+            t0, t1 = k / pieces, (k + 1) / pieces
+            self.line((x1 + (x2 - x1) * t0, y1 + (y2 - y1) * t0), (x1 + (x2 - x1) * t1, y1 + (y2 - y1) * t1))
+        if self.rng.random() < 0.25:
+            self.line(p1, p2, hidden=True)
+
+    def part(self, view, origin):
+        """One plate: chamfered/filleted outline, optional slot, hole grid with hidden bores."""
+        rng = self.rng
+        self.view, self.origin = view, origin
+        w, h = rng.uniform(35, 60), rng.uniform(22, 40)
+        c, f = rng.uniform(2, 5), rng.uniform(2, 5)
+
+        # Outline counter-clockwise: chamfer lower left, fillet lower right, chamfer upper right, fillet upper left
+        self.edge((c, 0), (w - f, 0))
+        self.arc((w - f, f), f, 270, 360)
+        self.edge((w, f), (w, h - c))
+        self.line((w, h - c), (w - c, h))
+        self.edge((w - c, h), (f, h))
+        self.arc((f, h - f), f, 90, 180)
+        self.edge((0, h - f), (0, c))
+        self.line((0, c), (c, 0))
+
+        # Slot with arc ends along the top edge
+        if rng.random() < 0.5:
+            r = rng.uniform(1.0, 2.0)
+            x0, x1, y = w * 0.3, w * 0.7, h - 3 * r - c
+            self.line((x0, y - r), (x1, y - r))
+            self.line((x1, y + r), (x0, y + r))
+            self.arc((x1, y), r, 270, 90)
+            self.arc((x0, y), r, 90, 270)
+
+        # Hole grid; the bores show up as hidden silhouettes across the plate
+        columns, rows = rng.randint(1, 4), rng.randint(1, 3)
+        radius = rng.uniform(0.8, min(w / (4 * columns), h / (6 * rows)))
+        for i in range(columns):
+            x = w * (i + 1) / (columns + 1)
+            for j in range(rows):
+                self.circle((x, h * 0.4 * (j + 1) / (rows + 1) + h * 0.1), radius)
+            if rng.random() < 0.5:
+                self.line((x - radius, 0), (x - radius, h * 0.5), hidden=True)
+                self.line((x + radius, 0), (x + radius, h * 0.5), hidden=True)
+
+
+def view_budgets(entities, mix):
+    """Entities per view and type, summing exactly to `entities`."""
+    total = sum(mix)
+    types = ('line', 'arc', 'circle')
+    per_type = [int(entities * share / total) for share in mix]
+    per_type[0] += entities - sum(per_type)
+    budgets = {view: {} for view in VIEWS}
+    for kind, count in zip(types, per_type):
+        for index, view in enumerate(VIEWS):
+            budgets[view][kind] = count // len(VIEWS) + (1 if index < count % len(VIEWS) else 0)
+    return budgets
+
+
+def generate_views(entities, mix=DEFAULT_MIX, seed=0):
+    """Returns {view name: ViewGeometry} with `entities` entities in total."""
+    views = {}
+    for index, (name, budget) in enumerate(view_budgets(entities, mix).items()):
+        rng = random.Random(seed * len(VIEWS) + index)
+        generator = PartGenerator(rng, budget, ISO_ANGLE if name == "ISO" else 0.0)
+        pitch_x, pitch_y = ISO_PART_PITCH if name == "ISO" else PART_PITCH
+        columns = max(1, math.ceil(math.sqrt(sum(budget.values()) / ENTITIES_PER_PART)))
+        # The rotated ISO parts reach left of their origin
+        offset_x = pitch_x * 0.3 if name == "ISO" else 0.0
+        view = views[name] = ViewGeometry()
+        part = 0
+        while not generator.done():
+            generator.part(view, (offset_x + (part % columns) * pitch_x, (part // columns) * pitch_y))
+            part += 1
+    return views
+
+
+@contextlib.contextmanager
+def _fixed_meta_data():
+    """Fixed timestamps, GUIDs and ezdxf markers, so a seed always gives the same bytes."""
+    fixed = ezdxf.options.write_fixed_meta_data_for_testing
+    ezdxf.options.write_fixed_meta_data_for_testing = True
+    try:
+        yield
+    finally:
+        ezdxf.options.write_fixed_meta_data_for_testing = fixed
+
+
+def _new_document():
+    # The "created by" marker is stored when the document is created
+    with _fixed_meta_data():
+        return ezdxf.new(setup=['linetypes'])
+
+
+def _add_entities(layout, view, layer):
+    attribs = {'layer': layer}
+    hidden = {'layer': layer, 'linetype': HIDDEN_LINETYPE}
+    for x1, y1, x2, y2, is_hidden in view.lines:
+        layout.add_line((x1, y1), (x2, y2), dxfattribs=hidden if is_hidden else attribs)
+    for cx, cy, r, start, end in view.arcs:
+        layout.add_arc((cx, cy), r, start, end, dxfattribs=attribs)
+    for cx, cy, r in view.circles:
+        layout.add_circle((cx, cy), r, dxfattribs=attribs)
+
+
+def write_drawing(path, entities, mix=DEFAULT_MIX, seed=0, flat=False, template_file="A3_template.svg"):
+    """Writes the synthetic drawing to `path`, returns {view: entity count}."""
+    views = generate_views(entities, mix, seed)
+    bboxes = {name: view.bbox() for name, view in views.items()}
+    dims = {name: (bbox.size.x, bbox.size.y) if bbox.has_data else (0.0, 0.0) for name, bbox in bboxes.items()}
+    placement = view_placement(dims, *page_size(template_file), MIN_SPACING)
+
+    doc = _new_document()
+    msp = doc.modelspace()
+    page_bbox = BoundingBox()
+    for name, view in views.items():
+        layer = f"VIEW_{name}"
+        doc.layers.add(layer)
+        bbox = bboxes[name]
+        if not bbox.has_data:
+            continue
+        x, y = placement[name]
+        dx, dy = x - bbox.extmin.x, y - bbox.extmin.y
+        page_bbox.extend([(x, y), (x + bbox.size.x, y + bbox.size.y)])
+        if flat:
+            _add_entities(msp, _moved(view, dx, dy), layer)
+        else:
+            # As dxf_assembler.py: the view in its own block, placed by one INSERT
+            block = doc.blocks.new(name=layer)
+            _add_entities(block, _moved(view, -bbox.extmin.x, -bbox.extmin.y), layer)
+            msp.add_blockref(block.name, (x, y), dxfattribs={'layer': layer})
+    if page_bbox.has_data:
+        store_extents(doc, page_bbox)
+
+    # ezdxf adds the CLASSES of the entity types in use from a set, so add them sorted first
+    for dxftype in sorted(doc.entitydb.dxf_types_in_use()):
+        doc.classes.add_class(dxftype)
+    with _fixed_meta_data():
+        doc.saveas(path)
+    return {name: len(view) for name, view in views.items()}
+
+
+def _moved(view, dx, dy):
+    moved = ViewGeometry()
+    moved.lines = [(x1 + dx, y1 + dy, x2 + dx, y2 + dy, hidden) for x1, y1, x2, y2, hidden in view.lines]
+    moved.arcs = [(cx + dx, cy + dy, r, start, end) for cx, cy, r, start, end in view.arcs]
+    moved.circles = [(cx + dx, cy + dy, r) for cx, cy, r in view.circles]
+    return moved
+
+
+def parse_mix(text):
+    mix = tuple(float(v) for v in text.split(','))
+    if len(mix) != 3 or min(mix) < 0 or sum(mix) <= 0:
+        raise argparse.ArgumentTypeError("mix must be three non-negative shares: LINE,ARC,CIRCLE")
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("output", help="DXF file to write")
+    parser.add_argument("--entities", type=int, default=10000, help="Total number of LINE/ARC/CIRCLE entities")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="Shares of LINE,ARC,CIRCLE")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--flat", action="store_true", help="Entities on the VIEW_* layers instead of view blocks")
+    parser.add_argument("--template", default="A3_template.svg", help="Template name giving the page size")
+    args = parser.parse_args()
+
+    counts = write_drawing(args.output, args.entities, args.mix, args.seed, args.flat, args.template)
+    summary = ", ".join(f"{name} {count}" for name, count in counts.items())
+    print(f"✅ [SUCCESS] Synthetic drawing ({summary}) written to: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+# scripts/template_cache.py
+"""Pre-compiled SVG templates for the merge step of dxf_render_svg.py.
+
+A template is parsed once per process: its viewBox is kept, and the pretty
+printed document is split at the insertion point (the end of the root element)
+into a header and a footer. Writing a drawing then only streams the header,
+the serialised drawing group and the footer, instead of parsing the template
+and pretty-printing the whole merged tree again.
+
+Templates are validated by modification time and size, so an edited template
+is compiled again. The fork-server parent compiles the template before forking
+the render stage, so every forked stage inherits it (see pipeline.py).
+"""
+import os
+
+from lxml import etree
+
+DEFAULT_VIEWBOX = '0 0 1189 841'
+
+# Placeholder marking the insertion point while the template is serialised
+_INSERTION_MARK = "pipeline-drawing"
+
+_templates = {}
+
+
+class CompiledTemplate:
+    """A template split into serialised header and footer around the insertion point."""
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        stat = os.stat(self.path)
+        self.stamp = (stat.st_mtime_ns, stat.st_size)
+
+        parser = etree.XMLParser(remove_blank_text=True, recover=True)
+        tree = etree.parse(self.path, parser)
+        root = tree.getroot()
+        view_box = [float(f) for f in root.get('viewBox', DEFAULT_VIEWBOX).replace(',', ' ').split()]
+        self.width, self.height = view_box[2], view_box[3]
+
+        mark = etree.ProcessingInstruction(_INSERTION_MARK)
+        root.append(mark)
+        data = etree.tostring(tree, pretty_print=True, xml_declaration=True, encoding='UTF-8')
+        self.header, self.footer = data.split(etree.tostring(mark), 1)
+
+    def is_current(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        return (stat.st_mtime_ns, stat.st_size) == self.stamp
+
+    def write(self, output_path, group):
+        """Writes the template with `group` (an lxml element) as the last child of the root."""
+        with open(output_path, 'wb') as f:
+            f.write(self.header)
+            f.write(etree.tostring(group, encoding='UTF-8', xml_declaration=False))
+            f.write(self.footer)
+
+
+def load_template(path):
+    """Returns the compiled template for `path`, compiling it on first use or after a change."""
+    key = os.path.abspath(path)
+    template = _templates.get(key)
+    if template is None or not template.is_current():
+        template = _templates[key] = CompiledTemplate(key)
+    return template
@@ -0,0 +1,252 @@
+# scripts/tracing.py
+"""Spans and metrics of a pipeline run: metrics.json and a Chrome trace.
+
+Every stage process records spans (a named, timed step with attributes such as
+entity or dimension counts and bytes written) with span() or StageTimer.lap().
+Finished spans are appended as JSON lines to trace_spans.jsonl in the output
+directory; the file is passed to the stage processes in PIPELINE_TRACE_FILE
+(see pipeline_config.stage_env), so forked, fresh-interpreter and freecadcmd
+stages all report into the same file. Every span also carries the peak RSS of
+its process.
+
+pipeline.run_stages() starts the run with start_run() and ends it with
+finish_run(), which writes next to final_drawing.svg:
+- metrics.json: status, total time, per-stage time/bytes written, stage
+  launch (startup) times, per-step time and counts, peak RSS per process (one
+  flat document per job, easy to collect across many jobs),
+- trace.json: the spans in Chrome trace format (chrome://tracing, Perfetto).
+
+Without a trace file (a stage script run on its own) spans are only timed.
+"""
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # not on Windows
+    resource = None
+
+TRACE_FILE_ENV = "PIPELINE_TRACE_FILE"
+SPANS_NAME = "trace_spans.jsonl"
+METRICS_NAME = "metrics.json"
+TRACE_NAME = "trace.json"
+METRICS_VERSION = 1
+
+# Job-level counts in metrics.json: count -> step span that records it
+SUMMARY_COUNTS = {'entities': 'classify', 'dimensions': 'dimension_render'}
+
+_trace_file = None
+_local = threading.local()
+
+
+def set_trace_file(path):
+    """Records the spans of this process into `path` (None: PIPELINE_TRACE_FILE)."""
+    global _trace_file
+    _trace_file = path
+
+
+def trace_file():
+    return _trace_file or os.environ.get(TRACE_FILE_ENV)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (0 if unknown)."""
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1 << 20 if sys.platform == 'darwin' else 1 << 10), 1)
+
+
+def file_size(*paths):
+    """Total size of the existing files among `paths`, for bytes_written."""
+    return sum(os.path.getsize(path) for path in paths if path and os.path.exists(path))
+
+
+class Span:
+    """An open span; set() adds attributes until it ends, then `seconds` holds its duration."""
+
+    def __init__(self, name, category, attrs):
+        self.name = name
+        self.category = category
+        self.attrs = attrs
+        self.seconds = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+@contextlib.contextmanager
+def span(name, category="step", **attrs):
+    """Times the block as span `name`; yields a Span to attach attributes to."""
+    current = Span(name, category, dict(attrs))
+    start_wall, start = time.time(), time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.set(error=f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        current.seconds = time.perf_counter() - start
+        record_span(name, category, start_wall, current.seconds, current.attrs)
+
+
+def record_span(name, category, start_wall, seconds, attrs=None):
+    """Appends a finished span to the trace file, if this run is traced."""
+    path = trace_file()
+    if not path:
+        return
+    event = {
+        'name': name,
+        'cat': category,
+        'ts': int(start_wall * 1e6),
+        'dur': int(seconds * 1e6),
+        'pid': os.getpid(),
+        'tid': threading.get_native_id(),
+        'process': os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else "python",
+        'args': {**(attrs or {}), 'peak_rss_mb': peak_rss_mb()},
+    }
+    try:
+        # One O_APPEND write per span, so concurrent stage processes do not interleave
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, (json.dumps(event, default=str) + "\n").encode('utf-8'))
+        finally:
+            os.close(fd)
+    except OSError as e:
+        if not getattr(_local, 'warned', False):
+            _local.warned = True
+            print(f"[WARNING] Could not record trace span: {e}")
+
+
+class StageTimer:
+    """Records the wall time of consecutive sub-steps, each also as a span"""
+
+    def __init__(self, label="FreeCAD", category="freecad"):
+        self.label = label
+        self.category = category
+        self.timings = {}
+        self._start = self._last = time.perf_counter()
+        self._last_wall = time.time()
+
+    def lap(self, name, **attrs):
+        """Records the time since the previous lap under `name`"""
+        now, now_wall = time.perf_counter(), time.time()
+        self.timings[name] = round(self.timings.get(name, 0.0) + now - self._last, 4)
+        record_span(name, self.category, self._last_wall, now - self._last, attrs)
+        self._last, self._last_wall = now, now_wall
+
+    def report(self, part_name, json_path):
+        """Prints the timings and writes them next to the DXF output"""
+        total = round(time.perf_counter() - self._start, 4)
+        print(f"[INFO] {self.label} stage timings for {part_name} (total {total:.2f} s):")
+        for name, seconds in self.timings.items():
+            print(f"   - {name}: {seconds:.3f} s")
+        try:
+            with open(json_path, 'w') as f:
+                json.dump({'part': part_name, 'total': total, 'stages': self.timings}, f, indent=2)
+        except OSError as e:
+            print(f"[WARNING] Could not write timings: {e}")
+
+
+# --- Run level (pipeline process) ---
+
+def start_run(out_dir):
+    """Starts tracing a run into `out_dir`, dropping the spans of an earlier run."""
+    path = os.path.join(out_dir, SPANS_NAME)
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+    set_trace_file(path)
+    return path
+
+
+def read_spans(path):
+    spans = []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                with contextlib.suppress(ValueError):
+                    spans.append(json.loads(line))
+    except FileNotFoundError:
+        pass
+    return sorted(spans, key=lambda event: event['ts'])
+
+
+def build_metrics(spans, job, status):
+    """Aggregates the spans of one run into the metrics.json document."""
+    stages, launches, steps, peak_rss = {}, {}, {}, {}
+    mixed = set()
+    for event in spans:
+        args = {key: value for key, value in event['args'].items() if key != 'peak_rss_mb'}
+        process = f"{event['process']}:{event['pid']}"
+        peak_rss[process] = max(peak_rss.get(process, 0.0), event['args'].get('peak_rss_mb', 0.0))
+        seconds = event['dur'] / 1e6
+        if event['cat'] == 'pipeline':
+            continue
+        if event['cat'] in ('stage', 'launch'):
+            (stages if event['cat'] == 'stage' else launches)[event['name']] = {'seconds': round(seconds, 4), **args}
+            continue
+        step = steps.setdefault(event['name'], {'count': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+        step['count'] += 1
+        step['seconds'] = round(step['seconds'] + seconds, 4)
+        step['max_seconds'] = round(max(step['max_seconds'], seconds), 4)
+        for key, value in args.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                # Counts add up over repeated steps (e.g. one HLR per view)
+                step[key] = step.get(key, 0) + value
+            elif (event['name'], key) not in mixed:
+                # Other attributes are kept only while every occurrence agrees
+                if step.setdefault(key, value) != value:
+                    mixed.add((event['name'], key))
+                    del step[key]
+
+    run = next((event for event in spans if event['cat'] == 'pipeline'), None)
+    return {
+        'version': METRICS_VERSION,
+        'status': status,
+        'job': job,
+        'started': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(run['ts'] / 1e6)) if run else None,
+        'total_seconds': round(run['dur'] / 1e6, 4) if run else None,
+        'peak_rss_mb': max(peak_rss.values(), default=0.0),
+        'bytes_written': sum(stage.get('bytes_written', 0) for stage in stages.values()),
+        **{count: steps.get(step, {}).get(count) for count, step in SUMMARY_COUNTS.items()},
+        'stages': stages,
+        'launches': launches,
+        'steps': steps,
+        'processes': peak_rss,
+    }
+
+
+def chrome_trace(spans, job):
+    """The spans as a Chrome trace (complete events, one track per process and thread)."""
+    origin = spans[0]['ts'] if spans else 0
+    events, named = [], set()
+    for event in spans:
+        if event['pid'] not in named:
+            named.add(event['pid'])
+            events.append({'name': 'process_name', 'ph': 'M', 'pid': event['pid'], 'tid': event['tid'],
+                           'args': {'name': f"{event['process']} ({event['pid']})"}})
+        events.append({'name': event['name'], 'cat': event['cat'], 'ph': 'X', 'ts': event['ts'] - origin,
+                       'dur': event['dur'], 'pid': event['pid'], 'tid': event['tid'], 'args': event['args']})
+    return {'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': job}
+
+
+def finish_run(out_dir, job, status):
+    """Writes metrics.json and trace.json from the recorded spans, returns the metrics."""
+    path = os.path.join(out_dir, SPANS_NAME)
+    set_trace_file(None)
+    spans = read_spans(path)
+    metrics = build_metrics(spans, job, status)
+    try:
+        for name, data in ((METRICS_NAME, metrics), (TRACE_NAME, chrome_trace(spans, job))):
+            with open(os.path.join(out_dir, name), 'w') as f:
+                json.dump(data, f, indent=2 if name == METRICS_NAME else None, default=str)
+    except OSError as e:
+        print(f"[WARNING] Could not write run metrics: {e}")
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+    return metrics